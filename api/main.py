@@ -1,21 +1,41 @@
-from fastapi import FastAPI, WebSocket, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
+import logging
 import sys
 import os
+import time
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
 
 # Add src to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.agent.chat_agent import AnnieMacAgent
-from src.models.database import init_db, Base, engine, Artist
+from src.agent.chat_agent import AnnieMacAgent, get_chat_engine
+from src.agent.session_store import SessionStore
+from src.models.database import (
+    init_db, dispose_engines, Base, engine, Artist, read_session, get_catalogue_version, normalize_artist_name
+)
+from src.services.artist_search import ArtistSearch
+from src.services.metrics import metrics
+from src.services.registry import current_rss_bytes, registry
+from src.services import single_flight
+from src.services.admission import llm_admission
+from src.services.page_extractor import shutdown_parse_pool
+from src.services.web_scraper import close_http_client
+import base64
+import hashlib
 import json
 import asyncio
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI()
+process_started_at = time.perf_counter()
+startup_seconds = None
 
 # Create async session maker
 async_session = sessionmaker(
@@ -31,17 +51,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Store chat agents for different sessions
-chat_agents = {}
+# Rows per query when streaming the full catalogue as NDJSON
+ARTIST_EXPORT_PAGE_SIZE = int(os.getenv('ARTIST_EXPORT_PAGE_SIZE', '1000'))
+
+artist_search = ArtistSearch()
+
+# Per-listener conversations; the LLM stack itself is shared via get_chat_engine()
+sessions = SessionStore(
+    max_sessions=int(os.getenv('MAX_CHAT_SESSIONS', '10000')),
+    idle_timeout_seconds=float(os.getenv('CHAT_SESSION_IDLE_SECONDS', '1800'))
+)
+
+metrics.gauge("chat_sessions", "Chat sessions held in memory", lambda: len(sessions))
+metrics.gauge("resident_memory_bytes", "Resident set size of the API process", current_rss_bytes)
+metrics.gauge("uptime_seconds", "Seconds since the API process started",
+              lambda: time.perf_counter() - process_started_at)
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize database on startup"""
     try:
         await init_db()
-        print("Database initialized successfully!")
-    except Exception as e:
-        print(f"Error initializing database: {str(e)}")
+        logger.info("Database initialized successfully!")
+    except Exception:
+        logger.exception("Error initializing database")
+    asyncio.ensure_future(sessions.run_sweeper())
+    global startup_seconds
+    startup_seconds = time.perf_counter() - process_started_at
+    logger.info(f"Started in {startup_seconds:.2f}s, RSS {registry.stats()['rss_bytes'] / 2**20:.1f} MiB")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled scraper connections, parsing workers and DB connections"""
+    await close_http_client()
+    shutdown_parse_pool()
+    await dispose_engines()
 
 class Message(BaseModel):
     role: str
@@ -59,53 +103,200 @@ class ChatResponse(BaseModel):
 async def root():
     return {"message": "Annie Mac Chat API is running"}
 
+@app.get("/health")
+async def health():
+    """Startup time, memory use, loaded models and coalesced lookups"""
+    return {
+        "startup_seconds": startup_seconds,
+        "uptime_seconds": time.perf_counter() - process_started_at,
+        "models": registry.stats(),
+        "sessions": sessions.stats(),
+        "single_flight": single_flight.stats(),
+        "llm_admission": llm_admission.stats()
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    """Stage latency histograms, counters and gauges in the Prometheus text format"""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def _prefix_bounds(prefix: str):
+    """[low, high) range of name_key values starting with prefix, which an index can seek"""
+    key = normalize_artist_name(prefix)
+    if not key:
+        return None
+    return key, key[:-1] + chr(ord(key[-1]) + 1)
+
+def _encode_cursor(name_key: str) -> str:
+    return base64.urlsafe_b64encode(name_key.encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: str) -> str:
+    try:
+        return base64.b64decode(cursor.encode("ascii"), altchars=b"-_", validate=True).decode("utf-8")
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _artists_query(columns, prefix: Optional[str], after: Optional[str], limit: int):
+    query = select(*columns).order_by(Artist.name_key).limit(limit)
+    bounds = _prefix_bounds(prefix) if prefix else None
+    if bounds:
+        query = query.where(Artist.name_key >= bounds[0], Artist.name_key < bounds[1])
+    if after is not None:
+        query = query.where(Artist.name_key > after)
+    return query
+
+async def _export_artists(prefix: Optional[str]):
+    """NDJSON lines for every matching artist, read one keyset page at a time"""
+    after = None
+    while True:
+        async with read_session() as session:
+            rows = (await session.execute(_artists_query(
+                (Artist.id, Artist.name, Artist.name_key, Artist.bio, Artist.genres),
+                prefix, after, ARTIST_EXPORT_PAGE_SIZE
+            ))).all()
+        if not rows:
+            break
+        yield "".join(
+            json.dumps({
+                "id": artist_id,
+                "name": name,
+                "bio": bio,
+                "genres": genres.split(",") if genres else []
+            }) + "\n"
+            for artist_id, name, _, bio, genres in rows
+        )
+        after = rows[-1].name_key
+
 @app.get("/artists")
-async def get_artists():
+async def get_artists(request: Request, limit: int = Query(100, ge=1, le=1000),
+                      cursor: Optional[str] = None, prefix: Optional[str] = None,
+                      output: str = Query("json", alias="format", regex="^(json|ndjson)$")):
+    """
+    Artist names in name order, a page at a time.
+    
+    Pass the returned next_cursor as cursor to get the following page, and
+    prefix to autocomplete. Responses carry an ETag derived from the
+    catalogue version, so unchanged pages cost a 304. format=ndjson streams
+    every matching artist with its bio and genres instead.
+    """
     try:
-        async with async_session() as session:
-            result = await session.execute("SELECT name FROM artists")
-            artists = [row[0] for row in result]
-            return {"artists": artists}
-    except Exception as e:
-        print(f"Database error: {str(e)}")
+        async with read_session() as session:
+            version = await get_catalogue_version(session)
+            etag = '"' + hashlib.sha1(
+                f"{version}:{limit}:{cursor}:{prefix}:{output}".encode("utf-8")
+            ).hexdigest() + '"'
+            headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code=304, headers=headers)
+            
+            if output == "ndjson":
+                return StreamingResponse(
+                    _export_artists(prefix), media_type="application/x-ndjson", headers=headers
+                )
+            
+            after = _decode_cursor(cursor) if cursor else None
+            rows = (await session.execute(
+                _artists_query((Artist.name, Artist.name_key), prefix, after, limit + 1)
+            )).all()
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Database error")
         raise HTTPException(status_code=500, detail="Database error")
+    
+    next_cursor = _encode_cursor(rows[limit - 1].name_key) if len(rows) > limit else None
+    return JSONResponse(
+        {"artists": [row.name for row in rows[:limit]], "next_cursor": next_cursor},
+        headers=headers
+    )
+
+@app.get("/search")
+async def search_artists(q: str = Query(..., min_length=1, max_length=200), limit: int = Query(10, ge=1, le=50)):
+    """Artists ranked by how well their name, genres and bio match q"""
+    return {"results": await artist_search.search(q, limit=limit)}
+
+@app.get("/genres")
+async def get_genres(limit: int = Query(100, ge=1, le=1000)):
+    return {"genres": await artist_search.genres(limit=limit)}
+
+@app.get("/genres/{genre}")
+async def get_genre_artists(genre: str, limit: int = Query(50, ge=1, le=500)):
+    return {"genre": genre, "artists": await artist_search.artists_by_genre(genre, limit=limit)}
+
+async def _receive_messages(websocket: WebSocket, messages: asyncio.Queue):
+    """Queue the client's messages as they arrive, then None once it goes away"""
+    try:
+        while True:
+            messages.put_nowait(await websocket.receive_text())
+    except WebSocketDisconnect:
+        pass
+    except Exception:
+        logger.exception("Error in websocket")
+    finally:
+        messages.put_nowait(None)
+
+async def _send_reply(websocket: WebSocket, client_id: str, message: str):
+    agent = sessions.get_or_create(client_id)
+    stream = agent.chat_stream(message)
+    try:
+        # Send tokens as they arrive, followed by the complete reply
+        async for frame in stream:
+            await websocket.send_text(json.dumps(frame))
+    finally:
+        # Cancelled mid-send, the stream would otherwise hold its LLM slot until collected
+        await stream.aclose()
 
 @app.websocket("/chat/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
     await websocket.accept()
     
-    if client_id not in chat_agents:
-        chat_agents[client_id] = AnnieMacAgent()
-    
+    # Reading in the background is how a disconnect is noticed mid-reply
+    messages: asyncio.Queue = asyncio.Queue()
+    receiver = asyncio.ensure_future(_receive_messages(websocket, messages))
     try:
         while True:
-            message = await websocket.receive_text()
-            response = await chat_agents[client_id].chat(message)
-            await websocket.send_text(json.dumps({
-                "response": response,
-                "type": "assistant"
-            }))
-    except Exception as e:
-        print(f"Error in websocket: {str(e)}")
+            message = await messages.get()
+            if message is None:
+                break
+            reply = asyncio.ensure_future(_send_reply(websocket, client_id, message))
+            await asyncio.wait({reply, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if not reply.done():
+                # The client is gone: stop generating rather than finish for nobody
+                reply.cancel()
+                break
+            reply.result()
+    except Exception:
+        logger.exception("Error in websocket")
     finally:
-        if client_id in chat_agents:
-            del chat_agents[client_id]
+        receiver.cancel()
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     try:
-        response = await chat_agents[request.user_id].chat(request.message)
-        return ChatResponse(
-            response=response,
-            artist_recommendations=[]  # TODO: Extract recommendations from response
-        )
+        turn = await sessions.get_or_create(request.user_id).chat_turn(request.message)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if turn.get("error") == "overloaded":
+        raise HTTPException(status_code=503, detail=turn["response"], headers={"Retry-After": "1"})
+    return ChatResponse(
+        response=turn["response"],
+        artist_recommendations=turn["recommendations"]
+    )
 
 @app.get("/artist/{artist_name}")
 async def get_artist_info(artist_name: str):
-    agent = AnnieMacAgent()
-    artist_info = agent.get_artist_info(artist_name)
+    artist_info = await get_chat_engine().get_artist_info(artist_name)
     if not artist_info:
         raise HTTPException(status_code=404, detail="Artist not found")
-    return artist_info 
\ No newline at end of file
+    return artist_info
+
+@app.get("/artist/{artist_name}/similar")
+async def get_similar_artists(artist_name: str, limit: int = Query(10, ge=1, le=50)):
+    """Artists most like artist_name, from the precomputed similarity index"""
+    similar = await get_chat_engine().similar_artists(artist_name, limit=limit)
+    if similar is None:
+        raise HTTPException(status_code=503, detail="Recommendations are still being built",
+                            headers={"Retry-After": "10"})
+    return {"artist": artist_name, "similar": similar}
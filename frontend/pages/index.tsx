@@ -4,6 +4,7 @@ import { v4 as uuidv4 } from 'uuid'
 interface Message {
   role: 'user' | 'assistant';
   content: string;
+  streaming?: boolean;
 }
 
 export default function Home() {
@@ -29,10 +30,23 @@ export default function Home() {
 
     ws.onmessage = (event) => {
       const data = JSON.parse(event.data)
-      setMessages(prev => [...prev, {
-        role: 'assistant',
-        content: data.response
-      }])
+      setMessages(prev => {
+        const last = prev[prev.length - 1]
+        const streaming = last && last.role === 'assistant' && last.streaming
+
+        if (data.type === 'delta') {
+          if (streaming) {
+            return [...prev.slice(0, -1), { ...last, content: last.content + data.content }]
+          }
+          return [...prev, { role: 'assistant', content: data.content, streaming: true }]
+        }
+
+        // Final frame carries the complete reply
+        if (streaming) {
+          return [...prev.slice(0, -1), { role: 'assistant', content: data.response }]
+        }
+        return [...prev, { role: 'assistant', content: data.response }]
+      })
     }
 
     wsRef.current = ws
@@ -1,38 +1,42 @@
-from langchain.callbacks.manager import CallbackManager
-from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.memory import ConversationBufferMemory
+from langchain.callbacks.base import AsyncCallbackHandler
+from langchain.prompts import (
+    ChatPromptTemplate, HumanMessagePromptTemplate, MessagesPlaceholder, SystemMessagePromptTemplate
+)
+from langchain.memory.prompt import SUMMARY_PROMPT
 from langchain.chains import LLMChain
 from langchain_openai import ChatOpenAI
-from typing import List, Dict
+from typing import Any, AsyncIterator, List, Dict, Optional
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import sessionmaker
-from src.models.database import Artist, SocialMedia, PlatformLink, DATABASE_URL, engine
+from sqlalchemy.orm import joinedload, selectinload, sessionmaker
+from src.models.database import (
+    Artist, ArtistAlias, Genre, artists_changed_since, engine, get_catalogue_version,
+    normalize_artist_name, read_session
+)
+from src.services import artist_matcher, fuzzy_index
+from src.services.admission import Overloaded, llm_admission
+from src.services.artist_matcher import ArtistNameMatcher
+from src.services.artist_search import ArtistSearch
+from src.services.fuzzy_index import FuzzyArtistIndex
+from src.services.metrics import metrics, span
 from src.services.music_api import MusicNerdAPI
+from src.services.recommender import ArtistRecommender
+from src.services.response_cache import ResponseCache
+from src.services.retrieval import ArtistPageIndex
+from src.services.single_flight import SingleFlight
+from .memory import TokenBudgetMemory, approximate_token_count
+import asyncio
+import logging
 import os
-import re
+import sys
+import time
 
-class AnnieMacAgent:
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model_name="gpt-3.5-turbo",
-            temperature=0.7,
-            streaming=True,
-            openai_api_key=os.getenv('OPENAI_API_KEY')
-        )
-        
-        # Create async session maker
-        self.async_session = sessionmaker(
-            engine, class_=AsyncSession, expire_on_commit=False
-        )
-        
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True
-        )
-        
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You ARE Annie Mac, the beloved BBC Radio 1 DJ and music tastemaker. 
+logger = logging.getLogger(__name__)
+
+FALLBACK_RESPONSE = "Sorry, I'm having trouble processing that right now. Could you try again?"
+OVERLOADED_RESPONSE = "I'm chatting with loads of listeners right now! Give me a moment and ask me again."
+
+SYSTEM_PROMPT = """You ARE Annie Mac, the beloved BBC Radio 1 DJ and music tastemaker. 
             Always respond AS Annie Mac, never refer to Annie Mac in the third person.
             
             Your personality:
@@ -58,91 +62,660 @@ class AnnieMacAgent:
             - Feel free to ask about the listener's music tastes
             
             Remember: You ARE Annie Mac - respond accordingly!
-            """),
+            """
+
+# "budget" keeps recent turns plus a running summary, "buffer" keeps everything
+MEMORY_MODE = os.getenv('CHAT_MEMORY_MODE', 'budget')
+MEMORY_MAX_TOKENS = int(os.getenv('CHAT_MEMORY_MAX_TOKENS', '1500'))
+MEMORY_KEEP_TURNS = int(os.getenv('CHAT_MEMORY_KEEP_TURNS', '4'))
+
+# How much scraped page text may be injected per turn
+RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', '4'))
+RETRIEVAL_CONTEXT_TOKENS = int(os.getenv('RETRIEVAL_CONTEXT_TOKENS', '600'))
+
+# Artists listed per genre when a message asks about a genre rather than an artist
+GENRE_CONTEXT_ARTISTS = int(os.getenv('GENRE_CONTEXT_ARTISTS', '8'))
+
+# How often the name indexes pick up artists written by other processes or the
+# bulk importer, and the share of the catalogue past which they are rebuilt
+# rather than patched
+ARTIST_INDEX_REFRESH_SECONDS = float(os.getenv('ARTIST_INDEX_REFRESH_SECONDS', '30'))
+ARTIST_INDEX_REBUILD_FRACTION = float(os.getenv('ARTIST_INDEX_REBUILD_FRACTION', '0.1'))
+
+# Similar artists returned with each reply
+RECOMMENDATIONS_PER_TURN = int(os.getenv('RECOMMENDATIONS_PER_TURN', '5'))
+
+# Opt-in reuse of replies to identical questions asked with identical context
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv('RESPONSE_CACHE_TTL_SECONDS', '3600'))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '2048'))
+# Cosine similarity for near-duplicate questions; unset disables the lookup
+RESPONSE_CACHE_SIMILARITY = os.getenv('RESPONSE_CACHE_SIMILARITY')
+
+# Log every prompt sent to the LLM; synchronous stdout work, so only for debugging
+CHAT_CHAIN_VERBOSE = os.getenv('CHAT_CHAIN_VERBOSE', 'false').lower() in ('1', 'true', 'yes')
+
+TURNS = metrics.counter("chat_turns_total", "Chat turns by how the reply was produced", ("outcome",))
+LLM_TOKENS = metrics.counter("llm_tokens_total", "Tokens sent to and generated by the chat LLM", ("kind",))
+
+class TokenQueueHandler(AsyncCallbackHandler):
+    """Forwards streamed LLM tokens onto an asyncio queue"""
+    
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+    
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if token:
+            self.queue.put_nowait(token)
+
+async def relay_tokens(generation: asyncio.Future, handler: TokenQueueHandler) -> AsyncIterator[str]:
+    """Yield tokens from handler until generation finishes"""
+    while True:
+        next_token = asyncio.ensure_future(handler.queue.get())
+        try:
+            await asyncio.wait(
+                {next_token, generation}, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            # Whether generation finished or we were cancelled mid-wait (the
+            # client went away), don't leave the getter parked on the queue
+            if not next_token.done():
+                next_token.cancel()
+        if not next_token.done():
+            break
+        yield next_token.result()
+    
+    # Flush tokens that arrived in the same tick the chain finished
+    while not handler.queue.empty():
+        yield handler.queue.get_nowait()
+
+class AnnieMacEngine:
+    """
+    The parts of the chat agent that are the same for every listener: the
+    LLM client, prompt, chain, DB sessions, artist index and music API.
+    
+    Build it once per process with get_chat_engine() and share it between
+    AnnieMacAgent sessions, which only hold their own conversation memory.
+    """
+    
+    def __init__(self, llm=None, summary_llm=None):
+        # llm and summary_llm default to OpenAI; benchmarks pass in stand-ins
+        self.llm = llm or ChatOpenAI(
+            model_name="gpt-3.5-turbo",
+            temperature=0.7,
+            streaming=True,
+            openai_api_key=os.getenv('OPENAI_API_KEY')
+        )
+        
+        # Create async session maker
+        self.async_session = sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+        # Everything the chat path does is a read, which may go to a replica
+        self.read_session = read_session
+        
+        self.prompt = ChatPromptTemplate.from_messages([
+            SystemMessagePromptTemplate.from_template(SYSTEM_PROMPT),
             MessagesPlaceholder(variable_name="chat_history"),
-            ("human", "{message}"),
+            HumanMessagePromptTemplate.from_template("{message}"),
         ])
         
+        # No memory here: each session passes its own chat_history per call
         self.conversation_chain = LLMChain(
             llm=self.llm,
             prompt=self.prompt,
-            memory=self.memory,
-            verbose=True
+            verbose=CHAT_CHAIN_VERBOSE
         )
         
+        # Folds old turns into a running summary for TokenBudgetMemory
+        self.summary_chain = LLMChain(
+            llm=summary_llm or ChatOpenAI(
+                model_name="gpt-3.5-turbo",
+                temperature=0,
+                openai_api_key=os.getenv('OPENAI_API_KEY')
+            ),
+            prompt=SUMMARY_PROMPT
+        )
+        self.system_prompt_tokens = self.count_tokens(SYSTEM_PROMPT)
+        # Caps concurrent generations and queues sessions fairly for a slot
+        self.admission = llm_admission
+        
         self.music_api = MusicNerdAPI()
+        self.page_index = ArtistPageIndex()
+        self._ingesting = set()
+        # Sessions asking about the same artists at once share one DB load
+        self.profile_loads = SingleFlight("profile_load")
+        self.response_cache = None
+        if RESPONSE_CACHE_ENABLED:
+            self.response_cache = ResponseCache(
+                max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+                ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+                similarity_threshold=float(RESPONSE_CACHE_SIMILARITY) if RESPONSE_CACHE_SIMILARITY else None,
+                embeddings=self.page_index.embeddings
+            )
+        
+        # Loaded from the DB on first use, then kept current by ORM events and
+        # by refresh_artist_indexes for writes made elsewhere
+        self.artist_matcher = ArtistNameMatcher()
+        artist_matcher.attach_to_model(self.artist_matcher)
+        self.fuzzy_index = FuzzyArtistIndex()
+        fuzzy_index.attach_to_model(self.fuzzy_index)
+        # Genre names, refreshed with the artist index
+        self.genre_matcher = ArtistNameMatcher()
+        self.artist_search = ArtistSearch(self.read_session)
+        # Precomputed similar artists, built in the background on first use
+        self.recommender = ArtistRecommender(self.read_session, self.page_index)
+        self._matcher_loaded = False
+        self._matcher_lock: Optional[asyncio.Lock] = None
+        self._index_version = 0
+        self._index_refresher: Optional[asyncio.Future] = None
     
-    def extract_artist_names(self, text: str) -> List[str]:
+    def count_tokens(self, text: str) -> int:
+        try:
+            return self.llm.get_num_tokens(text)
+        except Exception:
+            return approximate_token_count(text)
+    
+    def new_memory(self) -> TokenBudgetMemory:
+        if MEMORY_MODE == "buffer":
+            return TokenBudgetMemory(count_tokens=self.count_tokens, max_tokens=None, keep_turns=None)
+        return TokenBudgetMemory(
+            count_tokens=self.count_tokens,
+            summarizer=self.summary_chain,
+            max_tokens=MEMORY_MAX_TOKENS,
+            keep_turns=MEMORY_KEEP_TURNS
+        )
+    
+    async def load_artist_matcher(self, force: bool = False):
         """
-        Enhanced artist name extraction with better handling of multi-word artist names
+        Build the artist name index, fuzzy resolver and genre index from the DB
         """
-        try:
-            async with self.async_session() as session:
-                known_artists = [artist.name.lower() for artist in session.query(Artist).all()]
+        if self._matcher_loaded and not force:
+            return
+        if self._matcher_lock is None:
+            self._matcher_lock = asyncio.Lock()
+        async with self._matcher_lock:
+            if self._matcher_loaded and not force:
+                return
+            await self._rebuild_artist_indexes()
+            self._matcher_loaded = True
+            self.recommender.start()
+            if self._index_refresher is None:
+                self._index_refresher = asyncio.ensure_future(self.run_index_refresher())
+    
+    async def _rebuild_artist_indexes(self):
+        async with self.read_session() as session:
+            version = await get_catalogue_version(session)
+            artists = (await session.execute(select(Artist.id, Artist.name))).all()
+            aliases = (await session.execute(select(ArtistAlias.artist_id, ArtistAlias.alias))).all()
+            genres = (await session.execute(select(Genre.name))).scalars().all()
+        
+        def rebuild():
+            self.artist_matcher.rebuild(name for _, name in artists if name)
+            self.genre_matcher.rebuild(name for name in genres if name)
+            self.fuzzy_index.rebuild(artists, aliases)
+        
+        # Each index is swapped in whole, so chat turns keep using the old ones meanwhile
+        await asyncio.get_running_loop().run_in_executor(None, rebuild)
+        self._index_version = version
+    
+    async def run_index_refresher(self, interval_seconds: float = ARTIST_INDEX_REFRESH_SECONDS):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.refresh_artist_indexes()
+            except Exception as e:
+                logger.warning(f"Could not refresh artist indexes: {e}")
+    
+    async def refresh_artist_indexes(self):
+        """
+        Apply artists written since the indexes were loaded by anything that
+        fires no ORM events in this process: the bulk importer, seed_db, the
+        crawler or another API worker. Only the artists stamped with a newer
+        catalogue version are read, unless there are so many that a rebuild
+        is cheaper.
+        """
+        if not self._matcher_loaded:
+            return
+        async with self._matcher_lock:
+            async with self.read_session() as session:
+                version = await get_catalogue_version(session)
+                if version == self._index_version:
+                    return
+                changed = (await session.execute(artists_changed_since(self._index_version))).scalars().all()
+            if len(changed) > ARTIST_INDEX_REBUILD_FRACTION * len(self.fuzzy_index):
+                await self._rebuild_artist_indexes()
+                logger.info(f"Rebuilt the name indexes after {len(changed)} artists changed")
+                return
+            
+            async with self.read_session() as session:
+                artists, aliases = [], {}
+                for offset in range(0, len(changed), 500):
+                    chunk = changed[offset:offset + 500]
+                    artists += (await session.execute(
+                        select(Artist.id, Artist.name).where(Artist.id.in_(chunk))
+                    )).all()
+                    for artist_id, alias in await session.execute(
+                        select(ArtistAlias.artist_id, ArtistAlias.alias).where(ArtistAlias.artist_id.in_(chunk))
+                    ):
+                        aliases.setdefault(artist_id, []).append(alias)
+                genres = (await session.execute(select(Genre.name))).scalars().all()
+                
+                # Deleted artists leave no stamp behind, only a shorter catalogue
+                has_name = (Artist.name.isnot(None), Artist.name != "")
+                named = (await session.execute(select(func.count(Artist.id)).where(*has_name))).scalar()
+                expected = (self.fuzzy_index.artist_ids() - set(changed)) | {
+                    artist_id for artist_id, name in artists if name
+                }
+                removed = set(changed) - {artist_id for artist_id, _ in artists}
+                if named != len(expected):
+                    live = set((await session.execute(select(Artist.id).where(*has_name))).scalars().all())
+                    removed |= expected - live
             
-            # Look for exact matches of known artists (case insensitive)
-            found_artists = []
-            text_lower = text.lower()
-            for artist in known_artists:
-                if artist in text_lower:
-                    # Get the original artist name with correct capitalization
-                    async with self.async_session() as session:
-                        artist_obj = await session.get(Artist, artist)
-                        if artist_obj:
-                            found_artists.append(artist_obj.name)
+            def apply():
+                for artist_id, name in artists:
+                    previous = self.fuzzy_index.name_of(artist_id)
+                    if previous and normalize_artist_name(previous) != normalize_artist_name(name or ""):
+                        self.artist_matcher.remove(previous)
+                    if not name:
+                        self.fuzzy_index.remove(artist_id)
+                        continue
+                    # Most changes (bios, links) leave the name alone; re-adding
+                    # it would make the matcher rebuild its automaton for nothing
+                    if name != previous or name not in self.artist_matcher:
+                        self.artist_matcher.add(name)
+                    self.fuzzy_index.replace(artist_id, name, aliases.get(artist_id, ()))
+                for artist_id in removed:
+                    previous = self.fuzzy_index.name_of(artist_id)
+                    if previous:
+                        self.artist_matcher.remove(previous)
+                    self.fuzzy_index.remove(artist_id)
+                self.genre_matcher.add_many(name for name in genres if name and name not in self.genre_matcher)
+                # Build the new automata here in the executor, not in a later find()
+                self.artist_matcher.refresh()
+                self.genre_matcher.refresh()
             
-            return found_artists
+            await asyncio.get_running_loop().run_in_executor(None, apply)
+            self._index_version = version
+            logger.info(f"Applied {len(artists)} changed and {len(removed)} removed artists to the name indexes")
+    
+    async def resolve_artist_name(self, artist_name: str) -> Optional[int]:
+        """Artist id for a possibly misspelled or partial name"""
+        await self.load_artist_matcher()
+        match = self.fuzzy_index.best(artist_name)
+        return match[0] if match else None
+    
+    async def extract_artist_names(self, text: str) -> List[str]:
+        """
+        Find known artists mentioned in text, returning their canonical names.
+        
+        Uses the shared Aho-Corasick index, so the cost is a single pass over
+        the message regardless of catalogue size and needs no DB round trip.
+        """
+        try:
+            await self.load_artist_matcher()
+            with span("extract_artists"):
+                return self.artist_matcher.find(text)
         except Exception as e:
-            print(f"Warning: Could not query artists: {str(e)}")
+            logger.warning(f"Could not query artists: {str(e)}")
             return []
     
+    @staticmethod
+    def _artist_profile(artist: Artist) -> Dict:
+        return {
+            "name": artist.name,
+            "bio": artist.bio,
+            "genres": artist.genres.split(",") if artist.genres else [],
+            "social_media": {sm.platform: sm.handle for sm in artist.social_media},
+            "platform_links": {pl.platform: pl.url for pl in artist.platform_links}
+        }
+    
+    def _profile_query(self):
+        # Socials are joined in, links arrive in one extra IN query, so a
+        # batch costs two round trips without a socials x links product
+        return select(Artist).options(
+            joinedload(Artist.social_media),
+            selectinload(Artist.platform_links)
+        )
+    
+    async def get_artists_info(self, artist_names: List[str]) -> Dict[str, Dict]:
+        """
+        Load the profiles for several artists at once, keyed by canonical name
+        """
+        keys = {normalize_artist_name(name) for name in artist_names} - {""}
+        if not keys:
+            return {}
+        with span("db_load"):
+            return await self.profile_loads.do(frozenset(keys), lambda: self._load_profiles(keys))
+    
+    async def _load_profiles(self, keys) -> Dict[str, Dict]:
+        async with self.read_session() as session:
+            result = await session.execute(
+                self._profile_query().where(Artist.name_key.in_(keys))
+            )
+            artists = result.unique().scalars().all()
+            return {artist.name: self._artist_profile(artist) for artist in artists}
+    
     async def get_artist_info(self, artist_name: str) -> Dict:
-        async with self.async_session() as session:
+        key = normalize_artist_name(artist_name)
+        if not key:
+            return {}
+        with span("db_load"):
+            return await self.profile_loads.do(key, lambda: self._load_profile(artist_name, key))
+    
+    async def _load_profile(self, artist_name: str, key: str) -> Dict:
+        async with self.read_session() as session:
             result = await session.execute(
-                "SELECT * FROM artists WHERE name ILIKE :name",
-                {"name": f"%{artist_name}%"}
+                self._profile_query().where(Artist.name_key == key)
             )
-            artist = result.first()
+            artist = result.unique().scalars().first()
+            if not artist:
+                # Typos, punctuation variants, aliases and partial names
+                artist_id = await self.resolve_artist_name(artist_name)
+                if artist_id is not None:
+                    result = await session.execute(
+                        self._profile_query().where(Artist.id == artist_id)
+                    )
+                    artist = result.unique().scalars().first()
             if not artist:
                 return {}
             
-            return {
-                "name": artist.name,
-                "bio": artist.bio,
-                "genres": artist.genres.split(",") if artist.genres else [],
-                "social_media": {sm.platform: sm.handle for sm in artist.social_media},
-                "platform_links": {pl.platform: pl.url for pl in artist.platform_links}
-            }
+            return self._artist_profile(artist)
     
-    async def chat(self, user_input: str) -> str:
+    async def page_context(self, question: str, pages: Dict[str, Dict]) -> str:
+        """
+        The parts of the artists' pages most relevant to question, within
+        RETRIEVAL_CONTEXT_TOKENS.
+        
+        Pages that are not in the retrieval index yet are queued for
+        ingestion and contribute only their opening text this turn. Page
+        text is only loaded for those; indexed pages are searched by
+        embedding alone.
+        """
+        if not pages:
+            return ""
+        
+        def lookup():
+            # The index and the page bodies both live in SQLite, so all of
+            # this runs in one executor hop rather than on the event loop
+            indexed = [artist for artist in pages if self.page_index.is_indexed(artist)]
+            texts = {}
+            for artist, page in pages.items():
+                if artist not in indexed:
+                    text = self.music_api.get_page_text(artist, page)
+                    if text:
+                        texts[artist] = text
+            hits = []
+            if indexed:
+                try:
+                    hits = self.page_index.search(
+                        question, indexed, k=RETRIEVAL_TOP_K,
+                        max_tokens=RETRIEVAL_CONTEXT_TOKENS, count_tokens=self.count_tokens
+                    )
+                except Exception as e:
+                    logger.warning(f"Could not search artist pages: {str(e)}")
+            return texts, hits
+        
+        texts, hits = await asyncio.get_running_loop().run_in_executor(None, lookup)
+        pending = list(texts)
+        for artist in pending:
+            self.schedule_ingest(artist, texts[artist])
+        
+        excerpts: Dict[str, List[str]] = {}
+        used = 0
+        for hit in hits:
+            excerpts.setdefault(hit["artist"], []).append(hit["text"])
+            used += self.count_tokens(hit["text"])
+        
+        if pending:
+            # Roughly four characters per token
+            share = max(0, RETRIEVAL_CONTEXT_TOKENS - used) // len(pending) * 4
+            for artist in pending:
+                if share:
+                    excerpts[artist] = [texts[artist].strip()[:share]]
+        
+        context = ""
+        for artist, texts in excerpts.items():
+            context += f"\nInformation about {artist} from musicnerd.xyz:\n" + "\n...\n".join(texts) + "\n"
+        return context
+    
+    def schedule_ingest(self, artist: str, page: str):
+        """Index a page in the background, once even if several turns ask for it"""
+        if artist in self._ingesting:
+            return
+        self._ingesting.add(artist)
+        
+        async def ingest():
+            try:
+                if await self.page_index.aingest(artist, page):
+                    self.recommender.note_page_indexed(artist)
+            except Exception as e:
+                logger.warning(f"Could not index page for {artist}: {str(e)}")
+            finally:
+                self._ingesting.discard(artist)
+        
+        asyncio.ensure_future(ingest())
+    
+    async def build_context(self, user_input: str, mentioned_artists: Optional[List[str]] = None) -> str:
+        """
+        Artist context we know about for the user's message ("" if none)
+        """
+        context = ""
+        # Try to extract artist info
+        if mentioned_artists is None:
+            mentioned_artists = await self.extract_artist_names(user_input)
+        logger.debug("Found artists: %s", mentioned_artists)
+        
+        if mentioned_artists:
+            artist_info = await self.get_artists_info(mentioned_artists)
+            # Fetch the musicnerd.xyz pages concurrently without blocking the loop
+            scraped = await asyncio.gather(
+                *(self.music_api.aget_artist_info(artist) for artist in artist_info)
+            )
+            pages = {}
+            for (artist, info), page in zip(artist_info.items(), scraped):
+                logger.debug("Info for %s: %s", artist, info)
+                if page:
+                    pages[artist] = page
+            context = await self.page_context(user_input, pages)
+        else:
+            context = await self.genre_context(user_input)
+        
+        return context
+    
+    async def genre_context(self, user_input: str) -> str:
+        """Artists we know for each genre the message mentions ("" if none)"""
         try:
+            genres = self.genre_matcher.find(user_input)[:2]
             context = ""
-            # Try to extract artist info
-            mentioned_artists = self.extract_artist_names(user_input)
-            print(f"Found artists: {mentioned_artists}")  # Debug print
+            for genre in genres:
+                artists = await self.artist_search.artists_by_genre(genre, limit=GENRE_CONTEXT_ARTISTS)
+                if artists:
+                    names = ", ".join(artist["name"] for artist in artists)
+                    context += f"\nArtists in the database tagged {genre}: {names}\n"
+            return context
+        except Exception as e:
+            logger.warning(f"Could not look up genres: {str(e)}")
+            return ""
+    
+    def recommend(self, artist_names: List[str]) -> List[str]:
+        """Similar artists for the ones mentioned, from the precomputed index"""
+        try:
+            return self.recommender.recommend(artist_names, limit=RECOMMENDATIONS_PER_TURN)
+        except Exception as e:
+            logger.warning(f"Could not recommend artists: {str(e)}")
+            return []
+    
+    async def similar_artists(self, artist_name: str, limit: int = 10) -> Optional[List[Dict]]:
+        """
+        Artists most like artist_name ([] if unknown), or None while the
+        similarity index is still being built
+        """
+        # Also starts the first build, if nothing has yet
+        artist_id = await self.resolve_artist_name(artist_name)
+        if not self.recommender.ready:
+            return None
+        return self.recommender.similar(artist_id, limit) if artist_id is not None else []
+    
+    def compose_input(self, user_input: str, context: str) -> str:
+        # Add the context to the user input
+        if context:
+            user_input = f"[Context: {context}] {user_input}"
+            logger.debug("Final input with context: %.200s...", user_input)
+        
+        return user_input
+    
+    async def build_input(self, user_input: str) -> str:
+        """
+        Prefix the user's message with any artist context we know about
+        """
+        return self.compose_input(user_input, await self.build_context(user_input))
+    
+    async def stream_reply(self, message: str, chat_history: List, handler: AsyncCallbackHandler) -> str:
+        """Run the chain for one turn, streaming tokens to handler"""
+        return await self.conversation_chain.arun(
+            message=message, chat_history=chat_history, callbacks=[handler]
+        )
+
+_chat_engine: Optional[AnnieMacEngine] = None
+
+def get_chat_engine() -> AnnieMacEngine:
+    """The process-wide engine shared by every chat session"""
+    global _chat_engine
+    if _chat_engine is None:
+        _chat_engine = AnnieMacEngine()
+    return _chat_engine
+
+class AnnieMacAgent:
+    """
+    One listener's conversation with Annie.
+    
+    Holds only the conversation memory; everything expensive lives on the
+    shared AnnieMacEngine, so a session costs little more than its history.
+    """
+    
+    def __init__(self, chat_engine: Optional[AnnieMacEngine] = None):
+        self.engine = chat_engine or get_chat_engine()
+        self.memory = self.engine.new_memory()
+        self.created_at = time.monotonic()
+        self.last_active = self.created_at
+    
+    async def extract_artist_names(self, text: str) -> List[str]:
+        return await self.engine.extract_artist_names(text)
+    
+    async def get_artist_info(self, artist_name: str) -> Dict:
+        return await self.engine.get_artist_info(artist_name)
+    
+    def memory_bytes(self) -> int:
+        """Approximate memory held by this session's conversation"""
+        messages = self.memory.messages
+        return sys.getsizeof(self) + sum(
+            sys.getsizeof(message) + sys.getsizeof(message.content) for message in messages
+        )
+    
+    async def chat_stream(self, user_input: str) -> AsyncIterator[Dict]:
+        """
+        Stream a reply as it is generated.
+        
+        Yields {"type": "delta", "content": token} frames while the LLM is
+        producing tokens, then a single {"type": "assistant", "response": text}
+        frame holding the complete reply, the turn's token usage and artists
+        similar to the ones mentioned.
+        
+        Generation waits for a slot from the engine's admission controller.
+        When the LLM is saturated the final frame carries "error":
+        "overloaded" and no usage. Closing the stream early (e.g. when the
+        client disconnects) cancels the generation.
+        """
+        self.last_active = time.monotonic()
+        metrics.start_turn()
+        turn_started = time.perf_counter()
+        handler = TokenQueueHandler()
+        usage = None
+        cached = False
+        outcome = "error"
+        error = None
+        mentioned_artists: List[str] = []
+        try:
+            mentioned_artists = await self.engine.extract_artist_names(user_input)
+            # Includes the DB, page cache and scrape stages it waits on
+            with span("prompt_assembly"):
+                context = await self.engine.build_context(user_input, mentioned_artists)
+                message = self.engine.compose_input(user_input, context)
+                chat_history = await self.memory.load_messages()
             
-            if mentioned_artists:
-                artist_info = {}
-                for artist in mentioned_artists:
-                    info = await self.get_artist_info(artist)
-                    print(f"Info for {artist}: {info}")  # Debug print
-                    if info:
-                        artist_info[artist] = info
-                        # Add the raw content to the context
-                        if 'raw_content' in info:
-                            context += f"\nInformation about {artist} from musicnerd.xyz:\n{info['raw_content']}\n"
-                            print(f"Added raw content for {artist}")  # Debug print
-                
-            # Add the context to the user input
-            if context:
-                user_input = f"[Context: {context}] {user_input}"
-                print(f"Final input with context: {user_input[:200]}...")  # Debug print
+            response = None
+            response_cache = self.engine.response_cache
+            if response_cache is not None:
+                with span("response_cache"):
+                    history_fingerprint = response_cache.history_fingerprint(chat_history)
+                    response = await response_cache.get(user_input, context, history_fingerprint)
+                cached = response is not None
             
-            response = await self.conversation_chain.arun(
-                message=user_input
-            )
+            if cached:
+                yield {"type": "delta", "content": response}
+            else:
+                # Each session is one client in the admission controller's fair queue
+                async with self.engine.admission.slot(self):
+                    llm_started = time.perf_counter()
+                    first_token = True
+                    generation = asyncio.ensure_future(
+                        self.engine.stream_reply(message, chat_history, handler)
+                    )
+                    try:
+                        async for token in relay_tokens(generation, handler):
+                            if first_token:
+                                metrics.observe_stage("llm_first_token", time.perf_counter() - llm_started)
+                                first_token = False
+                            yield {"type": "delta", "content": token}
+                        response = generation.result()
+                    finally:
+                        # Stop spending tokens, and free the slot, once nobody is listening
+                        if not generation.done():
+                            generation.cancel()
+                metrics.observe_stage("llm", time.perf_counter() - llm_started)
+                if response_cache is not None:
+                    await response_cache.set(user_input, context, history_fingerprint, response)
             
-            return response
+            # History keeps what the user typed; the retrieved context is
+            # rebuilt for each turn, so it is billed once, in this turn's prompt
+            usage = self.memory.save_turn(
+                user_input, response,
+                prompt_tokens=self.engine.system_prompt_tokens + self.engine.count_tokens(message)
+            )
+            usage["cached"] = cached
+            outcome = "cached" if cached else "llm"
+            if not cached:
+                LLM_TOKENS.inc("prompt", amount=usage["prompt_tokens"])
+                LLM_TOKENS.inc("completion", amount=usage["completion_tokens"])
+        except Overloaded as e:
+            logger.warning(str(e))
+            response = OVERLOADED_RESPONSE
+            outcome = "rejected"
+            error = "overloaded"
         except Exception as e:
-            print(f"Error in chat: {str(e)}")
-            return "Sorry, I'm having trouble processing that right now. Could you try again?" 
\ No newline at end of file
+            logger.error(f"Error in chat: {str(e)}")
+            response = FALLBACK_RESPONSE
+        finally:
+            self.last_active = time.monotonic()
+        
+        frame = {"type": "assistant", "response": response,
+                 "recommendations": self.engine.recommend(mentioned_artists)}
+        if usage:
+            frame["usage"] = usage
+        if error:
+            frame["error"] = error
+        TURNS.inc(outcome)
+        metrics.observe_stage("turn", time.perf_counter() - turn_started)
+        yield frame
+    
+    async def chat_turn(self, user_input: str) -> Dict:
+        """The final frame of chat_stream: reply, usage and recommendations"""
+        result = {"type": "assistant", "response": FALLBACK_RESPONSE, "recommendations": []}
+        async for frame in self.chat_stream(user_input):
+            if frame["type"] == "assistant":
+                result = frame
+        return result
+    
+    async def chat(self, user_input: str) -> str:
+        return (await self.chat_turn(user_input))["response"]
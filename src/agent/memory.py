@@ -0,0 +1,118 @@
+from typing import Callable, Dict, List, Optional
+import asyncio
+import logging
+
+from langchain.chains import LLMChain
+from langchain.schema import AIMessage, BaseMessage, HumanMessage, SystemMessage, get_buffer_string
+
+logger = logging.getLogger(__name__)
+
+def approximate_token_count(text: str) -> int:
+    """Rough token estimate for when no tokenizer is available"""
+    return max(1, len(text) // 4) if text else 0
+
+class TokenBudgetMemory:
+    """
+    Conversation memory with a bounded prompt footprint.
+
+    The most recent keep_turns exchanges are kept verbatim. Older ones, and
+    any recent ones that would push the history past max_tokens, are folded
+    into a running summary by summarizer. Folding happens in the background
+    after a turn finishes and is awaited by the next load_messages(), so it
+    never delays the reply that triggered it. Each fold only feeds the
+    previous summary plus the newly evicted turns to the summarizer.
+
+    With max_tokens=None and keep_turns=None this behaves like a plain
+    buffer that keeps everything.
+    """
+
+    def __init__(self, count_tokens: Callable[[str], int] = approximate_token_count,
+                 summarizer: Optional[LLMChain] = None, max_tokens: Optional[int] = 1500,
+                 keep_turns: Optional[int] = 4):
+        self.count_tokens = count_tokens
+        self.summarizer = summarizer
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.summary = ""
+        self.summary_tokens = 0
+        self.turns: List[Dict] = []
+        self.turn_usage: List[Dict] = []
+        self._to_fold: List[Dict] = []
+        self._folding: Optional[asyncio.Task] = None
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        messages = []
+        if self.summary:
+            messages.append(SystemMessage(content=f"Summary of the conversation so far: {self.summary}"))
+        for turn in self.turns:
+            messages.append(HumanMessage(content=turn["human"]))
+            messages.append(AIMessage(content=turn["ai"]))
+        return messages
+
+    def history_tokens(self) -> int:
+        return self.summary_tokens + sum(turn["tokens"] for turn in self.turns)
+
+    async def load_messages(self) -> List[BaseMessage]:
+        """History to send with the next turn, once any pending fold has finished"""
+        if self._folding is not None and not self._folding.done():
+            try:
+                await asyncio.shield(self._folding)
+            except Exception:
+                pass
+        return self.messages
+
+    def save_turn(self, human: str, ai: str, prompt_tokens: int = 0) -> Dict:
+        """
+        Record a finished exchange and return its token usage.
+
+        prompt_tokens is the size of everything sent for this turn besides
+        the history (system prompt and the message with its context).
+        """
+        history_tokens = self.history_tokens()
+        turn_tokens = self.count_tokens(human) + self.count_tokens(ai)
+        self.turns.append({"human": human, "ai": ai, "tokens": turn_tokens})
+
+        usage = {
+            "prompt_tokens": prompt_tokens + history_tokens,
+            "history_tokens": history_tokens,
+            "completion_tokens": self.count_tokens(ai),
+        }
+        self.turn_usage.append(usage)
+
+        self._trim()
+        return usage
+
+    def _trim(self):
+        evicted = []
+        while self.turns and (
+            (self.keep_turns is not None and len(self.turns) > self.keep_turns)
+            or (self.max_tokens is not None and len(self.turns) > 1
+                and self.history_tokens() > self.max_tokens)
+        ):
+            evicted.append(self.turns.pop(0))
+
+        if not evicted:
+            return
+        if self.summarizer is None:
+            return
+
+        self._to_fold.extend(evicted)
+        if self._folding is None or self._folding.done():
+            self._folding = asyncio.ensure_future(self._fold())
+
+    async def _fold(self):
+        while self._to_fold:
+            batch, self._to_fold = self._to_fold, []
+            new_lines = get_buffer_string([
+                message
+                for turn in batch
+                for message in (HumanMessage(content=turn["human"]), AIMessage(content=turn["ai"]))
+            ])
+            try:
+                self.summary = (await self.summarizer.apredict(
+                    summary=self.summary, new_lines=new_lines
+                )).strip()
+                self.summary_tokens = self.count_tokens(self.summary)
+            except Exception as e:
+                logger.error(f"Could not summarize conversation: {str(e)}")
@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+import asyncio
+import logging
+import time
+
+from .chat_agent import AnnieMacAgent
+
+logger = logging.getLogger(__name__)
+
+class SessionStore:
+    """
+    Bounded map of session id -> AnnieMacAgent.
+
+    Sessions are kept in least-recently-used order. Creating a session when
+    the store is full evicts the least recently used one, and sessions idle
+    for longer than idle_timeout_seconds are dropped by evict_idle(), which
+    run_sweeper() calls periodically.
+    """
+
+    def __init__(self, max_sessions: int = 10000, idle_timeout_seconds: float = 1800,
+                 factory: Callable[[], AnnieMacAgent] = AnnieMacAgent):
+        self.max_sessions = max_sessions
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.factory = factory
+        self._sessions: "OrderedDict[str, AnnieMacAgent]" = OrderedDict()
+        self.created = 0
+        self.evicted_lru = 0
+        self.evicted_idle = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get(self, session_id: str) -> Optional[AnnieMacAgent]:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def get_or_create(self, session_id: str) -> AnnieMacAgent:
+        session = self.get(session_id)
+        if session is not None:
+            return session
+
+        while len(self._sessions) >= self.max_sessions:
+            evicted_id, _ = self._sessions.popitem(last=False)
+            self.evicted_lru += 1
+            logger.info(f"Session store full, evicted {evicted_id}")
+
+        session = self.factory()
+        self._sessions[session_id] = session
+        self.created += 1
+        return session
+
+    def discard(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    def evict_idle(self) -> int:
+        cutoff = time.monotonic() - self.idle_timeout_seconds
+        idle = [sid for sid, session in self._sessions.items() if session.last_active < cutoff]
+        for session_id in idle:
+            del self._sessions[session_id]
+        self.evicted_idle += len(idle)
+        return len(idle)
+
+    async def run_sweeper(self, interval_seconds: float = 60):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            evicted = self.evict_idle()
+            if evicted:
+                logger.info(f"Evicted {evicted} idle chat sessions")
+
+    def stats(self) -> Dict:
+        memory_bytes = sum(session.memory_bytes() for session in self._sessions.values())
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "memory_bytes": memory_bytes,
+            "created": self.created,
+            "evicted_lru": self.evicted_lru,
+            "evicted_idle": self.evicted_idle,
+        }
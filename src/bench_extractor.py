@@ -0,0 +1,57 @@
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+from bs4 import BeautifulSoup
+from src.services.page_extractor import extract_artist_page
+
+def soup_extract(artist_name: str, url: str, html: str) -> dict:
+    """The previous BeautifulSoup-based parser, kept as the baseline"""
+    soup = BeautifulSoup(html, 'html.parser')
+    text_content = soup.get_text()
+    info = {"name": artist_name, "url": url, "raw_content": text_content,
+            "social_links": {}, "platform_links": {}, "releases": [], "bio": "",
+            "page_content": text_content[:1000]}
+    for link in soup.find_all('a'):
+        href = link.get('href', '')
+        if href:
+            if any(platform in href.lower() for platform in ['instagram', 'twitter']):
+                info["social_links"][link.text.strip()] = href
+            elif any(platform in href.lower() for platform in ['spotify', 'soundcloud']):
+                info["platform_links"][link.text.strip()] = href
+    return info
+
+def measure(parse, html: str, runs: int) -> dict:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        parse("artist", "https://www.musicnerd.xyz/artist/fixture", html)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    parse("artist", "https://www.musicnerd.xyz/artist/fixture", html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "median_ms": round(statistics.median(timings), 2),
+        "min_ms": round(min(timings), 2),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare artist page parsers on saved HTML pages")
+    parser.add_argument("pages", nargs="+", help="Saved artist page HTML files")
+    parser.add_argument("--runs", type=int, default=20, help="Timed parses per page and parser")
+    args = parser.parse_args()
+
+    results = {}
+    for path in args.pages:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        results[path] = {
+            "bytes": len(html.encode("utf-8")),
+            "extractor": measure(extract_artist_page, html, args.runs),
+            "beautifulsoup": measure(soup_extract, html, args.runs),
+        }
+    print(json.dumps(results, indent=2))
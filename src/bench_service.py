@@ -0,0 +1,354 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MESSAGE_TEMPLATES = (
+    "What do you think of {a}?",
+    "Have you heard {a} and {b}? Who else sounds like them?",
+    "Tell me something about the latest release from {a}.",
+    "I saw {a} live last night, what should I listen to next?",
+    "Any {genre} artists you'd recommend?",
+)
+
+def summarize(seconds: List[float]) -> Dict:
+    """Count, mean and nearest-rank percentiles in milliseconds"""
+    if not seconds:
+        return {"count": 0}
+    ordered = sorted(seconds)
+
+    def percentile(p: float) -> float:
+        return round(ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, timeout=10)
+        return result.stdout.strip() or None
+    except Exception:
+        return None
+
+def workload(size: int, count: int, hot: int, seed: int) -> List[str]:
+    """
+    Chat messages for a catalogue of size artists. Artists are drawn from
+    a fixed hot set, the way real traffic keeps returning to a few names.
+    """
+    from src.benchmarks.fixtures import GENRES, artist_name
+
+    rng = random.Random(f"{seed}:{size}")
+    hot_set = rng.sample(range(size), min(hot, size))
+    messages = []
+    for _ in range(count):
+        a, b = (artist_name(rng.choice(hot_set)) for _ in range(2))
+        template = rng.choice(MESSAGE_TEMPLATES)
+        messages.append(template.format(a=a, b=b, genre=rng.choice(GENRES[:8])))
+    return messages
+
+async def websocket_turns(app, client_prefix: str, messages: List[str], clients: int) -> Dict:
+    """
+    Run messages as chat turns over the /chat WebSocket, spread across
+    clients concurrent connections that each send their turns in sequence.
+    """
+    from src.benchmarks.asgi import ASGIWebSocket
+
+    first_token, turn, errors = [], [], 0
+
+    async def client(number: int, own: List[str]):
+        nonlocal errors
+        websocket = ASGIWebSocket(app, f"/chat/{client_prefix}-{number}")
+        await websocket.connect()
+        try:
+            for message in own:
+                started = time.perf_counter()
+                first = None
+                await websocket.send_text(message)
+                while True:
+                    frame = json.loads(await websocket.receive_text())
+                    if first is None:
+                        first = time.perf_counter() - started
+                    if frame["type"] == "assistant":
+                        break
+                turn.append(time.perf_counter() - started)
+                first_token.append(first)
+                if "usage" not in frame:
+                    # The endpoint only leaves out usage when the turn failed
+                    errors += 1
+        finally:
+            await websocket.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i, messages[i::clients]) for i in range(clients)))
+    elapsed = time.perf_counter() - started
+    return {
+        "clients": clients,
+        "turns": len(turn),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "turns_per_second": round(len(turn) / elapsed, 2) if elapsed else 0.0,
+        "first_token": summarize(first_token),
+        "turn": summarize(turn),
+    }
+
+async def wait_for_ingests(engine, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while engine._ingesting and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+async def measure_size(args, app, engine, page, size: int, imported: int) -> Dict:
+    from src.agent.chat_agent import AnnieMacAgent
+    from src.benchmarks.fixtures import artist_name, synthetic_artists
+    from src.services.artist_importer import ArtistImporter
+    from src.services.page_extractor import extract_artist_page
+    from src.services.response_cache import ResponseCache
+
+    results: Dict = {"artists": size}
+
+    if size > imported:
+        results["import"] = await ArtistImporter(batch_size=args.batch_size).import_records(
+            synthetic_artists(imported, size), report_every=10 ** 9
+        )
+    engine.music_api.scraper.known_artist_ids = {
+        artist_name(index).lower(): f"bench-{index}" for index in range(size)
+    }
+
+    started = time.perf_counter()
+    await engine.recommender.refresh()
+    results["recommender_build_seconds"] = round(time.perf_counter() - started, 3)
+    results["recommender"] = engine.recommender.stats()
+
+    started = time.perf_counter()
+    await engine.load_artist_matcher(force=True)
+    results["matcher_load_seconds"] = round(time.perf_counter() - started, 3)
+
+    messages = workload(size, args.samples, args.hot_artists, args.seed)
+    extract, mentioned = [], []
+    for message in messages:
+        started = time.perf_counter()
+        names = await engine.extract_artist_names(message)
+        extract.append(time.perf_counter() - started)
+        if names:
+            mentioned.append(names)
+    results["extract_artist_names"] = summarize(extract)
+
+    profiles = []
+    for names in mentioned:
+        started = time.perf_counter()
+        await engine.get_artists_info(names)
+        profiles.append(time.perf_counter() - started)
+    results["profile_load"] = summarize(profiles)
+
+    if args.warmup_turns:
+        await websocket_turns(app, f"warmup-{size}", workload(size, args.warmup_turns, args.hot_artists,
+                                                               args.seed + 1), args.clients)
+        await wait_for_ingests(engine)
+    turns = workload(size, args.clients * args.turns, args.hot_artists, args.seed + 2)
+    results["websocket"] = await websocket_turns(app, f"bench-{size}", turns, args.clients)
+    await wait_for_ingests(engine)
+
+    # Page cache: a miss scrapes the fixture server, then L1 and L2 hits
+    music_api = engine.music_api
+    rng = random.Random(f"{args.seed}:pages:{size}")
+    indexes = rng.sample(range(size), min(args.scrapes, size))
+    names = [artist_name(index) for index in indexes]
+    miss, memory_hit, disk_hit = [], [], []
+    for name in names:
+        music_api.cache.delete(name)
+        started = time.perf_counter()
+        await music_api.aget_artist_info(name)
+        miss.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        await music_api.aget_artist_info(name)
+        memory_hit.append(time.perf_counter() - started)
+        music_api.cache.memory.clear()
+        started = time.perf_counter()
+        await music_api.aget_artist_info(name)
+        disk_hit.append(time.perf_counter() - started)
+    results["page_cache"] = {"miss_scrape": summarize(miss), "memory_hit": summarize(memory_hit),
+                             "disk_hit": summarize(disk_hit)}
+
+    # Response cache: the same first question from fresh sessions, once its
+    # pages are indexed so the injected context no longer changes
+    questions = [message for message in messages if engine.artist_matcher.find(message)][:args.cache_questions]
+    for question in questions:
+        await AnnieMacAgent(engine).chat_turn(question)
+    await wait_for_ingests(engine)
+    engine.response_cache = ResponseCache(embeddings=engine.page_index.embeddings)
+    cached_miss, cached_hit = [], []
+    try:
+        for question in questions:
+            started = time.perf_counter()
+            await AnnieMacAgent(engine).chat_turn(question)
+            cached_miss.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            turn = await AnnieMacAgent(engine).chat_turn(question)
+            cached_hit.append(time.perf_counter() - started)
+            if not turn.get("usage", {}).get("cached"):
+                logging.warning(f"Expected a response cache hit for {question!r}")
+        results["response_cache"] = {"miss_turn": summarize(cached_miss), "hit_turn": summarize(cached_hit),
+                                     "stats": engine.response_cache.stats()}
+    finally:
+        engine.response_cache = None
+
+    # scrape_artist end to end against the fixture server, then parsing alone
+    scraper = music_api.scraper
+    scrape, parse = [], []
+    for name in names:
+        started = time.perf_counter()
+        info = scraper.scrape_artist(name)
+        scrape.append(time.perf_counter() - started)
+        if info is None:
+            logging.warning(f"Fixture scrape of {name} failed")
+    pages = [page(index) for index in indexes]
+    for page in pages:
+        for _ in range(args.parse_runs):
+            started = time.perf_counter()
+            extract_artist_page("artist", "http://fixture/artist", page)
+            parse.append(time.perf_counter() - started)
+    results["scrape_artist"] = summarize(scrape)
+    results["parse_artist_page"] = summarize(parse)
+    results["page_bytes"] = round(sum(len(page.encode("utf-8")) for page in pages) / len(pages)) if pages else 0
+    return results
+
+async def run(args) -> Dict:
+    from src.agent import chat_agent
+    from src.agent.chat_agent import AnnieMacEngine
+    from src.benchmarks.fakes import FakeChatModel, FakeEmbeddings
+    from src.benchmarks.fixtures import FixtureServer, artist_page
+    from src.services import web_scraper
+    from src.services.registry import registry
+    from api.main import app, sessions
+
+    logging.getLogger().setLevel(args.log_level)
+    os.chdir(args.workdir)
+
+    saved_pages = []
+    for path in args.pages:
+        with open(path, encoding="utf-8") as f:
+            saved_pages.append(f.read())
+
+    def page(index: int) -> str:
+        return saved_pages[index % len(saved_pages)] if saved_pages else artist_page(index)
+
+    def page_for(artist_id: str) -> Optional[str]:
+        prefix, _, index = artist_id.partition("-")
+        return page(int(index)) if prefix == "bench" and index.isdigit() else None
+
+    server = FixtureServer(page_for, latency=args.page_latency_ms / 1000).start()
+
+    registry.register("embeddings", FakeEmbeddings)
+    llm = FakeChatModel(reply_tokens=args.reply_tokens, first_token_latency=args.first_token_ms / 1000,
+                        token_latency=args.token_ms / 1000)
+    engine = AnnieMacEngine(llm=llm, summary_llm=llm)
+    chat_agent._chat_engine = engine
+    engine.music_api.scraper.base_url = server.base_url
+    engine.music_api.scrape_on_miss = True
+    # The fixture server is not the real site; don't throttle requests to it
+    web_scraper._token_bucket = web_scraper.AsyncTokenBucket(10 ** 9, burst=10 ** 6)
+
+    await app.router.startup()
+    results = {}
+    imported = 0
+    try:
+        for size in args.sizes:
+            logging.warning(f"Benchmarking {size} artists")
+            results[str(size)] = await measure_size(args, app, engine, page, size, imported)
+            imported = max(imported, size)
+    finally:
+        await app.router.shutdown()
+        server.close()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {key: value for key, value in vars(args).items() if key not in ("workdir", "output")},
+        },
+        "fixture_requests": server.requests,
+        "sessions": sessions.stats(),
+        "sizes": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Offline service benchmark with a fake LLM and a local musicnerd.xyz stand-in"
+    )
+    parser.add_argument("--sizes", default="10,10000,100000",
+                        help="Comma-separated catalogue sizes, measured in increasing order")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent WebSocket clients")
+    parser.add_argument("--turns", type=int, default=10, help="Measured turns per client and size")
+    parser.add_argument("--warmup-turns", type=int, default=20, help="Unmeasured turns before each size")
+    parser.add_argument("--samples", type=int, default=500, help="Messages for the extraction and profile timings")
+    parser.add_argument("--hot-artists", type=int, default=50, help="Distinct artists the chat workload mentions")
+    parser.add_argument("--scrapes", type=int, default=20, help="Pages fetched per size for the scrape and cache timings")
+    parser.add_argument("--cache-questions", type=int, default=10, help="Questions for the response cache timings")
+    parser.add_argument("--parse-runs", type=int, default=5, help="Timed parses per page")
+    parser.add_argument("--pages", nargs="*", default=[],
+                        help="Saved artist page HTML files to serve instead of generated pages")
+    parser.add_argument("--page-latency-ms", type=float, default=0, help="Fixture server delay per response")
+    parser.add_argument("--reply-tokens", type=int, default=40, help="Tokens per fake LLM reply")
+    parser.add_argument("--first-token-ms", type=float, default=200, help="Fake LLM time to first token")
+    parser.add_argument("--token-ms", type=float, default=10, help="Fake LLM time between tokens")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Artists per import transaction")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the chat workload")
+    parser.add_argument("--workdir", help="Where the database and caches go; a temporary directory by default")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+    args.sizes = sorted(int(size) for size in args.sizes.split(","))
+    args.pages = [os.path.abspath(path) for path in args.pages]
+    if args.output:
+        args.output = os.path.abspath(args.output)
+
+    temporary = args.workdir is None
+    args.workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="bench-service-"))
+    os.makedirs(args.workdir, exist_ok=True)
+    # Read by the modules at import time, so set before run() imports them
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(args.workdir, 'bench.db')}"
+    os.environ.pop("DATABASE_READ_URL", None)
+    # Each size reloads the indexes itself; background refreshes would skew the timings
+    os.environ["RECOMMENDER_REFRESH_SECONDS"] = str(10 ** 6)
+    os.environ["ARTIST_INDEX_REFRESH_SECONDS"] = str(10 ** 6)
+    os.environ["NO_PROXY"] = ",".join(filter(None, [os.environ.get("NO_PROXY"), "127.0.0.1", "localhost"]))
+
+    try:
+        # Keep stdout for the JSON results, whatever else the imported modules write
+        with contextlib.redirect_stdout(sys.stderr):
+            results = asyncio.run(run(args))
+    finally:
+        if temporary:
+            shutil.rmtree(args.workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
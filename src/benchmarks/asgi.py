@@ -0,0 +1,61 @@
+from typing import Dict, Optional
+import asyncio
+
+class WebSocketClosed(Exception):
+    pass
+
+class ASGIWebSocket:
+    """
+    WebSocket client that talks to an ASGI app in-process.
+
+    Frames go through the app's real routing and endpoint code, but no
+    socket or server sits in between, so timings leave out the network
+    and the WebSocket framing.
+    """
+
+    def __init__(self, app, path: str):
+        self.app = app
+        self.scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "http_version": "1.1",
+            "path": path,
+            "raw_path": path.encode("utf-8"),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", b"bench")],
+            "client": ("127.0.0.1", 0),
+            "server": ("bench", 80),
+            "subprotocols": [],
+        }
+        self._incoming: asyncio.Queue = asyncio.Queue()
+        self._outgoing: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _send(self, message: Dict):
+        self._outgoing.put_nowait(message)
+
+    async def _receive(self) -> Dict:
+        return await self._incoming.get()
+
+    async def connect(self):
+        self._incoming.put_nowait({"type": "websocket.connect"})
+        self._task = asyncio.ensure_future(self.app(self.scope, self._receive, self._send))
+        message = await self._outgoing.get()
+        if message["type"] != "websocket.accept":
+            raise WebSocketClosed(f"Connection refused: {message}")
+
+    async def send_text(self, text: str):
+        self._incoming.put_nowait({"type": "websocket.receive", "text": text})
+
+    async def receive_text(self) -> str:
+        message = await self._outgoing.get()
+        if message["type"] == "websocket.close":
+            raise WebSocketClosed(f"Closed with code {message.get('code')}")
+        return message["text"]
+
+    async def close(self):
+        self._incoming.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        if self._task is not None:
+            await self._task
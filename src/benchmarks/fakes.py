@@ -0,0 +1,85 @@
+from typing import List, Optional
+import asyncio
+import hashlib
+import random
+import time
+
+import numpy as np
+from langchain.callbacks.manager import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain.chat_models.base import BaseChatModel
+from langchain.embeddings.base import Embeddings
+from langchain.schema import AIMessage, BaseMessage, ChatGeneration, ChatResult
+
+from src.agent.memory import approximate_token_count
+
+_WORDS = (
+    "oh", "the", "track", "is", "brilliant", "I", "played", "it", "on", "the", "show", "and",
+    "the", "dancefloor", "went", "wild", "honestly", "that", "bassline", "is", "gorgeous",
+    "you", "have", "to", "hear", "them", "live", "such", "a", "vibe", "love", "it",
+)
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for ChatOpenAI.
+
+    Replies are reply_tokens words chosen from a hash of the last message,
+    so the same prompt always gets the same reply. The first token arrives
+    after first_token_latency seconds and each further one token_latency
+    seconds later, streamed through the callback manager like a real model.
+    """
+
+    reply_tokens: int = 40
+    first_token_latency: float = 0.2
+    token_latency: float = 0.01
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        rng = random.Random(_seed(messages[-1].content if messages else ""))
+        return [rng.choice(_WORDS) + " " for _ in range(self.reply_tokens)]
+
+    @staticmethod
+    def _result(tokens: List[str]) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens).strip()))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None) -> ChatResult:
+        tokens = self._tokens(messages)
+        for i, token in enumerate(tokens):
+            time.sleep(self.first_token_latency if i == 0 else self.token_latency)
+            if run_manager:
+                run_manager.on_llm_new_token(token)
+        return self._result(tokens)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None) -> ChatResult:
+        tokens = self._tokens(messages)
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(self.first_token_latency if i == 0 else self.token_latency)
+            if run_manager:
+                await run_manager.on_llm_new_token(token)
+        return self._result(tokens)
+
+    def get_num_tokens(self, text: str) -> int:
+        return approximate_token_count(text)
+
+class FakeEmbeddings(Embeddings):
+    """Unit vectors seeded from a hash of each text; no model to load"""
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.random.default_rng(_seed(text)).standard_normal(self.dimensions)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
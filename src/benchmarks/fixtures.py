@@ -0,0 +1,165 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional
+import html
+import random
+import threading
+import time
+
+_SYLLABLES = (
+    "ka", "lo", "mi", "ra", "ven", "tor", "sa", "ni", "del", "vo", "ze", "lu", "mar", "pix", "qua", "ro",
+    "shi", "tem", "ul", "bex", "cor", "dan", "el", "fy", "gra", "hol", "ix", "jun", "kri", "lam", "nox", "oss",
+    "pel", "ryn", "sol", "tav", "vex", "wyn", "yar", "zo",
+)
+_PREFIXES = ("", "", "", "", "DJ ", "The ", "MC ")
+_SUFFIXES = ("", "", "", "", "", " Collective", " Sound System", " Trio")
+
+# Weighted towards the front, so a few genres are common and most are rare
+GENRES = (
+    "house", "techno", "electronic", "uk garage", "drum and bass", "hip-hop", "ambient", "disco",
+    "jungle", "dubstep", "grime", "afrobeats", "trance", "breakbeat", "electro", "rap", "r&b",
+    "jazz", "soul", "funk", "idm", "footwork", "amapiano", "gqom", "minimal", "acid", "dub",
+    "bass", "web3", "downtempo",
+)
+
+SOCIAL_PLATFORMS = ("instagram", "twitter", "tiktok")
+LINK_PLATFORMS = {
+    "spotify": "https://open.spotify.com/artist/{handle}",
+    "soundcloud": "https://soundcloud.com/{handle}",
+    "bandcamp": "https://{handle}.bandcamp.com",
+}
+
+def artist_name(index: int) -> str:
+    """A unique, pronounceable name for the index-th synthetic artist"""
+    syllables = []
+    value = index
+    while True:
+        value, digit = divmod(value, len(_SYLLABLES))
+        syllables.append(_SYLLABLES[digit])
+        if value == 0 and len(syllables) >= 3:
+            break
+    core = "".join(syllables).capitalize()
+    rng = random.Random(index)
+    return f"{rng.choice(_PREFIXES)}{core}{rng.choice(_SUFFIXES)}"
+
+def artist_genres(index: int) -> List[str]:
+    rng = random.Random(f"genres:{index}")
+    count = rng.choice((1, 2, 2, 3))
+    picked = []
+    while len(picked) < count:
+        genre = GENRES[(int(rng.paretovariate(1.2)) - 1) % len(GENRES)]
+        if genre not in picked:
+            picked.append(genre)
+    return picked
+
+def artist_handle(index: int) -> str:
+    return artist_name(index).lower().replace(" ", "")
+
+def synthetic_artists(start: int, stop: int) -> Iterator[Dict]:
+    """
+    Artist records for indexes [start, stop) in the importer's JSONL shape.
+
+    The same index always yields the same record, so a catalogue can be
+    grown step by step and reproduced exactly.
+    """
+    for index in range(start, stop):
+        rng = random.Random(f"artist:{index}")
+        name = artist_name(index)
+        genres = artist_genres(index)
+        handle = artist_handle(index)
+        yield {
+            "name": name,
+            "bio": f"{name} makes {' and '.join(genres)} records and has been playing out since {rng.randint(1990, 2023)}.",
+            "genres": ",".join(genres),
+            "socials": [{"platform": platform, "handle": handle}
+                        for platform in rng.sample(SOCIAL_PLATFORMS, rng.randint(0, 2))],
+            "links": [{"platform": platform, "url": LINK_PLATFORMS[platform].format(handle=handle)}
+                      for platform in rng.sample(sorted(LINK_PLATFORMS), rng.randint(1, 2))],
+        }
+
+def artist_page(index: int, paragraphs: int = 12) -> str:
+    """A musicnerd.xyz-like artist page with a bio, links and releases"""
+    rng = random.Random(f"page:{index}")
+    name = html.escape(artist_name(index))
+    handle = artist_handle(index)
+    genres = artist_genres(index)
+    words = [name, "records", "club", "set", "tour", "remix", "label", "radio", "festival", "studio",
+             "debut", "single", "album", "night", "crowd", "sound", "bass", "vocal"] + genres
+    body = "\n".join(
+        f"<p>{' '.join(rng.choice(words) for _ in range(rng.randint(40, 80)))}.</p>"
+        for _ in range(paragraphs)
+    )
+    releases = "\n".join(
+        f'<li><a href="https://open.spotify.com/album/{handle}{i}">Release {i} by {name}</a></li>'
+        for i in range(rng.randint(3, 12))
+    )
+    return f"""<!DOCTYPE html>
+<html><head><title>{name} | MusicNerd</title>
+<meta name="description" content="{name} on MusicNerd">
+<script>window.__DATA__ = {{"artist": "{handle}"}};</script>
+<style>body {{ font-family: sans-serif; }}</style></head>
+<body><nav><a href="/">Home</a> <a href="/artists">Artists</a></nav>
+<main><h1>{name}</h1>
+<section class="artist-bio"><p>{name} is known for {', '.join(genres)}.</p>{body}</section>
+<div class="links">
+<a href="https://instagram.com/{handle}">Instagram</a>
+<a href="https://twitter.com/{handle}">Twitter</a>
+<a href="https://open.spotify.com/artist/{handle}">Spotify</a>
+<a href="https://soundcloud.com/{handle}">SoundCloud</a>
+</div>
+<section class="releases"><h2>Releases</h2><ul>{releases}</ul></section>
+</main><footer>MusicNerd</footer></body></html>"""
+
+class FixtureServer:
+    """
+    Local stand-in for musicnerd.xyz, serving /artist/<id> pages from a
+    background thread.
+
+    page_for(artist_id) returns a page's HTML, or None for a 404. Each
+    response is held back by latency seconds to imitate the network.
+    """
+
+    def __init__(self, page_for: Callable[[str], Optional[str]], latency: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body in one segment, or keep-alive clients stall on delayed ACKs
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                server.requests += 1
+                page = None
+                if self.path.startswith("/artist/"):
+                    page = page_for(self.path[len("/artist/"):])
+                if server.latency:
+                    time.sleep(server.latency)
+                body = (page or "Not found").encode("utf-8")
+                self.send_response(200 if page is not None else 404)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.latency = latency
+        self.requests = 0
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fixture-server", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FixtureServer":
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
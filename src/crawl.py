@@ -0,0 +1,32 @@
+import argparse
+import asyncio
+import logging
+from src.models.database import init_db
+from src.services.crawler import ArtistCrawler
+from src.services.page_extractor import shutdown_parse_pool
+from src.services.web_scraper import close_http_client
+
+logger = logging.getLogger(__name__)
+
+async def run(args):
+    await init_db()
+    crawler = ArtistCrawler(concurrency=args.concurrency, min_interval_hours=args.min_interval_hours)
+    try:
+        while True:
+            await crawler.crawl(force=args.force)
+            if not args.every_minutes:
+                break
+            await asyncio.sleep(args.every_minutes * 60)
+    finally:
+        await close_http_client()
+        shutdown_parse_pool()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh artist pages from musicnerd.xyz")
+    parser.add_argument("--concurrency", type=int, default=4, help="Pages fetched at once")
+    parser.add_argument("--min-interval-hours", type=float, default=6,
+                        help="Skip artists refreshed more recently than this")
+    parser.add_argument("--force", action="store_true", help="Ignore ETags, hashes and intervals")
+    parser.add_argument("--every-minutes", type=float, default=0,
+                        help="Keep running, crawling again after this many minutes")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,27 @@
+import argparse
+import asyncio
+import json
+import logging
+from src.models.database import dispose_engines, init_db
+from src.services.artist_importer import ArtistImporter, read_records
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def run(args):
+    await init_db()
+    importer = ArtistImporter(batch_size=args.batch_size)
+    try:
+        stats = await importer.import_records(read_records(args.path, args.format),
+                                              report_every=args.report_every)
+        print(json.dumps(stats, indent=2))
+    finally:
+        await dispose_engines()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import artists from a JSONL or CSV file")
+    parser.add_argument("path", help="Input file; .gz files are decompressed on the fly")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Artists per transaction")
+    parser.add_argument("--report-every", type=int, default=10, help="Log progress every N batches")
+    asyncio.run(run(parser.parse_args()))
@@ -1,36 +1,145 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import declarative_base
-from sqlalchemy import Column, Integer, String, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import declarative_base, sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Table, bindparam, event, inspect, select, text, update
+from sqlalchemy.orm import relationship, validates
+from typing import Dict, Iterable, List
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 # Use SQLite for simplicity
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite+aiosqlite:///./data.db')
+# Optional replica for read-only traffic; reads go to DATABASE_URL when unset
+DATABASE_READ_URL = os.getenv('DATABASE_READ_URL')
+# Log every statement; useful locally, far too slow for the chat path
+DATABASE_ECHO = os.getenv('DATABASE_ECHO', 'false').lower() in ('1', 'true', 'yes')
 
-# Create async engine
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=True,
-    future=True
-)
+# Connection pool (both profiles)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+# Prepared statements cached per Postgres connection by asyncpg
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '500'))
+
+# SQLite profile, tuned for many concurrent readers and few writers
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KIB = int(os.getenv('SQLITE_CACHE_SIZE_KIB', str(64 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+
+def engine_options(url: str) -> Dict:
+    """create_async_engine keyword arguments for the database behind url"""
+    backend = make_url(url).get_backend_name()
+    options = {"echo": DATABASE_ECHO, "future": True}
+    if backend == "sqlite":
+        if make_url(url).database in (None, "", ":memory:"):
+            return options
+        # aiosqlite defaults to opening a connection per session, which
+        # throws away SQLite's page cache every time
+        options.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            connect_args={"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        )
+    elif backend == "postgresql":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+            connect_args={"statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+        )
+    return options
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers carry on while a writer commits
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    # Negative sizes are in KiB rather than pages
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KIB}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def create_engine_for(url: str) -> AsyncEngine:
+    """Async engine for url with the profile that suits its backend"""
+    new_engine = create_async_engine(url, **engine_options(url))
+    if new_engine.dialect.name == "sqlite":
+        event.listen(new_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    return new_engine
+
+# Create async engines
+engine = create_engine_for(DATABASE_URL)
+read_engine = create_engine_for(DATABASE_READ_URL) if DATABASE_READ_URL else engine
+
+# Sessions for code that only reads, e.g. chat lookups; may lag the writer
+# slightly when DATABASE_READ_URL points at a replica
+read_session = sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
 
 Base = declarative_base()
 
+def normalize_artist_name(name: str) -> str:
+    """Case- and whitespace-insensitive form of an artist name used for matching"""
+    return " ".join(name.lower().split()) if name else ""
+
+def split_genres(genres: str) -> List[str]:
+    """Distinct genres from a comma-joined genres string, in order"""
+    seen = {}
+    for genre in (genres or "").split(","):
+        genre = " ".join(genre.split())
+        if genre and normalize_artist_name(genre) not in seen:
+            seen[normalize_artist_name(genre)] = genre
+    return list(seen.values())
+
+artist_genres = Table(
+    'artist_genres', Base.metadata,
+    Column('artist_id', Integer, ForeignKey('artists.id', ondelete='CASCADE'), primary_key=True),
+    Column('genre_id', Integer, ForeignKey('genres.id'), primary_key=True, index=True),
+)
+
 class Artist(Base):
     __tablename__ = 'artists'
     
     id = Column(Integer, primary_key=True)
     name = Column(String)
+    # Normalized copy of name so lookups hit a unique index instead of scanning
+    name_key = Column(String, unique=True, index=True)
     bio = Column(String)
     genres = Column(String)
+    # Catalogue version of the last write to the artist or its socials, links
+    # or aliases, so readers can load only what changed; see mark_artists_changed
+    updated_version = Column(Integer, index=True)
     social_media = relationship("SocialMedia", back_populates="artist", cascade="all, delete-orphan")
     platform_links = relationship("PlatformLink", back_populates="artist", cascade="all, delete-orphan")
+    # Indexed form of genres; kept in step with it by sync_artist_genres
+    genre_tags = relationship("Genre", secondary=artist_genres, back_populates="artists", viewonly=True)
+    
+    @validates("name")
+    def _sync_name_key(self, key, name):
+        self.name_key = normalize_artist_name(name) or None
+        return name
+
+class Genre(Base):
+    __tablename__ = 'genres'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    key = Column(String, unique=True, index=True)
+    artists = relationship("Artist", secondary=artist_genres, back_populates="genre_tags", viewonly=True)
 
 class SocialMedia(Base):
     __tablename__ = 'social_media'
     
     id = Column(Integer, primary_key=True)
-    artist_id = Column(Integer, ForeignKey('artists.id'))
+    artist_id = Column(Integer, ForeignKey('artists.id'), index=True)
     platform = Column(String)
     handle = Column(String)
     artist = relationship("Artist", back_populates="social_media")
@@ -39,14 +148,309 @@ class PlatformLink(Base):
     __tablename__ = 'platform_links'
     
     id = Column(Integer, primary_key=True)
-    artist_id = Column(Integer, ForeignKey('artists.id'))
+    artist_id = Column(Integer, ForeignKey('artists.id'), index=True)
     platform = Column(String)
     url = Column(String)
     artist = relationship("Artist", back_populates="platform_links")
 
+class ArtistAlias(Base):
+    """Alternative spelling that should resolve to an artist, e.g. "fred again.." """
+    __tablename__ = 'artist_aliases'
+    
+    id = Column(Integer, primary_key=True)
+    artist_id = Column(Integer, ForeignKey('artists.id', ondelete='CASCADE'), index=True)
+    alias = Column(String)
+    alias_key = Column(String, unique=True, index=True)
+    artist = relationship("Artist")
+    
+    @validates("alias")
+    def _sync_alias_key(self, key, alias):
+        self.alias_key = normalize_artist_name(alias) or None
+        return alias
+
+class ScrapeState(Base):
+    """Crawl bookkeeping for an artist's musicnerd.xyz page"""
+    __tablename__ = 'scrape_state'
+    
+    id = Column(Integer, primary_key=True)
+    artist_id = Column(Integer, ForeignKey('artists.id', ondelete='CASCADE'), unique=True, index=True)
+    url = Column(String)
+    etag = Column(String)
+    last_modified = Column(String)
+    content_hash = Column(String)
+    last_status = Column(Integer)
+    last_error = Column(String)
+    last_scraped_at = Column(DateTime)
+    last_changed_at = Column(DateTime)
+    artist = relationship("Artist")
+
+class CatalogueVersion(Base):
+    """
+    Single-row counter bumped whenever artist data changes, so readers can
+    tell whether their copy of the catalogue is current (e.g. for ETags).
+    """
+    __tablename__ = 'catalogue_version'
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+CATALOGUE_MODELS = (Artist, SocialMedia, PlatformLink, ArtistAlias)
+
+def bump_catalogue_version():
+    """Statement that marks the catalogue as changed; run it in the writing transaction"""
+    table = CatalogueVersion.__table__
+    return update(table).where(table.c.id == 1).values(version=table.c.version + 1)
+
+async def get_catalogue_version(session) -> int:
+    version = (await session.execute(
+        select(CatalogueVersion.version).where(CatalogueVersion.id == 1)
+    )).scalar()
+    return version or 0
+
+def mark_artists_changed(connection, artist_ids: Iterable[int]):
+    """
+    Bump the catalogue version and stamp artist_ids with the new version.
+    Takes a sync Connection; run it in the writing transaction, e.g. with
+    run_sync() from async code.
+    """
+    connection.execute(bump_catalogue_version())
+    version = select(CatalogueVersion.version).where(CatalogueVersion.id == 1).scalar_subquery()
+    table = Artist.__table__
+    artist_ids = sorted({artist_id for artist_id in artist_ids if artist_id is not None})
+    for offset in range(0, len(artist_ids), 500):
+        connection.execute(
+            update(table).where(table.c.id.in_(artist_ids[offset:offset + 500])).values(updated_version=version)
+        )
+
+def artists_changed_since(version: int):
+    """Ids of artists written after catalogue version `version`"""
+    return select(Artist.id).where(Artist.updated_version > version)
+
+@event.listens_for(Session, "after_flush")
+def _bump_on_catalogue_change(session, flush_context):
+    changed = [obj for obj in session.new | session.dirty | session.deleted if isinstance(obj, CATALOGUE_MODELS)]
+    if changed:
+        artist_ids = [obj.id if isinstance(obj, Artist) else obj.artist_id for obj in changed]
+        mark_artists_changed(session.connection(), artist_ids)
+
+def sync_artist_genres(connection, artist_ids: Iterable[int]):
+    """
+    Rebuild the genre rows and artist_genres links of artist_ids from
+    their genres strings. Takes a sync Connection; use run_sync() from
+    async code.
+    """
+    artist_ids = list(artist_ids)
+    for offset in range(0, len(artist_ids), 500):
+        chunk = artist_ids[offset:offset + 500]
+        artists = connection.execute(
+            select(Artist.id, Artist.genres).where(Artist.id.in_(chunk))
+        ).all()
+        wanted = {artist_id: split_genres(genres) for artist_id, genres in artists}
+        names = {normalize_artist_name(g): g for genres in wanted.values() for g in genres}
+        
+        genre_ids = {}
+        if names:
+            genre_ids = dict(connection.execute(
+                select(Genre.key, Genre.id).where(Genre.key.in_(list(names)))
+            ).all())
+            missing = [{"key": key, "name": names[key]} for key in names if key not in genre_ids]
+            if missing:
+                connection.execute(Genre.__table__.insert(), missing)
+                genre_ids.update(connection.execute(
+                    select(Genre.key, Genre.id).where(Genre.key.in_([row["key"] for row in missing]))
+                ).all())
+        
+        existing = set(connection.execute(
+            select(artist_genres.c.artist_id, artist_genres.c.genre_id)
+            .where(artist_genres.c.artist_id.in_(chunk))
+        ).all())
+        target = {(artist_id, genre_ids[normalize_artist_name(g)])
+                  for artist_id, genres in wanted.items() for g in genres}
+        removed = existing - target
+        added = target - existing
+        for artist_id, genre_id in removed:
+            connection.execute(artist_genres.delete().where(
+                artist_genres.c.artist_id == artist_id, artist_genres.c.genre_id == genre_id
+            ))
+        if added:
+            connection.execute(artist_genres.insert(),
+                               [{"artist_id": a, "genre_id": g} for a, g in added])
+
+@event.listens_for(Session, "before_flush")
+def _delete_artist_dependents(session, flush_context, instances):
+    """
+    Remove the genre links, aliases and scrape state of artists being
+    deleted before their rows go. ON DELETE CASCADE covers Core deletes on
+    new Postgres schemas, but SQLite only enforces it with foreign_keys on
+    and databases created earlier lack it.
+    """
+    artist_ids = [obj.id for obj in session.deleted if isinstance(obj, Artist) and obj.id is not None]
+    if not artist_ids:
+        return
+    connection = session.connection()
+    for table in (artist_genres, ArtistAlias.__table__, ScrapeState.__table__):
+        for offset in range(0, len(artist_ids), 500):
+            connection.execute(table.delete().where(table.c.artist_id.in_(artist_ids[offset:offset + 500])))
+
+@event.listens_for(Session, "after_flush")
+def _sync_genres_on_write(session, flush_context):
+    changed = [
+        obj.id for obj in session.new | session.dirty | session.deleted
+        if isinstance(obj, Artist) and obj.id is not None
+        and (obj in session.deleted or obj in session.new or inspect(obj).attrs.genres.history.has_changes())
+    ]
+    if changed:
+        # Deleted artists' links are already gone, see _delete_artist_dependents
+        sync_artist_genres(session.connection(), changed)
+
+def create_search_index(connection):
+    """
+    Full-text index over artist name, bio and genres, maintained by the
+    database itself on every write: FTS5 plus triggers on SQLite, a
+    generated tsvector column with a GIN index on Postgres. Idempotent.
+    """
+    if connection.dialect.name == "sqlite":
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'artist_fts'"
+        )).first()
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS artist_fts USING fts5("
+            "name, bio, genres, content='artists', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS artists_fts_insert AFTER INSERT ON artists BEGIN "
+            "INSERT INTO artist_fts (rowid, name, bio, genres) VALUES (new.id, new.name, new.bio, new.genres); END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS artists_fts_delete AFTER DELETE ON artists BEGIN "
+            "INSERT INTO artist_fts (artist_fts, rowid, name, bio, genres) "
+            "VALUES ('delete', old.id, old.name, old.bio, old.genres); END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS artists_fts_update AFTER UPDATE OF name, bio, genres ON artists BEGIN "
+            "INSERT INTO artist_fts (artist_fts, rowid, name, bio, genres) "
+            "VALUES ('delete', old.id, old.name, old.bio, old.genres); "
+            "INSERT INTO artist_fts (rowid, name, bio, genres) VALUES (new.id, new.name, new.bio, new.genres); END"
+        ))
+        if not exists:
+            connection.execute(text("INSERT INTO artist_fts (artist_fts) VALUES ('rebuild')"))
+    elif connection.dialect.name == "postgresql":
+        connection.execute(text(
+            "ALTER TABLE artists ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('simple', replace(coalesce(genres, ''), ',', ' ')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(bio, '')), 'C')) STORED"
+        ))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_artists_search_vector ON artists USING GIN (search_vector)"
+        ))
+    
+    # Artists written before genres were indexed
+    if connection.execute(select(artist_genres.c.artist_id).limit(1)).first() is None:
+        artist_ids = [row[0] for row in connection.execute(
+            select(Artist.id).where(Artist.genres.isnot(None), Artist.genres != "")
+        )]
+        sync_artist_genres(connection, artist_ids)
+
+# Columns added to tables that predate them; create_all only creates missing tables
+ADDED_COLUMNS = {
+    'artists': ('name_key', 'updated_version'),
+}
+
+def _add_missing_columns(connection) -> List[str]:
+    """ALTER existing tables to add ADDED_COLUMNS they lack; returns "table.column" for each added"""
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    added = []
+    for table_name, column_names in ADDED_COLUMNS.items():
+        if table_name not in tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table_name)}
+        for name in column_names:
+            if name in existing:
+                continue
+            column = Base.metadata.tables[table_name].c[name]
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {name} {column_type}"))
+            added.append(f"{table_name}.{name}")
+    return added
+
+def backfill_name_keys(connection) -> int:
+    """
+    Fill artists.name_key for rows written without one, e.g. before the
+    column existed. Artists whose normalized names collide with one already
+    keyed are left without a key and logged on every run, so the unique
+    index can still be built; rename or merge them and run init_db again.
+    Returns the number of rows filled.
+    """
+    table = Artist.__table__
+    pending = connection.execute(
+        select(table.c.id, table.c.name)
+        .where(table.c.name_key.is_(None), table.c.name.isnot(None), table.c.name != "")
+        .order_by(table.c.id)
+    ).all()
+    keys = {normalize_artist_name(name) for _, name in pending} - {""}
+    taken = {}
+    key_list = list(keys)
+    for offset in range(0, len(key_list), 500):
+        taken.update(connection.execute(
+            select(table.c.name_key, table.c.id).where(table.c.name_key.in_(key_list[offset:offset + 500]))
+        ).all())
+    
+    filled = []
+    collisions = []
+    for artist_id, name in pending:
+        key = normalize_artist_name(name)
+        if not key:
+            continue
+        if key in taken:
+            collisions.append((artist_id, name, taken[key]))
+            continue
+        taken[key] = artist_id
+        filled.append({"_id": artist_id, "_key": key})
+    
+    statement = update(table).where(table.c.id == bindparam("_id")).values(name_key=bindparam("_key"))
+    for offset in range(0, len(filled), 1000):
+        connection.execute(statement, filled[offset:offset + 1000])
+    if collisions:
+        shown = ", ".join(f"{artist_id} {name!r} (same as {other})" for artist_id, name, other in collisions[:20])
+        more = f" and {len(collisions) - 20} more" if len(collisions) > 20 else ""
+        logger.warning(f"{len(collisions)} artists have no name_key because their names "
+                       f"collide with another artist: {shown}{more}")
+    return len(filled)
+
+def migrate_schema(connection):
+    """
+    Bring a database created by an older version up to date: add new
+    columns, backfill them and create any missing indexes. Takes a sync
+    Connection; idempotent.
+    """
+    added = _add_missing_columns(connection)
+    if added:
+        logger.info(f"Added columns {', '.join(added)}")
+    filled = backfill_name_keys(connection)
+    if filled:
+        logger.info(f"Backfilled name_key for {filled} artists")
+    # Indexes on tables that already existed, e.g. ix_artists_name_key
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+async def dispose_engines():
+    """Close pooled connections, e.g. on shutdown"""
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(migrate_schema)
+        await conn.run_sync(create_search_index)
+        exists = (await conn.execute(select(CatalogueVersion.id).where(CatalogueVersion.id == 1))).first()
+        if not exists:
+            await conn.execute(CatalogueVersion.__table__.insert().values(id=1, version=0))
 
 if __name__ == "__main__":
     import asyncio
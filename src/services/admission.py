@@ -0,0 +1,158 @@
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Hashable
+import asyncio
+import logging
+import os
+import time
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Generations allowed to run against the LLM at once
+LLM_MAX_IN_FLIGHT = int(os.getenv('LLM_MAX_IN_FLIGHT', '16'))
+# Waiting generations, in total and per client, beyond which requests are turned away
+LLM_MAX_QUEUED = int(os.getenv('LLM_MAX_QUEUED', '64'))
+LLM_MAX_QUEUED_PER_CLIENT = int(os.getenv('LLM_MAX_QUEUED_PER_CLIENT', '2'))
+# Longest a generation may wait for a slot before it is rejected
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv('LLM_QUEUE_TIMEOUT_SECONDS', '10'))
+
+ADMISSIONS = metrics.counter("llm_admissions_total", "LLM generation requests by admission result", ("result",))
+
+class Overloaded(Exception):
+    """A generation was turned away because the LLM is saturated"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"LLM overloaded: {reason}")
+        self.reason = reason
+
+class AdmissionController:
+    """
+    Bounds how many LLM generations run at once and who goes next.
+
+    Up to max_in_flight generations run; later ones wait in per-client
+    queues that are served round-robin, so one busy client cannot starve
+    the rest. A request is rejected with Overloaded straight away when the
+    wait queue, or its client's share of it, is full, and after waiting
+    timeout_seconds without getting a slot. A waiter that is cancelled,
+    e.g. because its WebSocket closed, leaves the queue immediately.
+    """
+
+    def __init__(self, max_in_flight: int = LLM_MAX_IN_FLIGHT, max_queued: int = LLM_MAX_QUEUED,
+                 max_queued_per_client: int = LLM_MAX_QUEUED_PER_CLIENT,
+                 timeout_seconds: float = LLM_QUEUE_TIMEOUT_SECONDS):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queued = max_queued
+        self.max_queued_per_client = max_queued_per_client
+        self.timeout_seconds = timeout_seconds
+        self.in_flight = 0
+        self.queued = 0
+        # client -> waiters, in the order clients will next be served
+        self._queues: "OrderedDict[Hashable, Deque[asyncio.Future]]" = OrderedDict()
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.cancelled = 0
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        ADMISSIONS.inc(reason)
+        raise Overloaded(reason)
+
+    async def acquire(self, client: Hashable):
+        """Wait for a generation slot; pair every successful call with release()"""
+        if self.in_flight < self.max_in_flight and not self.queued:
+            self.in_flight += 1
+            self._admitted(0.0)
+            return
+
+        queue = self._queues.get(client)
+        if self.queued >= self.max_queued:
+            self._reject("queue_full")
+        if queue is not None and len(queue) >= self.max_queued_per_client:
+            self._reject("client_queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        if queue is None:
+            queue = self._queues[client] = deque()
+        queue.append(waiter)
+        self.queued += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            if self._forget(client, waiter):
+                self.timed_out += 1
+                ADMISSIONS.inc("timed_out")
+                raise Overloaded("timed_out")
+            # The slot arrived together with the deadline; take it
+        except asyncio.CancelledError:
+            if self._forget(client, waiter):
+                self.cancelled += 1
+                ADMISSIONS.inc("cancelled")
+            else:
+                # Handed a slot just as we were cancelled; pass it on
+                self.release()
+            raise
+        self._admitted(time.perf_counter() - started)
+
+    def _admitted(self, waited: float):
+        self.admitted += 1
+        ADMISSIONS.inc("admitted")
+        metrics.observe_stage("llm_queue", waited)
+
+    def _forget(self, client: Hashable, waiter: asyncio.Future) -> bool:
+        """Take a waiter that was never granted a slot out of its queue"""
+        if waiter.done():
+            return False
+        waiter.cancel()
+        queue = self._queues.get(client)
+        if queue is not None:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[client]
+        self.queued -= 1
+        return True
+
+    def release(self):
+        """Hand the slot to the next client in turn, or free it"""
+        while self._queues:
+            client, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            self.queued -= 1
+            if queue:
+                self._queues.move_to_end(client)
+            else:
+                del self._queues[client]
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, client: Hashable):
+        """Hold a generation slot for the duration of the block"""
+        await self.acquire(client)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "clients_waiting": len(self._queues),
+            "max_in_flight": self.max_in_flight,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "cancelled": self.cancelled,
+        }
+
+# Shared by every chat session in the process
+llm_admission = AdmissionController()
+
+metrics.gauge("llm_in_flight", "LLM generations running", lambda: llm_admission.in_flight)
+metrics.gauge("llm_queued", "LLM generations waiting for a slot", lambda: llm_admission.queued)
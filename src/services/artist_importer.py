@@ -0,0 +1,218 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import csv
+import gzip
+import json
+import logging
+import time
+
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from src.models.database import (
+    Artist, PlatformLink, SocialMedia, engine, mark_artists_changed, normalize_artist_name,
+    sync_artist_genres
+)
+
+logger = logging.getLogger(__name__)
+
+# Keeps every IN (...) list well under SQLite's bound-parameter limit
+_IN_CHUNK = 500
+
+def _open(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+def read_records(path: str, fmt: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Stream artist records from a JSONL or CSV file (optionally gzipped).
+
+    JSONL lines look like the seed data: name, bio, genres (string or
+    list), socials and links (lists of {platform, handle|url} or
+    {platform: value} objects). CSV files have name, bio and genres
+    columns plus social_<platform> and link_<platform> columns.
+    """
+    fmt = fmt or ("csv" if ".csv" in path else "jsonl")
+    with _open(path) as f:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                record = {"name": row.get("name"), "bio": row.get("bio") or None,
+                          "genres": row.get("genres") or None}
+                socials = {k[len("social_"):]: v for k, v in row.items() if k and k.startswith("social_") and v}
+                links = {k[len("link_"):]: v for k, v in row.items() if k and k.startswith("link_") and v}
+                if socials:
+                    record["socials"] = socials
+                if links:
+                    record["links"] = links
+                yield record
+        else:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping malformed line {line_number} of {path}")
+
+def _children(value, field: str) -> Optional[Dict[str, str]]:
+    """{platform: handle/url} from either accepted shape, or None if absent"""
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return {platform: v for platform, v in value.items() if v}
+    return {item["platform"]: item[field] for item in value if item.get("platform") and item.get(field)}
+
+def _chunks(items: List, size: int = _IN_CHUNK) -> Iterator[List]:
+    for offset in range(0, len(items), size):
+        yield items[offset:offset + size]
+
+class ArtistImporter:
+    """
+    Bulk-loads artist records with batched upserts.
+
+    Each batch is one transaction: artists are upserted on name_key with
+    INSERT ... ON CONFLICT, then their social and platform rows are
+    diffed against what is stored, so unchanged rows are not touched and
+    only new, changed or removed ones are written. A record that has no
+    socials (or links) key leaves that artist's existing rows alone.
+    Genre links are synced from the genres string in the same transaction.
+
+    Writes go through SQLAlchemy Core, so ORM events do not fire. Each
+    batch instead stamps its artists with a new catalogue version, which a
+    running API polls for and applies to its indexes.
+    """
+
+    def __init__(self, db_engine: AsyncEngine = engine, batch_size: int = 1000):
+        self.engine = db_engine
+        self.batch_size = batch_size
+        dialect = db_engine.dialect.name
+        if dialect == "sqlite":
+            self._insert = sqlite.insert
+        elif dialect == "postgresql":
+            self._insert = postgresql.insert
+        else:
+            raise ValueError(f"Bulk import does not support {dialect}")
+
+    async def import_records(self, records: Iterable[Dict], report_every: int = 10) -> Dict[str, float]:
+        stats = {"read": 0, "skipped": 0, "artists": 0,
+                 "children_inserted": 0, "children_updated": 0, "children_deleted": 0}
+        started = time.perf_counter()
+        batch: Dict[str, Dict] = {}
+        batches = 0
+
+        async def flush():
+            nonlocal batch, batches
+            if not batch:
+                return
+            async with self.engine.begin() as conn:
+                artist_ids = await self._write_batch(conn, batch, stats)
+                await conn.run_sync(mark_artists_changed, artist_ids)
+            batches += 1
+            batch = {}
+            if batches % report_every == 0:
+                elapsed = time.perf_counter() - started
+                logger.info(f"Imported {stats['artists']} artists ({stats['artists'] / elapsed:.0f}/s)")
+
+        for record in records:
+            stats["read"] += 1
+            name = (record.get("name") or "").strip()
+            key = normalize_artist_name(name)
+            if not key:
+                stats["skipped"] += 1
+                continue
+            # Later records for the same artist win
+            batch[key] = dict(record, name=name)
+            if len(batch) >= self.batch_size:
+                await flush()
+        await flush()
+
+        stats["seconds"] = round(time.perf_counter() - started, 2)
+        stats["artists_per_second"] = round(stats["artists"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+        logger.info(f"Import finished: {stats}")
+        return stats
+
+    async def _write_batch(self, conn: AsyncConnection, batch: Dict[str, Dict], stats: Dict) -> List[int]:
+        rows = []
+        for key, record in batch.items():
+            genres = record.get("genres")
+            if isinstance(genres, list):
+                genres = ",".join(genres)
+            rows.append({"name": record["name"], "name_key": key,
+                         "bio": record.get("bio"), "genres": genres})
+
+        insert = self._insert(Artist.__table__)
+        # Missing fields in a record keep whatever is already stored
+        await conn.execute(insert.on_conflict_do_update(
+            index_elements=[Artist.__table__.c.name_key],
+            set_={
+                "name": insert.excluded.name,
+                "bio": func.coalesce(insert.excluded.bio, Artist.__table__.c.bio),
+                "genres": func.coalesce(insert.excluded.genres, Artist.__table__.c.genres),
+            }
+        ), rows)
+        stats["artists"] += len(rows)
+
+        ids: Dict[str, int] = {}
+        for keys in _chunks(list(batch)):
+            result = await conn.execute(
+                select(Artist.id, Artist.name_key).where(Artist.name_key.in_(keys))
+            )
+            ids.update({name_key: artist_id for artist_id, name_key in result})
+
+        await conn.run_sync(sync_artist_genres, list(ids.values()))
+
+        for record_field, field, model in (("socials", "handle", SocialMedia), ("links", "url", PlatformLink)):
+            wanted = {}
+            for key, record in batch.items():
+                children = _children(record.get(record_field), field)
+                if children is not None and key in ids:
+                    wanted[ids[key]] = children
+            if wanted:
+                await self._sync_children(conn, model, field, wanted, stats)
+        return list(ids.values())
+
+    async def _sync_children(self, conn: AsyncConnection, model, field: str,
+                             wanted: Dict[int, Dict[str, str]], stats: Dict):
+        table = model.__table__
+        value = table.c[field]
+        existing: Dict[Tuple[int, str], Tuple[int, str]] = {}
+        duplicates = []
+        for artist_ids in _chunks(list(wanted)):
+            result = await conn.execute(
+                select(table.c.id, table.c.artist_id, table.c.platform, value)
+                .where(table.c.artist_id.in_(artist_ids))
+                .order_by(table.c.id)
+            )
+            for row_id, artist_id, platform, current in result:
+                if (artist_id, platform) in existing:
+                    duplicates.append(row_id)
+                else:
+                    existing[(artist_id, platform)] = (row_id, current)
+
+        inserts, updates, deletes = [], [], duplicates
+        for artist_id, children in wanted.items():
+            for platform, new_value in children.items():
+                stored = existing.get((artist_id, platform))
+                if stored is None:
+                    inserts.append({"artist_id": artist_id, "platform": platform, field: new_value})
+                elif stored[1] != new_value:
+                    updates.append({"row_id": stored[0], "new_value": new_value})
+        for (artist_id, platform), (row_id, _) in existing.items():
+            if platform not in wanted[artist_id]:
+                deletes.append(row_id)
+
+        if inserts:
+            await conn.execute(table.insert(), inserts)
+        if updates:
+            await conn.execute(
+                update(table).where(table.c.id == bindparam("row_id")).values({field: bindparam("new_value")}),
+                updates
+            )
+        for row_ids in _chunks(deletes):
+            await conn.execute(delete(table).where(table.c.id.in_(row_ids)))
+
+        stats["children_inserted"] += len(inserts)
+        stats["children_updated"] += len(updates)
+        stats["children_deleted"] += len(deletes)
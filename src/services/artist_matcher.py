@@ -0,0 +1,233 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+import threading
+
+from sqlalchemy import event, inspect
+
+from src.models.database import Artist, normalize_artist_name
+
+class _Automaton:
+    """
+    One immutable build of the trie and its failure links.
+
+    Readers hold a reference to a single instance for the whole scan, so a
+    swap by another thread never leaves them looking at half-built links.
+    """
+
+    def __init__(self, canonical: Dict[str, str], generation: int):
+        self.canonical = canonical
+        self.generation = generation
+        self.goto: List[Dict[str, int]] = [{}]
+        self.output: List[Optional[str]] = [None]
+        for key in canonical:
+            node = 0
+            for char in key:
+                child = self.goto[node].get(char)
+                if child is None:
+                    child = len(self.goto)
+                    self.goto.append({})
+                    self.output.append(None)
+                    self.goto[node][char] = child
+                node = child
+            self.output[node] = key
+        self.fail: List[int] = [0] * len(self.goto)
+        self.dict_link: List[int] = [0] * len(self.goto)
+        self._build_links()
+
+    def _build_links(self):
+        # Breadth-first so every node's failure target is finalised first
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[child] = target if target != child else 0
+                fail = self.fail[child]
+                self.dict_link[child] = fail if self.output[fail] else self.dict_link[fail]
+                queue.append(child)
+
+    def matches(self, text: str) -> List[Tuple[int, int, str]]:
+        goto, fail, output, dict_link = self.goto, self.fail, self.output, self.dict_link
+        matches = []
+        node = 0
+        for end, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            hit = node if output[node] else dict_link[node]
+            while hit:
+                key = output[hit]
+                if key:
+                    start = end - len(key) + 1
+                    if _is_boundary(text, start - 1) and _is_boundary(text, end + 1):
+                        matches.append((start, end + 1, key))
+                hit = dict_link[hit]
+        return matches
+
+class ArtistNameMatcher:
+    """
+    Aho-Corasick automaton over the known artist names.
+
+    Finds every catalogue name mentioned in a message in a single pass over
+    the text, independent of how many artists are loaded. Names are matched
+    case-insensitively on whole words, so "bicep" matches "Bicep" but not
+    "biceps".
+
+    Names can be added or removed at any time. Searches keep using the last
+    complete automaton; a newer one is built off the caller's thread, either
+    explicitly through refresh() or by a background builder that find()
+    starts when it notices pending changes, and swapped in once finished.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._lock = threading.Lock()
+        self._canonical: Dict[str, str] = {}
+        self._generation = 0
+        self._builder: Optional[threading.Thread] = None
+        for name in names:
+            key = normalize_artist_name(name)
+            if key:
+                self._canonical[key] = name.strip()
+        self._automaton = _Automaton(dict(self._canonical), self._generation)
+
+    def __len__(self) -> int:
+        return len(self._canonical)
+
+    def __contains__(self, name: str) -> bool:
+        return normalize_artist_name(name) in self._canonical
+
+    def add(self, name: str):
+        """Add (or re-capitalise) a single artist name"""
+        key = normalize_artist_name(name)
+        if not key:
+            return
+        with self._lock:
+            self._canonical[key] = name.strip()
+            self._generation += 1
+
+    def add_many(self, names: Iterable[str]):
+        for name in names:
+            self.add(name)
+
+    def remove(self, name: str):
+        """Forget an artist name"""
+        key = normalize_artist_name(name)
+        with self._lock:
+            if self._canonical.pop(key, None) is not None:
+                self._generation += 1
+
+    def rebuild(self, names: Iterable[str]):
+        """
+        Replace the whole name set, e.g. after a bulk import. The automaton
+        is built in the calling thread, so run this off the event loop;
+        searches meanwhile see the old one.
+        """
+        canonical = {}
+        for name in names:
+            key = normalize_artist_name(name)
+            if key:
+                canonical[key] = name.strip()
+        with self._lock:
+            self._canonical = canonical
+            self._generation += 1
+            generation = self._generation
+        self._install(_Automaton(dict(canonical), generation))
+
+    def refresh(self):
+        """Build and swap in an automaton for any pending changes, in the calling thread"""
+        with self._lock:
+            if self._automaton.generation == self._generation:
+                return
+            generation, canonical = self._generation, dict(self._canonical)
+        self._install(_Automaton(canonical, generation))
+
+    def _install(self, automaton: _Automaton):
+        # Builds can finish out of order; never replace a newer snapshot
+        with self._lock:
+            if automaton.generation > self._automaton.generation:
+                self._automaton = automaton
+
+    def _schedule_build(self):
+        with self._lock:
+            if self._builder is not None:
+                return
+            self._builder = threading.Thread(target=self._build_pending, name="artist-matcher", daemon=True)
+            self._builder.start()
+
+    def _build_pending(self):
+        # Changes that land during a build are picked up by the next pass,
+        # so a burst of writes costs one or two builds rather than one each
+        while True:
+            with self._lock:
+                if self._automaton.generation == self._generation:
+                    self._builder = None
+                    return
+                generation, canonical = self._generation, dict(self._canonical)
+            self._install(_Automaton(canonical, generation))
+
+    def find(self, text: str) -> List[str]:
+        """
+        Return the canonical names mentioned in text, in order of appearance.
+
+        Overlapping mentions resolve to the longest name, so "Fred Again"
+        wins over a shorter "Fred" that starts at the same place. Uses the
+        latest complete automaton, so names added moments ago may not be
+        found until the background build has caught up.
+        """
+        automaton = self._automaton
+        if automaton.generation != self._generation:
+            self._schedule_build()
+        if not automaton.canonical or not text:
+            return []
+
+        normalized = normalize_artist_name(text)
+        matches = automaton.matches(normalized)
+        matches.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+
+        found = []
+        seen = set()
+        covered_until = 0
+        for start, end, key in matches:
+            if start < covered_until:
+                continue
+            covered_until = end
+            if key not in seen:
+                seen.add(key)
+                found.append(automaton.canonical[key])
+        return found
+
+def _is_boundary(text: str, index: int) -> bool:
+    if index < 0 or index >= len(text):
+        return True
+    return not text[index].isalnum()
+
+def attach_to_model(matcher: ArtistNameMatcher):
+    """
+    Keep matcher in step with Artist rows written through the ORM in this
+    process; writes from elsewhere arrive through AnnieMacEngine.refresh_artist_indexes
+    """
+    @event.listens_for(Artist, "after_insert")
+    def _artist_inserted(mapper, connection, target):
+        if target.name:
+            matcher.add(target.name)
+
+    @event.listens_for(Artist, "after_update")
+    def _artist_updated(mapper, connection, target):
+        # Most updates (bios, links, scrape bookkeeping) leave the name alone
+        history = inspect(target).attrs.name.history
+        if not history.added and not history.deleted:
+            return
+        for old_name in history.deleted or ():
+            if old_name:
+                matcher.remove(old_name)
+        if target.name:
+            matcher.add(target.name)
+
+    @event.listens_for(Artist, "after_delete")
+    def _artist_deleted(mapper, connection, target):
+        if target.name:
+            matcher.remove(target.name)
@@ -0,0 +1,110 @@
+from typing import Dict, List, Optional
+import logging
+import re
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Artist, Genre, artist_genres, normalize_artist_name, read_session
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# Question words that would otherwise outrank what is actually being asked about
+_STOPWORDS = {
+    "a", "about", "an", "and", "any", "are", "artist", "artists", "by", "can", "do", "does",
+    "for", "from", "have", "i", "in", "is", "like", "me", "music", "of", "on", "or", "play",
+    "plays", "recommend", "some", "that", "the", "to", "what", "which", "who", "with", "you",
+}
+
+def search_terms(query: str) -> List[str]:
+    """Lowercased words of query worth searching for"""
+    words = [word.lower() for word in _WORD.findall(query)]
+    terms = [word for word in words if word not in _STOPWORDS]
+    return terms or words
+
+class ArtistSearch:
+    """
+    Ranked full-text search over artist names, bios and genres.
+
+    Backed by the index from create_search_index (FTS5 with bm25 on
+    SQLite, tsvector with ts_rank_cd on Postgres), so a search is an index
+    lookup rather than a scan. Any term may match; artists matching more
+    terms, or matching in their name or genres rather than their bio, rank
+    higher.
+    """
+
+    def __init__(self, session_factory: sessionmaker = read_session):
+        self.session_factory = session_factory
+
+    async def search(self, query: str, limit: int = 10) -> List[Dict]:
+        terms = search_terms(query)
+        if not terms:
+            return []
+
+        async with self.session_factory() as session:
+            dialect = session.bind.dialect.name
+            if dialect == "sqlite":
+                # Quoted so user text is never parsed as FTS5 syntax; the
+                # last term also matches as a prefix for search-as-you-type
+                match = " OR ".join(f'"{term}"' for term in terms[:-1])
+                match = f'{match} OR "{terms[-1]}"*' if match else f'"{terms[-1]}"*'
+                rows = (await session.execute(text(
+                    "SELECT a.id, a.name, a.genres, bm25(artist_fts, 10.0, 1.0, 5.0) AS rank "
+                    "FROM artist_fts JOIN artists a ON a.id = artist_fts.rowid "
+                    "WHERE artist_fts MATCH :match ORDER BY rank LIMIT :limit"
+                ), {"match": match, "limit": limit})).all()
+                # bm25 is lower-is-better; flip it so scores read naturally
+                return [self._result(row, -row.rank) for row in rows]
+            elif dialect == "postgresql":
+                tsquery = " | ".join(f"{term}:*" for term in terms)
+                # Names and genres are indexed unstemmed ('simple'), bios
+                # stemmed ('english'), so the terms are matched both ways:
+                # "producer" must also find a bio's "produc"
+                rows = (await session.execute(text(
+                    "SELECT a.id, a.name, a.genres, ts_rank_cd(a.search_vector, q) AS rank "
+                    "FROM artists a, (to_tsquery('simple', :tsquery) || to_tsquery('english', :tsquery)) q "
+                    "WHERE a.search_vector @@ q ORDER BY rank DESC LIMIT :limit"
+                ), {"tsquery": tsquery, "limit": limit})).all()
+                return [self._result(row, row.rank) for row in rows]
+            raise ValueError(f"Search is not supported on {dialect}")
+
+    async def artists_by_genre(self, genre: str, limit: int = 50) -> List[Dict]:
+        """Artists tagged with genre (exact, case-insensitive), by name"""
+        key = normalize_artist_name(genre)
+        if not key:
+            return []
+        async with self.session_factory() as session:
+            rows = (await session.execute(
+                select(Artist.id, Artist.name, Artist.genres)
+                .join(artist_genres, artist_genres.c.artist_id == Artist.id)
+                .join(Genre, Genre.id == artist_genres.c.genre_id)
+                .where(Genre.key == key)
+                .order_by(Artist.name_key)
+                .limit(limit)
+            )).all()
+        return [self._result(row) for row in rows]
+
+    async def genres(self, limit: int = 100) -> List[Dict]:
+        """Genres with their artist counts, most common first"""
+        async with self.session_factory() as session:
+            rows = (await session.execute(
+                select(Genre.name, func.count(artist_genres.c.artist_id).label("artists"))
+                .join(artist_genres, artist_genres.c.genre_id == Genre.id)
+                .group_by(Genre.id, Genre.name)
+                .order_by(func.count(artist_genres.c.artist_id).desc())
+                .limit(limit)
+            )).all()
+        return [{"genre": name, "artists": count} for name, count in rows]
+
+    @staticmethod
+    def _result(row, score: Optional[float] = None) -> Dict:
+        result = {
+            "id": row.id,
+            "name": row.name,
+            "genres": row.genres.split(",") if row.genres else [],
+        }
+        if score is not None:
+            result["score"] = round(float(score), 4)
+        return result
@@ -1,32 +1,460 @@
-from typing import Dict, Optional
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import asyncio
 import json
+import logging
 import os
-from datetime import datetime, timedelta
+import sqlite3
+import threading
+import time
+import zlib
+
+from .metrics import metrics, span
+
+logger = logging.getLogger(__name__)
+
+LOOKUPS = metrics.counter("cache_lookups_total", "Two-tier cache lookups by the tier that answered", ("result",))
+
+# How long past its TTL an entry may still be served while it is refreshed
+CACHE_MAX_STALE_HOURS = float(os.getenv('CACHE_MAX_STALE_HOURS', '168'))
+
+class CacheEntry(NamedTuple):
+    value: Dict
+    stored_at: float
+    fresh_until: float
+    expires_at: float
+
+    @property
+    def stale(self) -> bool:
+        """Past its soft TTL: still servable, but due for a refresh"""
+        return time.time() >= self.fresh_until
+
+class MemoryCache:
+    """
+    Bounded in-process LRU cache with per-entry TTLs.
+
+    Limited both by entry count and by the approximate serialized size of
+    the stored values. Values are returned as stored, so callers must not
+    mutate them.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 default_ttl_seconds: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl_seconds = default_ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, max_age_seconds: Optional[float] = None) -> Optional[Dict]:
+        entry = self.get_entry(key, max_age_seconds)
+        return entry.value if entry is not None else None
+
+    def get_entry(self, key: str, max_age_seconds: Optional[float] = None) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, size, stored_at, fresh_until, expires_at = entry
+            now = time.time()
+            if now >= expires_at or (max_age_seconds is not None and now - stored_at > max_age_seconds):
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return CacheEntry(value, stored_at, fresh_until, expires_at)
+
+    def set(self, key: str, value: Dict, size: Optional[int] = None,
+            ttl_seconds: Optional[float] = None, stored_at: Optional[float] = None,
+            fresh_seconds: Optional[float] = None):
+        """
+        Store value until ttl_seconds after stored_at. With fresh_seconds
+        the entry turns stale (see CacheEntry.stale) before it expires.
+        """
+        if size is None:
+            size = len(json.dumps(value))
+        if size > self.max_bytes:
+            return
+
+        stored_at = stored_at if stored_at is not None else time.time()
+        ttl = ttl_seconds if ttl_seconds is not None else self.default_ttl_seconds
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            fresh_until = stored_at + min(ttl, fresh_seconds if fresh_seconds is not None else ttl)
+            self._entries[key] = (value, size, stored_at, fresh_until, stored_at + ttl)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key: str):
+        size = self._entries.pop(key)[1]
+        self._bytes -= size
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+class SQLiteCacheStore:
+    """
+    Key/value store for cache entries backed by a single SQLite file.
+
+    Writes are atomic upserts, batches run in one transaction, and each row
+    carries its own expiry so stale data can be purged without touching
+    file metadata. Expired rows are removed by compact(), which can run
+    periodically on a background thread.
+
+    An entry may also have a body: a large, compressed blob kept in its own
+    table so that reading the entry never reads the body.
+    """
+
+    def __init__(self, path: str = "data/cache/cache.db", compact_interval_seconds: float = 3600):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.compact_interval_seconds = compact_interval_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_bodies (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(cache_entries)")}
+        if "fresh_until" not in columns:
+            # Rows written before soft TTLs existed are fresh until they expire
+            self._conn.execute("ALTER TABLE cache_entries ADD COLUMN fresh_until REAL")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_cache_entries_expires_at ON cache_entries (expires_at)"
+        )
+        self._stop = threading.Event()
+        self._compactor: Optional[threading.Thread] = None
+
+    def get(self, key: str,
+            max_age_seconds: Optional[float] = None) -> Optional[Tuple[str, float, float, float]]:
+        return self.get_many([key], max_age_seconds).get(key)
+
+    def get_many(self, keys: Iterable[str],
+                 max_age_seconds: Optional[float] = None) -> Dict[str, Tuple[str, float, float, float]]:
+        """Return {key: (raw_value, stored_at, fresh_until, expires_at)} for live entries"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        now = time.time()
+        oldest = now - max_age_seconds if max_age_seconds is not None else 0
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for offset in range(0, len(keys), 500):
+                chunk = keys[offset:offset + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value, stored_at, COALESCE(fresh_until, expires_at), expires_at "
+                    f"FROM cache_entries "
+                    f"WHERE key IN ({placeholders}) AND expires_at > ? AND stored_at >= ?",
+                    (*chunk, now, oldest)
+                )
+                for key, value, stored_at, fresh_until, expires_at in rows:
+                    found[key] = (value, stored_at, fresh_until, expires_at)
+        return found
+
+    def set(self, key: str, raw_value: str, ttl_seconds: float, fresh_seconds: Optional[float] = None):
+        self.set_many({key: raw_value}, ttl_seconds, fresh_seconds=fresh_seconds)
+
+    def set_many(self, items: Dict[str, str], ttl_seconds: float, stored_at: Optional[float] = None,
+                 fresh_seconds: Optional[float] = None, bodies: Optional[Dict[str, bytes]] = None):
+        """Upsert items, and the bodies of any of them found in bodies, in one transaction"""
+        if not items:
+            return
+        stored_at = stored_at if stored_at is not None else time.time()
+        expires_at = stored_at + ttl_seconds
+        fresh_until = stored_at + min(ttl_seconds, fresh_seconds if fresh_seconds is not None else ttl_seconds)
+        rows = [(key, value, stored_at, fresh_until, expires_at) for key, value in items.items()]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO cache_entries (key, value, stored_at, fresh_until, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, stored_at = excluded.stored_at, "
+                    "fresh_until = excluded.fresh_until, expires_at = excluded.expires_at",
+                    rows
+                )
+                if bodies:
+                    self._conn.executemany(
+                        "INSERT INTO cache_bodies (key, body, expires_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET body = excluded.body, expires_at = excluded.expires_at",
+                        [(key, body, expires_at) for key, body in bodies.items() if key in items]
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get_body(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM cache_bodies WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def touch(self, key: str, ttl_seconds: float, fresh_seconds: Optional[float] = None) -> bool:
+        """Restart an entry's (and its body's) TTL without rewriting either"""
+        stored_at = time.time()
+        expires_at = stored_at + ttl_seconds
+        fresh_until = stored_at + min(ttl_seconds, fresh_seconds if fresh_seconds is not None else ttl_seconds)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                updated = self._conn.execute(
+                    "UPDATE cache_entries SET stored_at = ?, fresh_until = ?, expires_at = ? WHERE key = ?",
+                    (stored_at, fresh_until, expires_at, key)
+                ).rowcount
+                self._conn.execute(
+                    "UPDATE cache_bodies SET expires_at = ? WHERE key = ?", (expires_at, key)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return updated > 0
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            self._conn.execute("DELETE FROM cache_bodies WHERE key = ?", (key,))
+
+    def compact(self) -> int:
+        """Delete expired rows and hand their pages back to the filesystem"""
+        with self._lock:
+            now = time.time()
+            removed = self._conn.execute(
+                "DELETE FROM cache_entries WHERE expires_at <= ?", (now,)
+            ).rowcount
+            removed += self._conn.execute(
+                "DELETE FROM cache_bodies WHERE expires_at <= ?", (now,)
+            ).rowcount
+            if removed:
+                self._conn.execute("PRAGMA incremental_vacuum")
+        return removed
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+    def start_compactor(self):
+        if self._compactor is not None:
+            return
+        self._compactor = threading.Thread(target=self._compact_loop, name="cache-compactor", daemon=True)
+        self._compactor.start()
+
+    def _compact_loop(self):
+        while not self._stop.wait(self.compact_interval_seconds):
+            try:
+                removed = self.compact()
+                if removed:
+                    logger.info(f"Compacted {removed} expired cache entries")
+            except Exception as e:
+                logger.error(f"Cache compaction failed: {str(e)}")
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            self._conn.close()
 
 class Cache:
-    def __init__(self, cache_dir: str = "data/cache"):
+    """
+    Two-tier cache: a MemoryCache (L1) in front of a SQLiteCacheStore (L2).
+
+    L2 hits are promoted into L1 so that, after a restart, hot keys are
+    served from memory again after their first lookup.
+
+    Entries are fresh for ttl_hours and then stale for up to
+    max_stale_hours more before they are gone. get()/get_many() only see
+    entries younger than max_age_hours; get_entry() also returns stale
+    ones so callers can serve them while refreshing.
+
+    Bulky text that is rarely needed can be stored as the entry's body:
+    it is zlib-compressed, kept out of L1 and only read by get_body().
+    """
+
+    def __init__(self, cache_dir: str = "data/cache", memory: Optional[MemoryCache] = None,
+                 store: Optional[SQLiteCacheStore] = None, ttl_hours: float = 24,
+                 max_stale_hours: float = CACHE_MAX_STALE_HOURS):
         self.cache_dir = cache_dir
-        os.makedirs(cache_dir, exist_ok=True)
-        
+        self.ttl_hours = ttl_hours
+        self.max_stale_hours = max_stale_hours
+        self.memory = memory if memory is not None else MemoryCache(default_ttl_seconds=ttl_hours * 3600)
+        self.store = store if store is not None else SQLiteCacheStore(os.path.join(cache_dir, "cache.db"))
+        self.store.start_compactor()
+
     def get(self, key: str, max_age_hours: int = 24) -> Optional[Dict]:
+        return self.get_many([key], max_age_hours=max_age_hours).get(key)
+
+    def get_many(self, keys: Iterable[str], max_age_hours: int = 24) -> Dict[str, Dict]:
+        entries = self.get_entries(keys, max_age_seconds=max_age_hours * 3600)
+        return {key: entry.value for key, entry in entries.items()}
+
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """The entry for key, fresh or stale, until its hard expiry"""
+        return self.get_entries([key]).get(key)
+
+    async def aget_entry(self, key: str) -> Optional[CacheEntry]:
+        """
+        get_entry for code on the event loop: L1 hits are answered inline and
+        only the SQLite read runs in the default executor
+        """
+        found, missing = self._from_memory([key], None)
+        if missing:
+            found = await asyncio.get_running_loop().run_in_executor(
+                None, self._from_store, missing, None, found
+            )
+        return found.get(key)
+
+    def get_entries(self, keys: Iterable[str],
+                    max_age_seconds: Optional[float] = None) -> Dict[str, CacheEntry]:
+        found, missing = self._from_memory(keys, max_age_seconds)
+        if not missing:
+            return found
+        return self._from_store(missing, max_age_seconds, found)
+
+    def _from_memory(self, keys: Iterable[str],
+                     max_age_seconds: Optional[float]) -> Tuple[Dict[str, CacheEntry], List[str]]:
+        found = {}
+        missing = []
+        with span("cache_l1"):
+            for key in keys:
+                entry = self.memory.get_entry(key, max_age_seconds=max_age_seconds)
+                if entry is not None:
+                    found[key] = entry
+                else:
+                    missing.append(key)
+
+        if found:
+            LOOKUPS.inc("l1_hit", amount=len(found))
+        return found, missing
+
+    def _from_store(self, missing: List[str], max_age_seconds: Optional[float],
+                    found: Dict[str, CacheEntry]) -> Dict[str, CacheEntry]:
         try:
-            cache_file = os.path.join(self.cache_dir, f"{key}.json")
-            if not os.path.exists(cache_file):
-                return None
-                
-            # Check if cache is older than specified hours
-            if datetime.fromtimestamp(os.path.getmtime(cache_file)) < datetime.now() - timedelta(hours=max_age_hours):
-                return None
-                
-            with open(cache_file, 'r') as f:
-                return json.load(f)
-        except:
+            with span("cache_l2"):
+                rows = self.store.get_many(missing, max_age_seconds=max_age_seconds)
+        except Exception as e:
+            logger.error(f"Cache read failed: {str(e)}")
+            LOOKUPS.inc("error", amount=len(missing))
+            return found
+
+        for key, (raw, stored_at, fresh_until, expires_at) in rows.items():
+            try:
+                value = json.loads(raw)
+            except ValueError:
+                continue
+            # Keep the stored age so L1 expires the entry when L2 would have
+            self.memory.set(key, value, size=len(raw), stored_at=stored_at,
+                            ttl_seconds=expires_at - stored_at, fresh_seconds=fresh_until - stored_at)
+            found[key] = CacheEntry(value, stored_at, fresh_until, expires_at)
+        promoted = sum(1 for key in missing if key in found)
+        if promoted:
+            LOOKUPS.inc("l2_hit", amount=promoted)
+        if promoted < len(missing):
+            LOOKUPS.inc("miss", amount=len(missing) - promoted)
+        return found
+
+    def get_body(self, key: str) -> Optional[str]:
+        try:
+            body = self.store.get_body(key)
+            return zlib.decompress(body).decode("utf-8") if body is not None else None
+        except Exception as e:
+            logger.error(f"Cache body read failed: {str(e)}")
             return None
-            
-    def set(self, key: str, value: Dict):
+
+    def set(self, key: str, value: Dict, ttl_hours: Optional[float] = None,
+            max_stale_hours: Optional[float] = None, body: Optional[str] = None):
+        self.set_many({key: value}, ttl_hours=ttl_hours, max_stale_hours=max_stale_hours,
+                      bodies={key: body} if body is not None else None)
+
+    def _ttls(self, ttl_hours: Optional[float], max_stale_hours: Optional[float]) -> Tuple[float, float]:
+        fresh_seconds = (ttl_hours if ttl_hours is not None else self.ttl_hours) * 3600
+        stale_seconds = (max_stale_hours if max_stale_hours is not None else self.max_stale_hours) * 3600
+        return fresh_seconds, fresh_seconds + stale_seconds
+
+    def set_many(self, items: Dict[str, Dict], ttl_hours: Optional[float] = None,
+                 max_stale_hours: Optional[float] = None, bodies: Optional[Dict[str, str]] = None):
+        fresh_seconds, ttl_seconds = self._ttls(ttl_hours, max_stale_hours)
         try:
-            cache_file = os.path.join(self.cache_dir, f"{key}.json")
-            with open(cache_file, 'w') as f:
-                json.dump(value, f)
-        except:
-            pass 
\ No newline at end of file
+            raw_items = {key: json.dumps(value) for key, value in items.items()}
+            compressed = {key: zlib.compress(body.encode("utf-8"), 6) for key, body in (bodies or {}).items()}
+            stored_at = time.time()
+            self.store.set_many(raw_items, ttl_seconds, stored_at=stored_at, fresh_seconds=fresh_seconds,
+                                bodies=compressed)
+            for key, value in items.items():
+                self.memory.set(key, value, size=len(raw_items[key]), ttl_seconds=ttl_seconds,
+                                stored_at=stored_at, fresh_seconds=fresh_seconds)
+        except Exception as e:
+            logger.error(f"Cache write failed: {str(e)}")
+
+    def touch(self, key: str, ttl_hours: Optional[float] = None,
+              max_stale_hours: Optional[float] = None) -> bool:
+        """Mark an entry (and its body) as just refreshed, keeping its contents"""
+        fresh_seconds, ttl_seconds = self._ttls(ttl_hours, max_stale_hours)
+        try:
+            touched = self.store.touch(key, ttl_seconds, fresh_seconds=fresh_seconds)
+        except Exception as e:
+            logger.error(f"Cache write failed: {str(e)}")
+            return False
+        # L1 is repopulated with the new timestamps on the next read
+        self.memory.delete(key)
+        return touched
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        self.store.delete(key)
+
+    def stats(self) -> Dict:
+        return {"memory": self.memory.stats()}
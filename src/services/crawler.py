@@ -0,0 +1,192 @@
+from typing import Dict, Optional
+from urllib.parse import urlparse
+from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, sessionmaker
+
+from src.models.database import Artist, SocialMedia, PlatformLink, ScrapeState, engine
+from .cache import Cache
+from .music_api import store_page_record
+from .retrieval import ArtistPageIndex
+from .web_scraper import MusicNerdScraper
+
+logger = logging.getLogger(__name__)
+
+def _handle_from_url(href: str) -> str:
+    path = urlparse(href).path.strip('/')
+    return path.split('/')[-1].lstrip('@') if path else href
+
+class ArtistCrawler:
+    """
+    Refreshes every known artist's musicnerd.xyz page in the background.
+
+    Pages are fetched with If-None-Match / If-Modified-Since and hashed, so
+    unchanged pages cost a 304 or a hash comparison rather than a parse and
+    a write. Scrape state lives in the scrape_state table, so it survives
+    restarts, and fresh results are written to the cache, the artist tables
+    and the retrieval index. This keeps scraping and embedding off the chat
+    request path.
+    """
+
+    def __init__(self, scraper: Optional[MusicNerdScraper] = None, cache: Optional[Cache] = None,
+                 page_index: Optional[ArtistPageIndex] = None,
+                 concurrency: int = 4, min_interval_hours: float = 6):
+        self.scraper = scraper or MusicNerdScraper()
+        self.cache = cache or Cache()
+        self.page_index = page_index or ArtistPageIndex()
+        self.concurrency = concurrency
+        self.min_interval = timedelta(hours=min_interval_hours)
+        self.async_session = sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+
+    async def crawl(self, force: bool = False) -> Dict[str, int]:
+        """Refresh every artist that has a known page; returns outcome counts"""
+        stats = {"changed": 0, "unchanged": 0, "skipped": 0, "failed": 0}
+        # Bounded, so the artist list is read a page at a time as workers free up
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                artist_id, name = item
+                try:
+                    outcome = await self.refresh_artist(artist_id, name, force=force)
+                except Exception as e:
+                    logger.error(f"Error refreshing {name}: {str(e)}")
+                    outcome = "failed"
+                stats[outcome] += 1
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.concurrency)]
+        try:
+            last_id = 0
+            while True:
+                async with self.async_session() as session:
+                    page = (await session.execute(
+                        select(Artist.id, Artist.name).where(Artist.id > last_id).order_by(Artist.id).limit(500)
+                    )).all()
+                if not page:
+                    break
+                last_id = page[-1][0]
+                for artist_id, name in page:
+                    if name:
+                        await queue.put((artist_id, name))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+        logger.info(f"Crawl finished: {stats}")
+        return stats
+
+    async def refresh_artist(self, artist_id: int, name: str, force: bool = False) -> str:
+        url = self.scraper.artist_url(name)
+        if not url:
+            return "skipped"
+
+        # Read the state and let the connection go: the fetch below can wait
+        # minutes for the rate limiter
+        async with self.async_session() as session:
+            state = (await session.execute(
+                select(ScrapeState).where(ScrapeState.artist_id == artist_id)
+            )).scalars().first()
+        if state is None:
+            state = ScrapeState(artist_id=artist_id)
+
+        now = datetime.utcnow()
+        if not force and state.last_scraped_at and now - state.last_scraped_at < self.min_interval:
+            return "skipped"
+
+        # Only revalidate when we still hold a body to fall back on
+        cached = self.cache.get(name, max_age_hours=24 * 365)
+        headers = {}
+        if cached and state.url == url and not force:
+            if state.etag:
+                headers['If-None-Match'] = state.etag
+            if state.last_modified:
+                headers['If-Modified-Since'] = state.last_modified
+
+        response = await self.scraper.fetch(url, headers=headers)
+        state.url = url
+        state.last_status = response.status_code
+        state.last_scraped_at = now
+
+        info = None
+        if response.status_code == 304:
+            outcome = "unchanged"
+        elif response.status_code == 200:
+            content_hash = hashlib.sha256(response.content).hexdigest()
+            state.etag = response.headers.get('ETag')
+            state.last_modified = response.headers.get('Last-Modified')
+            if cached and content_hash == state.content_hash and not force:
+                outcome = "unchanged"
+            else:
+                info = await self.scraper.aparse_artist_page(name, url, response.text)
+                store_page_record(self.cache, name, info)
+                await self._index_page(name, info)
+                state.content_hash = content_hash
+                state.last_changed_at = now
+                outcome = "changed"
+        else:
+            state.last_error = f"HTTP {response.status_code}"
+            await self._save(state)
+            return "failed"
+
+        if outcome == "unchanged":
+            # Restart the cache entry's age from this check
+            self.cache.touch(name)
+        state.last_error = None
+        await self._save(state, artist_id, info)
+        return outcome
+
+    async def _save(self, state: ScrapeState, artist_id: Optional[int] = None, info: Optional[Dict] = None):
+        """Write the scrape state, and a changed page's details, in one short transaction"""
+        async with self.async_session() as session:
+            await session.merge(state)
+            if info is not None:
+                await self._apply_to_artist(session, artist_id, info)
+            await session.commit()
+
+    async def _index_page(self, name: str, info: Dict):
+        # Embed at ingest so chat turns only pay for a query embedding
+        try:
+            await self.page_index.aingest(name, info.get("raw_content", ""))
+        except Exception as e:
+            logger.error(f"Could not index page for {name}: {str(e)}")
+
+    async def _apply_to_artist(self, session: AsyncSession, artist_id: int, info: Dict):
+        artist = (await session.execute(
+            select(Artist)
+            .where(Artist.id == artist_id)
+            .options(selectinload(Artist.social_media), selectinload(Artist.platform_links))
+        )).scalars().first()
+        if artist is None:
+            return
+
+        if info.get("bio"):
+            artist.bio = info["bio"]
+
+        socials = {sm.platform: sm for sm in artist.social_media}
+        for platform, href in info.get("social_links", {}).items():
+            handle = _handle_from_url(href)
+            if platform in socials:
+                socials[platform].handle = handle
+            else:
+                socials[platform] = SocialMedia(platform=platform, handle=handle)
+                artist.social_media.append(socials[platform])
+
+        links = {pl.platform: pl for pl in artist.platform_links}
+        for platform, href in info.get("platform_links", {}).items():
+            if platform in links:
+                links[platform].url = href
+            else:
+                links[platform] = PlatformLink(platform=platform, url=href)
+                artist.platform_links.append(links[platform])
@@ -0,0 +1,342 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import bisect
+import re
+import threading
+import unicodedata
+
+from sqlalchemy import event, inspect
+
+from src.models.database import Artist, ArtistAlias, normalize_artist_name
+
+# Letters and digits of any script survive; punctuation and symbols do not
+_NON_WORD = re.compile(r"[^\w ]+|_")
+
+def fuzzy_key(name: str) -> str:
+    """
+    normalize_artist_name with accents folded and punctuation dropped, so
+    "Björk" == "bjork" and "Fred again.." == "fred again"
+    """
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(_NON_WORD.sub(" ", normalize_artist_name(folded)).split())
+
+def trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def bounded_edit_distance(a: str, b: str, bound: int) -> Optional[int]:
+    """
+    Optimal-string-alignment distance (Levenshtein plus adjacent swaps) between
+    a and b, or None as soon as it must exceed bound
+    """
+    if abs(len(a) - len(b)) > bound:
+        return None
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (before_previous is not None and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, before_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > bound:
+            return None
+        before_previous, previous = previous, current
+    return previous[-1] if previous[-1] <= bound else None
+
+class FuzzyArtistIndex:
+    """
+    In-memory resolver from free-text names to artist ids.
+
+    Misspellings are found through trigram postings bucketed by key
+    length: a query only counts shared trigrams among keys whose length is
+    within edit distance, keeps those sharing enough trigrams to be within
+    reach (each edit destroys at most three), and ranks the survivors by
+    bounded edit distance. Partial names ("fred" -> "Fred again..",
+    "chemical brothers" -> "The Chemical Brothers") are found by bisecting
+    a sorted table of every word-suffix of every key. Aliases are just
+    extra keys. Nothing here touches the database.
+    """
+
+    def __init__(self, max_distance: int = 2, min_prefix_length: int = 3, prefix_scan_limit: int = 200):
+        self.max_distance = max_distance
+        self.min_prefix_length = min_prefix_length
+        self.prefix_scan_limit = prefix_scan_limit
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._keys: List[Optional[Tuple[str, int]]] = []    # key id -> (key, artist id)
+        self._key_ids: Dict[str, int] = {}
+        self._key_grams: List[Set[str]] = []
+        self._postings: Dict[Tuple[str, int], Set[int]] = {}    # (trigram, key length) -> key ids
+        self._suffixes: List[Tuple[str, int]] = []              # sorted (word-suffix, key id)
+        self._bulk_loading = False
+        self._names: Dict[int, str] = {}
+        self._artist_keys: Dict[int, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def name_of(self, artist_id: int) -> Optional[str]:
+        return self._names.get(artist_id)
+
+    def artist_ids(self) -> Set[int]:
+        with self._lock:
+            return set(self._names)
+
+    @staticmethod
+    def _word_suffixes(key: str) -> List[str]:
+        words = key.split(" ")
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+    def _add_key(self, key: str, artist_id: int):
+        if not key:
+            return
+        key_id = self._key_ids.get(key)
+        if key_id is not None:
+            # Same spelling now points at a different artist
+            previous = self._keys[key_id][1]
+            self._artist_keys.get(previous, set()).discard(key_id)
+            self._keys[key_id] = (key, artist_id)
+        else:
+            key_id = len(self._keys)
+            grams = trigrams(key)
+            self._keys.append((key, artist_id))
+            self._key_grams.append(grams)
+            self._key_ids[key] = key_id
+            for gram in grams:
+                self._postings.setdefault((gram, len(key)), set()).add(key_id)
+            for suffix in self._word_suffixes(key):
+                if self._bulk_loading:
+                    self._suffixes.append((suffix, key_id))
+                else:
+                    bisect.insort(self._suffixes, (suffix, key_id))
+        self._artist_keys.setdefault(artist_id, set()).add(key_id)
+
+    def _remove_key_id(self, key_id: int):
+        key, _ = self._keys[key_id]
+        for gram in self._key_grams[key_id]:
+            self._postings[(gram, len(key))].discard(key_id)
+        for suffix in self._word_suffixes(key):
+            position = bisect.bisect_left(self._suffixes, (suffix, key_id))
+            if position < len(self._suffixes) and self._suffixes[position] == (suffix, key_id):
+                del self._suffixes[position]
+        self._key_grams[key_id] = set()
+        self._keys[key_id] = None
+        del self._key_ids[key]
+
+    def _own_keys(self, name: str) -> List[str]:
+        key = fuzzy_key(name)
+        # "The Chemical Brothers" is just as often "Chemical Brothers"
+        return [key, key[4:]] if key.startswith("the ") else [key]
+
+    def add(self, artist_id: int, name: str, aliases: Iterable[str] = ()):
+        with self._lock:
+            self._remove_artist(artist_id, keep_aliases=True)
+            self._names[artist_id] = name
+            for key in self._own_keys(name):
+                self._add_key(key, artist_id)
+            for alias in aliases:
+                self._add_key(fuzzy_key(alias), artist_id)
+
+    def replace(self, artist_id: int, name: str, aliases: Iterable[str] = ()):
+        """Make name and aliases artist_id's only keys, dropping any others it had"""
+        wanted = set(self._own_keys(name)) | {fuzzy_key(alias) for alias in aliases}
+        wanted.discard("")
+        with self._lock:
+            current = {self._keys[key_id][0] for key_id in self._artist_keys.get(artist_id, ())}
+            if self._names.get(artist_id) == name and current == wanted:
+                return
+            self._remove_artist(artist_id)
+            self._names[artist_id] = name
+            for key in wanted:
+                self._add_key(key, artist_id)
+
+    def add_alias(self, artist_id: int, alias: str):
+        with self._lock:
+            self._add_key(fuzzy_key(alias), artist_id)
+
+    def remove_alias(self, artist_id: int, alias: str):
+        """Drop an alias key of artist_id, unless it is also one of the artist's own names"""
+        key = fuzzy_key(alias)
+        with self._lock:
+            key_id = self._key_ids.get(key)
+            if key_id is None or self._keys[key_id][1] != artist_id:
+                return
+            name = self._names.get(artist_id)
+            if name is not None and key in self._own_keys(name):
+                return
+            self._artist_keys[artist_id].discard(key_id)
+            self._remove_key_id(key_id)
+
+    def remove(self, artist_id: int):
+        with self._lock:
+            self._remove_artist(artist_id)
+
+    def _remove_artist(self, artist_id: int, keep_aliases: bool = False):
+        name = self._names.pop(artist_id, None)
+        if name is None:
+            return
+        own_keys = set(self._own_keys(name))
+        for key_id in list(self._artist_keys.get(artist_id, ())):
+            if keep_aliases and self._keys[key_id][0] not in own_keys:
+                continue
+            self._artist_keys[artist_id].discard(key_id)
+            self._remove_key_id(key_id)
+
+    def rebuild(self, artists: Iterable[Tuple[int, str]], aliases: Iterable[Tuple[int, str]] = ()):
+        """Replace the whole index; it is built aside, so lookups meanwhile use the old one"""
+        fresh = FuzzyArtistIndex(self.max_distance, self.min_prefix_length, self.prefix_scan_limit)
+        fresh._bulk_loading = True
+        for artist_id, name in artists:
+            if name:
+                fresh.add(artist_id, name)
+        for artist_id, alias in aliases:
+            if artist_id in fresh._names:
+                fresh.add_alias(artist_id, alias)
+        fresh._suffixes.sort()
+        fresh._bulk_loading = False
+        with self._lock:
+            state = dict(vars(fresh))
+            del state["_lock"]
+            vars(self).update(state)
+
+    def _prefix_matches(self, key: str) -> List[Tuple[int, int, int]]:
+        """(rank, key length, key id) for keys with a word-suffix starting with key"""
+        matches = []
+        position = bisect.bisect_left(self._suffixes, (key, -1))
+        for suffix, key_id in self._suffixes[position:position + self.prefix_scan_limit]:
+            if not suffix.startswith(key):
+                break
+            full_key = self._keys[key_id][0]
+            # Whole-word matches at the start of the name rank first
+            whole_word = len(suffix) == len(key) or suffix[len(key)] == " "
+            rank = (0 if full_key == suffix else 2) + (0 if whole_word else 1)
+            matches.append((rank, len(full_key), key_id))
+        return matches
+
+    def _typo_matches(self, key: str) -> List[Tuple[int, int, int]]:
+        """(distance, key length, key id) for keys within edit distance of key"""
+        bound = self._bound(len(key))
+        grams = trigrams(key)
+        # An edit touches at most three trigrams, so a match shares at least
+        # `needed` of them and therefore at least one of the rarest
+        # len(grams) - needed + 1; only those postings are walked
+        needed = max(1, len(grams) - 3 * bound)
+        lengths = range(len(key) - bound, len(key) + bound + 1)
+
+        def posting_size(gram):
+            return sum(len(self._postings.get((gram, length), ())) for length in lengths)
+
+        candidates: Set[int] = set()
+        for gram in sorted(grams, key=posting_size)[:len(grams) - needed + 1]:
+            for length in lengths:
+                candidates.update(self._postings.get((gram, length), ()))
+
+        counts = {key_id: len(grams & self._key_grams[key_id]) for key_id in candidates}
+
+        matches = []
+        for key_id, shared in counts.items():
+            if shared < needed:
+                continue
+            candidate_key = self._keys[key_id][0]
+            distance = bounded_edit_distance(key, candidate_key, bound)
+            if distance is not None:
+                matches.append((distance, len(candidate_key), key_id))
+        return matches
+
+    def resolve(self, query: str, limit: int = 5) -> List[Tuple[int, str, int]]:
+        """
+        Best matches for query as (artist_id, canonical name, distance),
+        exact matches first, then partial names, then misspellings.
+
+        Partial matches report a distance of 0 since the query matched
+        verbatim; misspellings report their edit distance.
+        """
+        key = fuzzy_key(query)
+        if not key:
+            return []
+
+        with self._lock:
+            exact = self._key_ids.get(key)
+            if exact is not None:
+                artist_id = self._keys[exact][1]
+                return [(artist_id, self._names[artist_id], 0)]
+
+            ranked = []
+            if len(key) >= self.min_prefix_length:
+                ranked += [((0, rank, length), key_id, 0) for rank, length, key_id in self._prefix_matches(key)]
+            ranked += [((1, distance, length), key_id, distance)
+                       for distance, length, key_id in self._typo_matches(key)]
+            ranked.sort()
+
+            results = []
+            seen = set()
+            for _, key_id, distance in ranked:
+                artist_id = self._keys[key_id][1]
+                if artist_id in seen:
+                    continue
+                seen.add(artist_id)
+                results.append((artist_id, self._names[artist_id], distance))
+                if len(results) >= limit:
+                    break
+            return results
+
+    def _bound(self, length: int) -> int:
+        # One edit per four characters, so names of three letters or fewer
+        # only match exactly or as a prefix
+        return min(self.max_distance, length // 4)
+
+    def best(self, query: str) -> Optional[Tuple[int, str]]:
+        matches = self.resolve(query, limit=1)
+        return (matches[0][0], matches[0][1]) if matches else None
+
+def attach_to_model(index: FuzzyArtistIndex):
+    """
+    Keep index in step with Artist and ArtistAlias rows written through the ORM
+    """
+    @event.listens_for(Artist, "after_insert")
+    def _artist_inserted(mapper, connection, target):
+        if target.name:
+            index.add(target.id, target.name)
+
+    @event.listens_for(Artist, "after_update")
+    def _artist_updated(mapper, connection, target):
+        # Most updates (bios, links, scrape bookkeeping) leave the name alone
+        history = inspect(target).attrs.name.history
+        if not history.added and not history.deleted:
+            return
+        if target.name:
+            index.add(target.id, target.name)
+        else:
+            index.remove(target.id)
+
+    @event.listens_for(Artist, "after_delete")
+    def _artist_deleted(mapper, connection, target):
+        index.remove(target.id)
+
+    @event.listens_for(ArtistAlias, "after_insert")
+    def _alias_inserted(mapper, connection, target):
+        if target.alias:
+            index.add_alias(target.artist_id, target.alias)
+
+    @event.listens_for(ArtistAlias, "after_update")
+    def _alias_updated(mapper, connection, target):
+        state = inspect(target)
+        old_aliases = state.attrs.alias.history.deleted or [target.alias]
+        old_artists = state.attrs.artist_id.history.deleted or [target.artist_id]
+        if old_aliases[0] and (old_aliases[0], old_artists[0]) != (target.alias, target.artist_id):
+            index.remove_alias(old_artists[0], old_aliases[0])
+        if target.alias:
+            index.add_alias(target.artist_id, target.alias)
+
+    @event.listens_for(ArtistAlias, "after_delete")
+    def _alias_deleted(mapper, connection, target):
+        if target.alias:
+            index.remove_alias(target.artist_id, target.alias)
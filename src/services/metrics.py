@@ -0,0 +1,237 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import logging
+import math
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# With metrics off, spans and counters are shared no-ops and /metrics is empty
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Fraction of chat turns whose stage timings are recorded; counters see every turn
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', '1.0'))
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_sampled: ContextVar[bool] = ContextVar("metrics_sampled", default=True)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Monotonic count per combination of label values"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in values]
+
+class Histogram:
+    """Bucketed observations, e.g. seconds, per combination of label values"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def count(self, *label_values: str) -> int:
+        with self._lock:
+            entry = self._values.get(label_values)
+            return sum(entry[0]) if entry else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        lines = []
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class Gauge:
+    """A value read when the metrics are scraped"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def render(self) -> List[str]:
+        try:
+            return [f"{self.name} {_format_value(self.read())}"]
+        except Exception as e:
+            logger.warning(f"Could not read gauge {self.name}: {str(e)}")
+            return []
+
+class _NoopMetric:
+    """Stands in for every metric while metrics are disabled"""
+
+    def inc(self, *label_values: str, amount: float = 1):
+        pass
+
+    def observe(self, value: float, *label_values: str):
+        pass
+
+    def value(self, *label_values: str) -> float:
+        return 0
+
+    def count(self, *label_values: str) -> int:
+        return 0
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NOOP_METRIC = _NoopMetric()
+_NOOP_SPAN = _NoopSpan()
+
+class _Span:
+    __slots__ = ("histogram", "stage", "started")
+
+    def __init__(self, histogram: Histogram, stage: str):
+        self.histogram = histogram
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, self.stage)
+        return False
+
+class MetricsRegistry:
+    """
+    Process-wide counters, histograms and gauges, exported in the
+    Prometheus text format by render().
+
+    span(stage) times a block into the stage latency histogram. Timings are
+    sampled per chat turn: start_turn() decides, with probability
+    sample_rate, whether the spans of the turn running in the current
+    context are recorded. Spans outside a turn are always recorded.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED, sample_rate: float = METRICS_SAMPLE_RATE,
+                 prefix: str = "annie_"):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.prefix = prefix
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self.stage_seconds = self.histogram(
+            "stage_seconds", "Time spent in each stage of serving a chat turn", ("stage",)
+        )
+
+    def _get_or_create(self, name: str, create: Callable[[str], object]):
+        if not self.enabled:
+            return _NOOP_METRIC
+        name = self.prefix + name
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = create(name)
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(name, lambda full_name: Counter(full_name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(
+            name, lambda full_name: Histogram(full_name, documentation, labelnames, buckets)
+        )
+
+    def gauge(self, name: str, documentation: str, read: Callable[[], float]) -> Gauge:
+        return self._get_or_create(name, lambda full_name: Gauge(full_name, documentation, read))
+
+    def start_turn(self) -> bool:
+        """Decide whether the current turn's spans are recorded"""
+        sampled = self.enabled and (self.sample_rate >= 1 or random.random() < self.sample_rate)
+        _sampled.set(sampled)
+        return sampled
+
+    def span(self, stage: str):
+        if not self.enabled or not _sampled.get():
+            return _NOOP_SPAN
+        return _Span(self.stage_seconds, stage)
+
+    def observe_stage(self, stage: str, seconds: float):
+        """Record a stage timed by hand, e.g. one that spans several yields"""
+        if self.enabled and _sampled.get():
+            self.stage_seconds.observe(seconds, stage)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for name, metric in metrics:
+            lines.append(f"# HELP {name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n" if lines else ""
+
+metrics = MetricsRegistry()
+
+def span(stage: str):
+    """Time a block as stage, e.g. with span("db_load"): ..."""
+    return metrics.span(stage)
@@ -1,15 +1,96 @@
 from .web_scraper import MusicNerdScraper
-from .cache import Cache
-from typing import Dict, Optional
+from .cache import Cache, CacheEntry
+from .single_flight import SingleFlight, ThreadSingleFlight
+from typing import Dict, Optional, Tuple
+import asyncio
 import logging
+import os
+import threading
+import time
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Pages are normally kept fresh by the background crawler (src/crawl.py),
+# so user requests only scrape on a cache miss when this is switched on
+SCRAPE_ON_MISS = os.getenv('SCRAPE_ON_MISS', 'false').lower() in ('1', 'true', 'yes')
+# Pages past their TTL are still served, and refreshed in the background
+REVALIDATE_STALE = os.getenv('REVALIDATE_STALE', 'true').lower() in ('1', 'true', 'yes')
+# Minimum gap between background refreshes of the same page
+REVALIDATE_INTERVAL_SECONDS = float(os.getenv('REVALIDATE_INTERVAL_SECONDS', '300'))
+
+# Scraped page text; stored apart from the rest of the record, see split_page_record
+PAGE_BODY_FIELD = 'raw_content'
+
+def split_page_record(info: Dict) -> Tuple[Dict, Optional[str]]:
+    """
+    Split a scraped page into the small metadata record that every lookup
+    reads and the page text that only unindexed pages ever need.
+    """
+    metadata = {key: value for key, value in info.items() if key != PAGE_BODY_FIELD}
+    return metadata, info.get(PAGE_BODY_FIELD)
+
+def store_page_record(cache: Cache, artist_name: str, info: Dict):
+    metadata, body = split_page_record(info)
+    cache.set(artist_name, metadata, body=body)
+
 class MusicNerdAPI:
-    def __init__(self):
+    """
+    Cached access to musicnerd.xyz artist pages.
+
+    Lookups follow stale-while-revalidate: a page past its TTL but within
+    the cache's max staleness is returned straight away and a refresh is
+    scheduled in the background, at most once per
+    REVALIDATE_INTERVAL_SECONDS per page. Only pages that are missing or
+    past max staleness are scraped while the caller waits, and only with
+    scrape_on_miss.
+
+    Lookups return the page's metadata only; get_page_text() loads the
+    page text, which is cached compressed and separately.
+    """
+    
+    def __init__(self, scrape_on_miss: bool = SCRAPE_ON_MISS, revalidate_stale: bool = REVALIDATE_STALE):
         self.scraper = MusicNerdScraper()
         self.cache = Cache()
+        self.scrape_on_miss = scrape_on_miss
+        self.revalidate_stale = revalidate_stale
+        # A trending artist misses the cache for many sessions at once; they
+        # share one fill instead of each scraping the same page
+        self._fills = ThreadSingleFlight("cache_fill")
+        self._afills = SingleFlight("cache_fill")
+        self._revalidated_at: Dict[str, float] = {}
+        self._revalidations = set()
+        self._lock = threading.Lock()
+        self.stale_served = 0
+        self.revalidations = 0
+        self.revalidation_failures = 0
+    
+    def _cached(self, artist_name: str) -> Optional[CacheEntry]:
+        entry = self.cache.get_entry(artist_name)
+        if entry is not None:
+            logger.info(f"Found cached info for {artist_name}")
+        return entry
+    
+    async def _acached(self, artist_name: str) -> Optional[CacheEntry]:
+        entry = await self.cache.aget_entry(artist_name)
+        if entry is not None:
+            logger.info(f"Found cached info for {artist_name}")
+        return entry
+    
+    def _claim_revalidation(self, key: str) -> bool:
+        """Whether a background refresh of key may start now"""
+        if not self.revalidate_stale:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if now - self._revalidated_at.get(key, float('-inf')) < REVALIDATE_INTERVAL_SECONDS:
+                return False
+            if len(self._revalidated_at) > 10000:
+                cutoff = now - REVALIDATE_INTERVAL_SECONDS
+                self._revalidated_at = {k: t for k, t in self._revalidated_at.items() if t >= cutoff}
+            self._revalidated_at[key] = now
+            self.revalidations += 1
+        return True
         
     def get_artist_info(self, artist_name: str) -> Optional[Dict]:
         """
@@ -18,17 +99,111 @@ class MusicNerdAPI:
         logger.info(f"Fetching info for artist: {artist_name}")
         
         # Check cache first
-        cached_info = self.cache.get(artist_name)
-        if cached_info:
-            logger.info(f"Found cached info for {artist_name}")
-            return cached_info
+        entry = self._cached(artist_name)
+        if entry is not None:
+            if entry.stale:
+                self._revalidate(artist_name)
+            return entry.value
+        if not self.scrape_on_miss:
+            return None
             
         # If not in cache, scrape and store
+        return self._fills.do(artist_name.lower(), lambda: self._fill(artist_name))
+    
+    def _revalidate(self, artist_name: str):
+        with self._lock:
+            self.stale_served += 1
+        if not self._claim_revalidation(artist_name.lower()):
+            return
+        
+        def refresh():
+            # Background refreshes queue behind the scraper's rate limit
+            self.scraper.rate_limiter.wait_if_needed()
+            if self._fills.do(artist_name.lower(), lambda: self._fill(artist_name)) is None:
+                with self._lock:
+                    self.revalidation_failures += 1
+        
+        threading.Thread(target=refresh, name=f"revalidate-{artist_name}", daemon=True).start()
+    
+    def _fill(self, artist_name: str) -> Optional[Dict]:
+        # Another caller's fill may have landed since our cache check
+        entry = self.cache.get_entry(artist_name)
+        if entry is not None and not entry.stale:
+            return entry.value
         logger.info(f"Attempting to scrape info for {artist_name}")
         info = self.scraper.scrape_artist(artist_name)
         if info:
             logger.info(f"Successfully scraped info for {artist_name}")
-            self.cache.set(artist_name, info)
+            store_page_record(self.cache, artist_name, info)
         else:
             logger.warning(f"Failed to scrape info for {artist_name}")
-        return info 
\ No newline at end of file
+        return info
+    
+    async def aget_artist_info(self, artist_name: str) -> Optional[Dict]:
+        """
+        Async variant of get_artist_info that never blocks the event loop on
+        HTTP or on the cache's SQLite tier
+        """
+        entry = await self._acached(artist_name)
+        if entry is not None:
+            if entry.stale:
+                self._arevalidate(artist_name)
+            return entry.value
+        if not self.scrape_on_miss:
+            return None
+        return await self._afills.do(artist_name.lower(), lambda: self._afill(artist_name))
+    
+    def _arevalidate(self, artist_name: str):
+        with self._lock:
+            self.stale_served += 1
+        if not self._claim_revalidation(artist_name.lower()):
+            return
+        
+        async def refresh():
+            # fetch() already waits on the shared token bucket
+            try:
+                info = await self._afills.do(artist_name.lower(), lambda: self._afill(artist_name))
+            except Exception as e:
+                logger.error(f"Could not refresh {artist_name}: {str(e)}")
+                info = None
+            if info is None:
+                with self._lock:
+                    self.revalidation_failures += 1
+        
+        task = asyncio.ensure_future(refresh())
+        self._revalidations.add(task)
+        task.add_done_callback(self._revalidations.discard)
+    
+    async def _afill(self, artist_name: str) -> Optional[Dict]:
+        entry = await self.cache.aget_entry(artist_name)
+        if entry is not None and not entry.stale:
+            return entry.value
+        logger.info(f"Attempting to scrape info for {artist_name}")
+        info = await self.scraper.ascrape_artist(artist_name)
+        if info:
+            logger.info(f"Successfully scraped info for {artist_name}")
+            await asyncio.get_running_loop().run_in_executor(
+                None, store_page_record, self.cache, artist_name, info
+            )
+        else:
+            logger.warning(f"Failed to scrape info for {artist_name}")
+        return info
+    
+    def get_page_text(self, artist_name: str, info: Optional[Dict] = None) -> Optional[str]:
+        """
+        Text of the artist's page. info is a record from get_artist_info;
+        freshly scraped ones still carry their text, cached ones load it
+        from the cache.
+        """
+        if info and info.get(PAGE_BODY_FIELD):
+            return info[PAGE_BODY_FIELD]
+        return self.cache.get_body(artist_name)
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "stale_served": self.stale_served,
+                "revalidations": self.revalidations,
+                "revalidation_failures": self.revalidation_failures,
+                "revalidating": len(self._revalidations),
+            }
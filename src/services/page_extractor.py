@@ -0,0 +1,275 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+import multiprocessing
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for parsing; 0 parses on the default thread pool instead
+PAGE_PARSE_WORKERS = int(os.getenv('PAGE_PARSE_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+MAX_RELEASES = 50
+
+# Registered domain -> (link kind, platform). Subdomains resolve to their
+# parent entry, so open.spotify.com and artist.bandcamp.com need no rows.
+PLATFORM_DOMAINS: Dict[str, Tuple[str, str]] = {
+    "instagram.com": ("social", "instagram"),
+    "twitter.com": ("social", "twitter"),
+    "x.com": ("social", "twitter"),
+    "tiktok.com": ("social", "tiktok"),
+    "facebook.com": ("social", "facebook"),
+    "warpcast.com": ("social", "warpcast"),
+    "spotify.com": ("platform", "spotify"),
+    "soundcloud.com": ("platform", "soundcloud"),
+    "music.apple.com": ("platform", "apple_music"),
+    "bandcamp.com": ("platform", "bandcamp"),
+    "youtube.com": ("platform", "youtube"),
+    "youtu.be": ("platform", "youtube"),
+    "audius.co": ("platform", "audius"),
+    "sound.xyz": ("platform", "sound"),
+    "deezer.com": ("platform", "deezer"),
+    "tidal.com": ("platform", "tidal"),
+}
+
+# Host and path of an absolute link; relative links never point at a platform
+_ABSOLUTE_URL = re.compile(r"^(?:https?:)?//(?:[^/?#@]*@)?([^/?#:]+)(?::\d+)?([^?#]*)", re.I)
+# Release pages on the platforms above, e.g. open.spotify.com/album/...
+RELEASE_PATH = re.compile(r"^/(?:[a-z-]+/)?(?:album|track|single|ep|release)s?/", re.I)
+
+_SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "head"}
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+              "meta", "param", "source", "track", "wbr"}
+_BLOCK_TAGS = {"p", "div", "section", "article", "li", "ul", "ol", "br", "tr", "table",
+               "h1", "h2", "h3", "h4", "h5", "h6", "header", "footer", "main", "aside", "nav"}
+# Inline elements that sit side by side without whitespace, e.g. link rows
+_SPACED_TAGS = {"a", "span", "button", "td", "th", "label"}
+_HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+_BIO_MARKER = re.compile(r"(?:^|[\s_-])(?:bio|biography|about)(?:$|[\s_-])", re.I)
+_RELEASE_MARKER = re.compile(r"(?:^|[\s_-])(?:release|releases|discography|album|albums)(?:$|[\s_-])", re.I)
+_WHITESPACE = re.compile(r"\s+")
+
+def classify_url(href: str) -> Optional[Tuple[str, str]]:
+    """(kind, platform) for a link to a known platform, kind being "social" or "platform" """
+    match = _ABSOLUTE_URL.match(href.strip())
+    if not match:
+        return None
+    labels = match.group(1).lower().rstrip(".").split(".")
+    for i in range(len(labels) - 1):
+        match = PLATFORM_DOMAINS.get(".".join(labels[i:]))
+        if match:
+            return match
+    return None
+
+def _clean(text: str) -> str:
+    return _WHITESPACE.sub(" ", text).strip()
+
+class _ArtistPageParser(HTMLParser):
+    """
+    Single streaming pass over an artist page that keeps only what is
+    needed: visible text, classified links, the bio and release titles.
+    No tree is built, so memory stays proportional to the output.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.chunks: List[str] = []
+        self._separator = ""    # "", " " or "\n", owed before the next text
+        self.links: List[Tuple[str, str, str, str]] = []    # (kind, platform, text, href)
+        self.releases: List[str] = []
+        self.meta_description = ""
+        self.bio_parts: List[str] = []
+        self.bio_from_heading = ""
+
+        self._stack: List[str] = []
+        self._skip_depth: Optional[int] = None
+        self._bio_depth: Optional[int] = None
+        self._release_depth: Optional[int] = None
+        self._heading: Optional[List[str]] = None
+        self._after_heading: Optional[str] = None    # "bio" or "releases"
+        self._link: Optional[List] = None
+        self._item: Optional[List[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "meta":
+            name = (attrs.get("name") or attrs.get("property") or "").lower()
+            if name in ("description", "og:description") and not self.meta_description:
+                self.meta_description = _clean(attrs.get("content") or "")
+            return
+        if tag in _VOID_TAGS:
+            if tag == "br":
+                self._separator = "\n"
+            return
+
+        self._stack.append(tag)
+        depth = len(self._stack)
+        if self._skip_depth is not None:
+            return
+        if tag in _SKIPPED_TAGS:
+            self._skip_depth = depth
+            return
+        self._break(tag)
+
+        marker = f"{attrs.get('id') or ''} {attrs.get('class') or ''}"
+        if self._bio_depth is None and not self.bio_parts and _BIO_MARKER.search(marker):
+            self._bio_depth = depth
+        if self._release_depth is None and _RELEASE_MARKER.search(marker):
+            self._release_depth = depth
+
+        if tag in _HEADINGS:
+            self._heading = []
+            self._after_heading = None
+        elif tag == "a" and attrs.get("href"):
+            self._link = [attrs["href"].strip(), []]
+        elif tag in ("li", "p") and (self._release_depth is not None or self._after_heading):
+            self._item = []
+
+    def handle_endtag(self, tag):
+        if tag not in self._stack:
+            return
+        # Pop anything left unclosed inside this element
+        while self._stack:
+            depth = len(self._stack)
+            closing = self._stack.pop()
+            self._close(closing, depth)
+            if closing == tag:
+                break
+
+    def _close(self, tag: str, depth: int):
+        if self._skip_depth is not None:
+            if depth == self._skip_depth:
+                self._skip_depth = None
+            return
+        self._break(tag)
+
+        if tag in _HEADINGS and self._heading is not None:
+            heading = _clean("".join(self._heading)).lower()
+            self._heading = None
+            if _BIO_MARKER.search(heading):
+                self._after_heading = "bio"
+            elif _RELEASE_MARKER.search(heading):
+                self._after_heading = "releases"
+        elif tag == "a" and self._link is not None:
+            href, text = self._link
+            self._link = None
+            text = _clean("".join(text))
+            match = classify_url(href)
+            if match:
+                self.links.append((match[0], match[1], text, href))
+                if text and RELEASE_PATH.match(_ABSOLUTE_URL.match(href).group(2)):
+                    self._add_release(text)
+        elif tag in ("li", "p") and self._item is not None:
+            text = _clean("".join(self._item))
+            self._item = None
+            if self._after_heading == "bio" and tag == "p" and text and not self.bio_from_heading:
+                self.bio_from_heading = text
+                self._after_heading = None
+            elif (self._after_heading == "releases" or self._release_depth is not None) and tag == "li":
+                self._add_release(text)
+
+        if depth == self._bio_depth:
+            self._bio_depth = None
+        if depth == self._release_depth:
+            self._release_depth = None
+
+    def _break(self, tag: str):
+        if tag in _BLOCK_TAGS:
+            self._separator = "\n"
+        elif tag in _SPACED_TAGS and not self._separator:
+            self._separator = " "
+
+    def _add_release(self, text: str):
+        if text and len(self.releases) < MAX_RELEASES and text not in self.releases:
+            self.releases.append(text)
+
+    def handle_data(self, data):
+        if self._skip_depth is not None:
+            return
+        text = " ".join(data.split())
+        if not text:
+            if data and not self._separator:
+                self._separator = " "
+            return
+        if self.chunks:
+            separator = self._separator or (" " if data[0].isspace() else "")
+            if separator:
+                self.chunks.append(separator)
+        self.chunks.append(text)
+        self._separator = " " if data[-1].isspace() else ""
+        if self._heading is not None:
+            self._heading.append(data)
+        if self._link is not None:
+            self._link[1].append(data)
+        if self._item is not None:
+            self._item.append(data)
+        if self._bio_depth is not None and self._heading is None:
+            self.bio_parts.append(data)
+
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+    def bio(self) -> str:
+        bio = _clean(" ".join(self.bio_parts))
+        return bio or self.bio_from_heading or self.meta_description
+
+def extract_artist_page(artist_name: str, url: str, html: str) -> Dict:
+    """
+    Artist info from a musicnerd.xyz page: visible text, social and
+    streaming links keyed by platform, bio and release titles.
+    """
+    parser = _ArtistPageParser()
+    parser.feed(html)
+    parser.close()
+
+    social_links: Dict[str, str] = {}
+    platform_links: Dict[str, str] = {}
+    for kind, platform, _, href in parser.links:
+        links = social_links if kind == "social" else platform_links
+        # The first link to a platform is the artist's own, later ones are
+        # usually shares or embeds
+        links.setdefault(platform, href)
+
+    return {
+        "name": artist_name,
+        "url": url,
+        "raw_content": parser.text(),
+        "social_links": social_links,
+        "platform_links": platform_links,
+        "releases": parser.releases,
+        "bio": parser.bio(),
+    }
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+
+def get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """Process-wide parsing pool, or None when PAGE_PARSE_WORKERS is 0"""
+    global _parse_pool
+    if _parse_pool is None and PAGE_PARSE_WORKERS > 0:
+        # spawn rather than fork: the parent runs threads (cache compactor,
+        # executors) that must not be copied mid-operation
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=PAGE_PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _parse_pool
+
+def shutdown_parse_pool():
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(wait=False)
+        _parse_pool = None
+
+async def aextract_artist_page(artist_name: str, url: str, html: str) -> Dict:
+    """extract_artist_page off the event loop"""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_parse_pool(), extract_artist_page, artist_name, url, html)
+    except BrokenProcessPool:
+        # A worker died; start a fresh pool next time and finish this one here
+        logger.warning("Page parsing pool broke, recreating it")
+        shutdown_parse_pool()
+        return await loop.run_in_executor(None, extract_artist_page, artist_name, url, html)
@@ -0,0 +1,608 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import (
+    Artist, PlatformLink, SocialMedia, artists_changed_since, get_catalogue_version,
+    normalize_artist_name, read_session, split_genres
+)
+
+logger = logging.getLogger(__name__)
+
+# Neighbours kept per artist
+RECOMMENDER_NEIGHBOURS = int(os.getenv('RECOMMENDER_NEIGHBOURS', '20'))
+# Relative weight of each kind of evidence; 0 leaves it out
+RECOMMENDER_GENRE_WEIGHT = float(os.getenv('RECOMMENDER_GENRE_WEIGHT', '1.0'))
+RECOMMENDER_PLATFORM_WEIGHT = float(os.getenv('RECOMMENDER_PLATFORM_WEIGHT', '0.2'))
+# Similarity of scraped page embeddings; off by default as few pages are indexed
+RECOMMENDER_TEXT_WEIGHT = float(os.getenv('RECOMMENDER_TEXT_WEIGHT', '0'))
+# How often catalogue changes are picked up
+RECOMMENDER_REFRESH_SECONDS = float(os.getenv('RECOMMENDER_REFRESH_SECONDS', '30'))
+# Share of the catalogue changed since the last refresh past which the index
+# is rebuilt rather than updated artist by artist
+RECOMMENDER_REBUILD_FRACTION = float(os.getenv('RECOMMENDER_REBUILD_FRACTION', '0.01'))
+
+_NO_ROWS = np.zeros(0, dtype=np.int32)
+
+class ArtistFeatures(NamedTuple):
+    artist_id: int
+    name: str
+    genres: List[str]                       # normalized genre keys
+    platforms: List[str]                    # e.g. "social:instagram", "platform:spotify"
+    text_vector: Optional[np.ndarray] = None
+
+def _idf(frequency: int, total: int) -> float:
+    return math.log(1 + total / max(frequency, 1))
+
+class NeighbourIndex:
+    """
+    Artist feature vectors plus every artist's top-k most similar artists.
+
+    Similarity is a weighted mean of cosines over IDF-weighted genres, the
+    platforms an artist is on and, optionally, page embeddings. Only
+    artists sharing a genre are compared at all: each genre keeps a posting
+    array of the rows tagged with it, so scoring an artist touches just its
+    genres' postings rather than the whole catalogue, and platforms and
+    page text only rank artists within that set. An artist without genres
+    has no neighbours.
+
+    Row i of neighbours/scores holds artist i's nearest rows, best first,
+    padded with -1 and 0, so a lookup is a dict hit and a row slice. Rows
+    are never reused; a removed artist leaves an empty row until the next
+    full build.
+    """
+
+    def __init__(self, k: int = RECOMMENDER_NEIGHBOURS, genre_weight: float = RECOMMENDER_GENRE_WEIGHT,
+                 platform_weight: float = RECOMMENDER_PLATFORM_WEIGHT,
+                 text_weight: float = RECOMMENDER_TEXT_WEIGHT):
+        total = genre_weight + platform_weight + text_weight
+        if total <= 0:
+            raise ValueError("At least one recommender weight must be positive")
+        self.k = k
+        self.genre_weight = genre_weight / total
+        self.platform_weight = platform_weight / total
+        self.text_weight = text_weight / total
+
+        self.size = 0
+        self.ids: List[int] = []
+        self.names: List[Optional[str]] = []
+        self.row_of: Dict[int, int] = {}
+        self.row_of_key: Dict[str, int] = {}
+
+        self.genre_columns: Dict[str, int] = {}
+        self.postings: List[np.ndarray] = []        # genre column -> rows tagged with it
+        self.idf2 = np.zeros(0, dtype=np.float32)   # squared IDF per genre column
+        self.row_genres: List[np.ndarray] = []      # row -> genre columns
+        self.genre_scale = np.zeros(0, dtype=np.float32)    # 1 / norm of each row's genre vector
+
+        self.platform_columns: Dict[str, int] = {}
+        self.platform_idf = np.zeros(0, dtype=np.float32)
+        self.platforms = np.zeros((0, 0), dtype=np.float32)
+        self.text = np.zeros((0, 0), dtype=np.float32)
+        self.has_text = np.zeros(0, dtype=bool)
+
+        self.neighbours = np.full((0, k), -1, dtype=np.int32)
+        self.scores = np.zeros((0, k), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.row_of)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.idf2, self.genre_scale, self.platform_idf, self.platforms,
+                  self.text, self.has_text, self.neighbours, self.scores]
+        return sum(a.nbytes for a in arrays) + sum(a.nbytes for a in self.postings) + \
+            sum(a.nbytes for a in self.row_genres)
+
+    @classmethod
+    def build(cls, artists: Sequence[ArtistFeatures], **options) -> "NeighbourIndex":
+        """Index artists and compute every neighbour list from scratch"""
+        index = cls(**options)
+        total = len(artists)
+        index._reserve(total)
+
+        genre_counts: Dict[str, int] = {}
+        platform_counts: Dict[str, int] = {}
+        dims = 0
+        for artist in artists:
+            for genre in set(artist.genres):
+                genre_counts[genre] = genre_counts.get(genre, 0) + 1
+            for platform in set(artist.platforms):
+                platform_counts[platform] = platform_counts.get(platform, 0) + 1
+            if artist.text_vector is not None:
+                dims = len(artist.text_vector)
+
+        index.genre_columns = {genre: column for column, genre in enumerate(genre_counts)}
+        index.idf2 = np.array([_idf(count, total) ** 2 for count in genre_counts.values()], dtype=np.float32)
+        index.platform_columns = {platform: column for column, platform in enumerate(platform_counts)}
+        index.platform_idf = np.array([_idf(count, total) for count in platform_counts.values()], dtype=np.float32)
+        index.platforms = np.zeros((len(index.genre_scale), len(platform_counts)), dtype=np.float32)
+        if index.text_weight and dims:
+            index.text = np.zeros((len(index.genre_scale), dims), dtype=np.float32)
+
+        postings: List[List[int]] = [[] for _ in genre_counts]
+        for row, artist in enumerate(artists):
+            index._add_row(artist)
+            columns = sorted({index.genre_columns[genre] for genre in artist.genres})
+            for column in columns:
+                postings[column].append(row)
+            index.row_genres[row] = np.array(columns, dtype=np.int32)
+            index._set_dense(row, artist)
+        index.postings = [np.array(rows, dtype=np.int32) for rows in postings]
+        index._set_genre_scales(np.arange(total))
+
+        index._rescore(np.arange(total))
+        return index
+
+    def _reserve(self, rows: int):
+        """Grow the per-row arrays (by doubling) to hold at least rows rows"""
+        capacity = len(self.genre_scale)
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2, 64)
+
+        def grown(array: np.ndarray, fill=0) -> np.ndarray:
+            bigger = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            bigger[:len(array)] = array
+            return bigger
+
+        self.genre_scale = grown(self.genre_scale)
+        self.platforms = grown(self.platforms)
+        self.text = grown(self.text)
+        self.has_text = grown(self.has_text, False)
+        self.neighbours = grown(self.neighbours, -1)
+        self.scores = grown(self.scores)
+
+    def _add_row(self, artist: ArtistFeatures) -> int:
+        row = self.size
+        self.size += 1
+        self.ids.append(artist.artist_id)
+        self.names.append(artist.name)
+        self.row_genres.append(_NO_ROWS)
+        self.row_of[artist.artist_id] = row
+        self.row_of_key[normalize_artist_name(artist.name)] = row
+        return row
+
+    def _set_genre_scales(self, rows: np.ndarray):
+        for row in rows:
+            norm = math.sqrt(float(self.idf2[self.row_genres[row]].sum()))
+            self.genre_scale[row] = 1 / norm if norm else 0
+
+    def _set_dense(self, row: int, artist: ArtistFeatures):
+        vector = np.zeros(self.platforms.shape[1], dtype=np.float32)
+        for platform in artist.platforms:
+            column = self.platform_columns[platform]
+            vector[column] = self.platform_idf[column]
+        norm = np.linalg.norm(vector)
+        self.platforms[row] = vector / norm if norm else vector
+
+        if self.text.shape[1]:
+            text_vector = artist.text_vector
+            if text_vector is not None and len(text_vector) == self.text.shape[1]:
+                norm = np.linalg.norm(text_vector)
+                self.text[row] = text_vector / norm if norm else 0
+                self.has_text[row] = bool(norm)
+            else:
+                self.text[row] = 0
+                self.has_text[row] = False
+
+    def _genre_similarities(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (candidate rows, weighted genre cosines) for the artists sharing at
+        least one genre with row, row itself included. Only row's genres'
+        posting arrays are walked to find them.
+        """
+        columns = self.row_genres[row]
+        postings = [self.postings[column] for column in columns]
+        if not postings:
+            return _NO_ROWS, np.zeros(0, dtype=np.float32)
+        if len(postings) == 1:
+            candidates = postings[0]
+            overlap = np.full(len(candidates), self.idf2[columns[0]], dtype=np.float32)
+        else:
+            stacked = np.concatenate(postings)
+            weights = np.repeat(self.idf2[columns], [len(posting) for posting in postings])
+            if len(stacked) * 8 > self.size:
+                # Counting over every row beats sorting once postings are long
+                overlap = np.bincount(stacked, weights=weights, minlength=self.size)
+                candidates = np.flatnonzero(overlap != 0).astype(np.int32)
+                overlap = overlap[candidates].astype(np.float32)
+            else:
+                candidates, inverse = np.unique(stacked, return_inverse=True)
+                overlap = np.bincount(inverse, weights=weights).astype(np.float32)
+        return candidates, overlap * (self.genre_weight * self.genre_scale[row]) * self.genre_scale[candidates]
+
+    def _similarities(self, row: int, genre: Optional[Tuple[np.ndarray, np.ndarray]] = None
+                      ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (candidate rows, weighted cosine similarities) of row, row itself
+        included; artists sharing no genre with it score 0 and are left out
+        """
+        candidates, similarities = genre or self._genre_similarities(row)
+        similarities = similarities.copy()
+        if self.platform_weight and self.platforms.shape[1] and len(candidates):
+            similarities += self.platform_weight * (self.platforms[candidates] @ self.platforms[row])
+        if self.text_weight and self.text.shape[1] and self.has_text[row]:
+            # Few artists have indexed pages, so only those are gathered
+            with_text = self.has_text[candidates]
+            similarities[with_text] += self.text_weight * (self.text[candidates[with_text]] @ self.text[row])
+        return candidates, similarities
+
+    def _top(self, candidates: np.ndarray, similarities: np.ndarray, k: int,
+             exclude: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """The k best candidates, best first, padded with -1 and 0"""
+        neighbours = np.full(k, -1, dtype=np.int32)
+        scores = np.zeros(k, dtype=np.float32)
+        keep = similarities > 0
+        if exclude is not None:
+            keep &= candidates != exclude
+        candidates, similarities = candidates[keep], similarities[keep]
+        if len(candidates) > k:
+            best = np.argpartition(similarities, len(candidates) - k)[len(candidates) - k:]
+            candidates, similarities = candidates[best], similarities[best]
+        order = np.argsort(-similarities, kind="stable")
+        neighbours[:len(order)] = candidates[order]
+        scores[:len(order)] = similarities[order]
+        return neighbours, scores
+
+    def _rescore(self, rows: Iterable[int]):
+        """
+        Recompute the neighbour lists of rows. Artists with the same genres
+        and platforms (and no page vector) have the same similarities, so
+        each such group is scored once: its top k + 1 serves every member
+        once the member itself is dropped. Groups run in genre order so
+        consecutive ones reuse the genre pass.
+        """
+        groups: Dict[Tuple, List[int]] = {}
+        for row in rows:
+            genres = self.row_genres[row].tobytes()
+            if self.has_text[row]:
+                key = (genres, row)
+            else:
+                key = (genres, self.platforms[row].tobytes())
+            groups.setdefault(key, []).append(row)
+
+        last_genres, genre = None, None
+        for key in sorted(groups, key=lambda key: key[0]):
+            members = groups[key]
+            if key[0] != last_genres:
+                last_genres, genre = key[0], self._genre_similarities(members[0])
+            candidates, similarities = self._similarities(members[0], genre)
+            if len(members) == 1:
+                row = members[0]
+                self.neighbours[row], self.scores[row] = self._top(candidates, similarities, self.k, row)
+                continue
+            neighbours, scores = self._top(candidates, similarities, self.k + 1)
+            for row in members:
+                position = np.flatnonzero(neighbours == row)
+                drop = position[0] if len(position) else self.k
+                self.neighbours[row] = np.delete(neighbours, drop)
+                self.scores[row] = np.delete(scores, drop)
+
+    def _sort_rows(self, rows: np.ndarray):
+        if not len(rows):
+            return
+        order = np.argsort(-self.scores[rows], axis=1, kind="stable")
+        self.neighbours[rows] = np.take_along_axis(self.neighbours[rows], order, axis=1)
+        self.scores[rows] = np.take_along_axis(self.scores[rows], order, axis=1)
+
+    def _clear_features(self, row: int):
+        for column in self.row_genres[row]:
+            posting = self.postings[column]
+            self.postings[column] = posting[posting != row]
+        self.row_genres[row] = _NO_ROWS
+        self.genre_scale[row] = 0
+        self.platforms[row] = 0
+        self.text[row] = 0
+        self.has_text[row] = False
+
+    def _column(self, columns: Dict[str, int], name: str) -> int:
+        column = columns.get(name)
+        if column is not None:
+            return column
+        # IDFs are fixed at build time; a new value is as rare as it gets
+        column = columns[name] = len(columns)
+        idf = _idf(1, max(len(self), 1))
+        if columns is self.genre_columns:
+            self.idf2 = np.append(self.idf2, np.float32(idf ** 2))
+            self.postings.append(_NO_ROWS)
+        else:
+            self.platform_idf = np.append(self.platform_idf, np.float32(idf))
+            self.platforms = np.hstack([self.platforms, np.zeros((len(self.platforms), 1), dtype=np.float32)])
+        return column
+
+    def upsert(self, artist: ArtistFeatures):
+        """Add or re-score one artist and patch the lists it enters or leaves"""
+        row = self.row_of.get(artist.artist_id)
+        if row is None:
+            self._reserve(self.size + 1)
+            row = self._add_row(artist)
+        else:
+            old_name = self.names[row]
+            if old_name is not None and self.row_of_key.get(normalize_artist_name(old_name)) == row:
+                del self.row_of_key[normalize_artist_name(old_name)]
+            self.names[row] = artist.name
+            self.row_of_key[normalize_artist_name(artist.name)] = row
+            self._clear_features(row)
+
+        columns = sorted({self._column(self.genre_columns, genre) for genre in artist.genres})
+        for column in columns:
+            self.postings[column] = np.append(self.postings[column], np.int32(row))
+        self.row_genres[row] = np.array(columns, dtype=np.int32)
+        self._set_genre_scales([row])
+        for platform in artist.platforms:
+            self._column(self.platform_columns, platform)
+        if self.text_weight and not self.text.shape[1] and artist.text_vector is not None:
+            self.text = np.zeros((len(self.genre_scale), len(artist.text_vector)), dtype=np.float32)
+        self._set_dense(row, artist)
+        self._relink(row)
+
+    def remove(self, artist_id: int):
+        row = self.row_of.pop(artist_id, None)
+        if row is None:
+            return
+        name = self.names[row]
+        if name is not None and self.row_of_key.get(normalize_artist_name(name)) == row:
+            del self.row_of_key[normalize_artist_name(name)]
+        self.names[row] = None
+        self._clear_features(row)
+        self._relink(row)
+
+    def _relink(self, row: int):
+        """
+        Refresh row's own list, then fix up the others: similarity is
+        symmetric, so row's scores say exactly which lists it now enters,
+        rises in or falls out of. Only lists it fell in are rescored in full.
+        """
+        candidates, candidate_similarities = self._similarities(row)
+        self.neighbours[row], self.scores[row] = self._top(candidates, candidate_similarities, self.k, row)
+
+        size = self.size
+        similarities = np.zeros(size, dtype=np.float32)
+        similarities[candidates] = candidate_similarities
+        similarities[row] = 0
+        listed = self.neighbours[:size] == row
+        holders = np.nonzero(listed.any(axis=1))[0]
+        slots = listed[holders].argmax(axis=1)
+        new = similarities[holders]
+        kept = new >= self.scores[holders, slots]
+        self.scores[holders[kept], slots[kept]] = new[kept]
+
+        joining = np.nonzero((similarities > self.scores[:size, -1]) & ~listed.any(axis=1))[0]
+        self.neighbours[joining, -1] = row
+        self.scores[joining, -1] = similarities[joining]
+
+        self._sort_rows(np.concatenate([holders[kept], joining]))
+        self._rescore(holders[~kept])
+
+    def similar(self, row: int, limit: int) -> List[Tuple[str, float]]:
+        similar = []
+        for neighbour, score in zip(self.neighbours[row].tolist(), self.scores[row].tolist()):
+            if neighbour < 0:
+                break
+            name = self.names[neighbour]
+            if name is not None:
+                similar.append((name, score))
+                if len(similar) >= limit:
+                    break
+        return similar
+
+class ArtistRecommender:
+    """
+    Similar-artist recommendations served from a precomputed NeighbourIndex.
+
+    The index is built in the background on first use and kept current by
+    run_refresher(): when the catalogue version moves, only the artists
+    stamped with a newer version are loaded and re-scored incrementally,
+    whichever process wrote them. A delta larger than rebuild_fraction of
+    the catalogue (e.g. a bulk import) triggers a full rebuild instead.
+    Lookups never touch the database, so recommendations cost nothing at
+    request time; until the first build finishes there are none.
+    """
+
+    def __init__(self, session_factory: sessionmaker = read_session, page_index=None,
+                 k: int = RECOMMENDER_NEIGHBOURS, genre_weight: float = RECOMMENDER_GENRE_WEIGHT,
+                 platform_weight: float = RECOMMENDER_PLATFORM_WEIGHT,
+                 text_weight: float = RECOMMENDER_TEXT_WEIGHT,
+                 rebuild_fraction: float = RECOMMENDER_REBUILD_FRACTION):
+        self.session_factory = session_factory
+        self.rebuild_fraction = rebuild_fraction
+        # Page embeddings only count when they are weighted
+        self.page_index = page_index if text_weight else None
+        self.options = {"k": k, "genre_weight": genre_weight,
+                        "platform_weight": platform_weight, "text_weight": text_weight}
+        self._index: Optional[NeighbourIndex] = None
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        # Artists to re-score whose catalogue rows did not change, e.g. a new page embedding
+        self._changed: Set[int] = set()
+        self._task: Optional[asyncio.Future] = None
+        self.builds = 0
+        self.updates = 0
+        self.last_build_seconds: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._index is not None
+
+    def start(self, interval_seconds: float = RECOMMENDER_REFRESH_SECONDS):
+        """Build the index and keep it current in the background (once per process)"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.run_refresher(interval_seconds))
+
+    async def run_refresher(self, interval_seconds: float = RECOMMENDER_REFRESH_SECONDS):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Could not refresh artist recommendations: {e}")
+            await asyncio.sleep(interval_seconds)
+
+    def note_changed(self, artist_ids: Iterable[int]):
+        """Re-score artist_ids on the next refresh"""
+        with self._lock:
+            self._changed.update(artist_id for artist_id in artist_ids if artist_id is not None)
+
+    def note_page_indexed(self, artist_name: str):
+        """Re-score an artist whose page embedding changed"""
+        index = self._index
+        if self.page_index is None or index is None:
+            return
+        row = index.row_of_key.get(normalize_artist_name(artist_name))
+        if row is not None:
+            self.note_changed([index.ids[row]])
+
+    async def refresh(self):
+        index = self._index
+        changed: Set[int] = set()
+        async with self.session_factory() as session:
+            version = await get_catalogue_version(session)
+            if index is not None and version != self._version:
+                changed.update((await session.execute(artists_changed_since(self._version))).scalars().all())
+                if len(changed) <= self.rebuild_fraction * len(index):
+                    changed |= await self._removed(session, index, changed)
+        with self._lock:
+            pending, self._changed = self._changed, set()
+
+        if index is None or len(changed) > self.rebuild_fraction * len(index):
+            await self.rebuild(version)
+            return
+        if changed | pending:
+            await self._apply(changed | pending)
+            logger.info(f"Re-scored {len(changed | pending)} changed artists")
+        self._version = version
+
+    @staticmethod
+    async def _removed(session, index: "NeighbourIndex", changed: Set[int]) -> Set[int]:
+        """Indexed artists that were deleted; deletes leave no version stamp behind"""
+        named = (await session.execute(
+            select(func.count(Artist.id)).where(Artist.name.isnot(None), Artist.name != "")
+        )).scalar()
+        if named == len(set(index.row_of) | changed):
+            return set()
+        live = set((await session.execute(
+            select(Artist.id).where(Artist.name.isnot(None), Artist.name != "")
+        )).scalars().all())
+        return set(index.row_of) - live
+
+    async def rebuild(self, version: Optional[int] = None):
+        if version is None:
+            async with self.session_factory() as session:
+                version = await get_catalogue_version(session)
+        started = time.perf_counter()
+        artists = await self._load()
+        loop = asyncio.get_running_loop()
+        # Scoring releases the GIL in numpy, so the event loop stays responsive
+        index = await loop.run_in_executor(None, lambda: NeighbourIndex.build(artists, **self.options))
+        self._index = index
+        self._version = version
+        self.builds += 1
+        self.last_build_seconds = round(time.perf_counter() - started, 2)
+        logger.info(f"Built recommendations for {len(index)} artists in {self.last_build_seconds}s")
+
+    async def _apply(self, artist_ids: Set[int]):
+        artists = await self._load(artist_ids)
+        found = {artist.artist_id for artist in artists}
+        index = self._index
+
+        def apply():
+            for artist in artists:
+                index.upsert(artist)
+            for artist_id in artist_ids - found:
+                index.remove(artist_id)
+
+        await asyncio.get_running_loop().run_in_executor(None, apply)
+        self.updates += len(artist_ids)
+
+    async def _load(self, artist_ids: Optional[Iterable[int]] = None) -> List[ArtistFeatures]:
+        """Features of artist_ids, or of every artist when None"""
+        if artist_ids is None:
+            chunks = [None]
+        else:
+            artist_ids = sorted(artist_ids)
+            chunks = [artist_ids[offset:offset + 500] for offset in range(0, len(artist_ids), 500)]
+
+        rows: List[Tuple[int, str, Optional[str]]] = []
+        platforms: Dict[int, Set[str]] = {}
+        async with self.session_factory() as session:
+            for chunk in chunks:
+                queries = [select(Artist.id, Artist.name, Artist.genres)]
+                children = [("social", select(SocialMedia.artist_id, SocialMedia.platform)),
+                            ("platform", select(PlatformLink.artist_id, PlatformLink.platform))]
+                if chunk is not None:
+                    queries[0] = queries[0].where(Artist.id.in_(chunk))
+                    children = [(kind, query.where(query.selected_columns[0].in_(chunk)))
+                                for kind, query in children]
+                rows.extend(await session.execute(queries[0]))
+                for kind, query in children:
+                    for artist_id, platform in await session.execute(query):
+                        if platform:
+                            platforms.setdefault(artist_id, set()).add(f"{kind}:{platform.lower()}")
+
+        vectors: Dict[str, np.ndarray] = {}
+        if self.page_index is not None:
+            names = None if artist_ids is None else [name for _, name, _ in rows if name]
+            vectors = await asyncio.get_running_loop().run_in_executor(
+                None, self.page_index.artist_vectors, names
+            )
+
+        return [
+            ArtistFeatures(
+                artist_id=artist_id,
+                name=name,
+                genres=[normalize_artist_name(genre) for genre in split_genres(genres)],
+                platforms=sorted(platforms.get(artist_id, ())),
+                text_vector=vectors.get(normalize_artist_name(name))
+            )
+            for artist_id, name, genres in rows if name
+        ]
+
+    def similar(self, artist_id: int, limit: int = 10) -> Optional[List[Dict]]:
+        """Most similar artists to artist_id, best first; None until the index is built"""
+        index = self._index
+        if index is None:
+            return None
+        row = index.row_of.get(artist_id)
+        if row is None:
+            return []
+        return [{"name": name, "score": round(score, 4)} for name, score in index.similar(row, limit)]
+
+    def recommend(self, artist_names: Sequence[str], limit: int = 5) -> List[str]:
+        """
+        Artists similar to artist_names, best first, leaving out the named
+        artists themselves. Artists close to several of them rank higher.
+        """
+        index = self._index
+        if index is None or not artist_names:
+            return []
+        rows = [index.row_of_key.get(normalize_artist_name(name)) for name in artist_names]
+        rows = [row for row in rows if row is not None]
+        named = {index.names[row] for row in rows}
+        totals: Dict[str, float] = {}
+        for row in rows:
+            for name, score in index.similar(row, index.k):
+                if name not in named:
+                    totals[name] = totals.get(name, 0.0) + score
+        ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+        return [name for name, _ in ranked[:limit]]
+
+    def stats(self) -> Dict:
+        index = self._index
+        return {
+            "ready": index is not None,
+            "artists": len(index) if index is not None else 0,
+            "neighbours": self.options["k"],
+            "bytes": index.nbytes if index is not None else 0,
+            "catalogue_version": self._version,
+            "builds": self.builds,
+            "last_build_seconds": self.last_build_seconds,
+            "incremental_updates": self.updates,
+        }
@@ -0,0 +1,91 @@
+from typing import Any, Callable, Dict
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process right now (0 if unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class ModelRegistry:
+    """
+    Process-wide holder for expensive models and clients.
+
+    Each object is built by its registered factory the first time get() is
+    called for it, at most once per process even when several threads ask
+    at the same time. Load time and the RSS growth it caused are recorded
+    so the cost of each model is visible.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._load_stats: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        lock = self._locks.get(name)
+        if lock is None:
+            raise KeyError(f"No model registered as {name!r}")
+
+        with lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                rss_before = current_rss_bytes()
+                started = time.perf_counter()
+                instance = self._factories[name]()
+                elapsed = time.perf_counter() - started
+                self._load_stats[name] = {
+                    "load_seconds": round(elapsed, 3),
+                    "rss_delta_bytes": current_rss_bytes() - rss_before,
+                }
+                logger.info(f"Loaded {name} in {elapsed:.2f}s")
+                self._instances[name] = instance
+        return instance
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def stats(self) -> Dict:
+        return {
+            "registered": sorted(self._factories),
+            "loaded": dict(self._load_stats),
+            "rss_bytes": current_rss_bytes(),
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+
+def _huggingface_embeddings():
+    from langchain.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings()
+
+def _ollama():
+    from langchain_community.llms import Ollama
+    return Ollama(model=os.getenv("OLLAMA_MODEL", "deepseek-r1"))
+
+registry = ModelRegistry()
+registry.register("embeddings", _huggingface_embeddings)
+registry.register("ollama", _ollama)
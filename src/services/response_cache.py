@@ -0,0 +1,144 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+from .cache import MemoryCache
+
+logger = logging.getLogger(__name__)
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.,]+$")
+
+def normalize_question(text: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return _TRAILING_PUNCTUATION.sub("", " ".join(text.lower().split()))
+
+def fingerprint(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class ResponseCache:
+    """
+    Cache of LLM replies for repeatable questions.
+
+    Entries are keyed on the normalized question plus fingerprints of the
+    artist context that was injected and of the conversation history, so a
+    change to an artist's data or a different conversation never reuses a
+    reply. With similarity_threshold set, a question that misses exactly
+    can still hit an earlier one asked with the same context and history
+    whose embedding is at least that similar.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 3600,
+                 similarity_threshold: Optional[float] = None,
+                 embeddings: Optional[Embeddings] = None, max_similar_per_group: int = 256):
+        self.entries = MemoryCache(
+            max_entries=max_entries, max_bytes=16 * 1024 * 1024, default_ttl_seconds=ttl_seconds
+        )
+        self.similarity_threshold = similarity_threshold
+        self.embeddings = embeddings
+        self.max_similar_per_group = max_similar_per_group
+        self.max_groups = max_entries
+        # (context, history) fingerprint -> [(unit vector, entry key)]
+        self._groups: "OrderedDict[str, List[tuple]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.similar_hits = 0
+
+    @property
+    def similarity_enabled(self) -> bool:
+        return self.similarity_threshold is not None and self.embeddings is not None
+
+    @staticmethod
+    def history_fingerprint(messages: Sequence) -> str:
+        return fingerprint(*(f"{message.type}:{message.content}" for message in messages))
+
+    async def get(self, question: str, context: str, history_fingerprint: str) -> Optional[str]:
+        group = fingerprint(context, history_fingerprint)
+        key = fingerprint(normalize_question(question), group)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self._touch(group)
+            return entry["response"]
+
+        if not self.similarity_enabled:
+            return None
+        with self._lock:
+            if not self._groups.get(group):
+                return None
+
+        try:
+            vector = await self._embed(question)
+        except Exception as e:
+            logger.error(f"Could not embed question for response cache: {str(e)}")
+            return None
+        with self._lock:
+            members = list(self._groups.get(group, ()))
+        best_key, best_score = None, self.similarity_threshold
+        for member_vector, member_key in members:
+            score = float(member_vector @ vector)
+            if score >= best_score:
+                best_key, best_score = member_key, score
+        if best_key is None:
+            return None
+
+        entry = self.entries.get(best_key)
+        if entry is None:
+            # Expired or evicted since it was indexed
+            with self._lock:
+                members = self._groups.get(group)
+                if members is not None:
+                    members[:] = [m for m in members if m[1] != best_key]
+                    if not members:
+                        del self._groups[group]
+            return None
+        with self._lock:
+            self.similar_hits += 1
+            if group in self._groups:
+                self._groups.move_to_end(group)
+        return entry["response"]
+
+    def _touch(self, group: str):
+        """Mark group as recently used so it is the last to be dropped"""
+        with self._lock:
+            if group in self._groups:
+                self._groups.move_to_end(group)
+
+    async def set(self, question: str, context: str, history_fingerprint: str, response: str):
+        group = fingerprint(context, history_fingerprint)
+        key = fingerprint(normalize_question(question), group)
+        self.entries.set(key, {"response": response}, size=len(response) + 64)
+
+        if not self.similarity_enabled:
+            return
+        try:
+            vector = await self._embed(question)
+        except Exception as e:
+            logger.error(f"Could not embed question for response cache: {str(e)}")
+            return
+        with self._lock:
+            members = self._groups.setdefault(group, [])
+            self._groups.move_to_end(group)
+            members.append((vector, key))
+            del members[:-self.max_similar_per_group]
+            while len(self._groups) > self.max_groups:
+                self._groups.popitem(last=False)
+
+    async def _embed(self, question: str) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        vector = await loop.run_in_executor(None, self.embeddings.embed_query, normalize_question(question))
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1)
+
+    def stats(self) -> Dict:
+        stats = self.entries.stats()
+        stats["similar_hits"] = self.similar_hits
+        return stats
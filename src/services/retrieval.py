@@ -0,0 +1,286 @@
+from typing import Callable, Dict, Iterable, List, Optional
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from src.models.database import normalize_artist_name
+from .cache import MemoryCache
+from .registry import registry
+
+logger = logging.getLogger(__name__)
+
+def _connect(path: str) -> sqlite3.Connection:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that never embeds the same text twice.
+
+    Document vectors are cached in SQLite under a hash of the text, and
+    cache misses are sent to the underlying model in batches of batch_size.
+    Query vectors (one per chat question) are only kept in a bounded
+    in-memory LRU of query_cache_size entries, so chat traffic cannot grow
+    the table without limit.
+    """
+
+    def __init__(self, path: str = "data/retrieval.db",
+                 embeddings_factory: Callable[[], Embeddings] = lambda: registry.get("embeddings"),
+                 batch_size: int = 64, query_cache_size: int = 1024):
+        self.embeddings_factory = embeddings_factory
+        self.batch_size = batch_size
+        # Embeddings never go stale, so entries only leave by eviction
+        self.queries = MemoryCache(max_entries=query_cache_size, default_ttl_seconds=float("inf"))
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                text_hash TEXT PRIMARY KEY,
+                vector BLOB NOT NULL
+            )
+        """)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for offset in range(0, len(hashes), 500):
+                chunk = hashes[offset:offset + 500]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embedding_cache "
+                    f"WHERE text_hash IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]):
+        rows = [(text_hash, np.asarray(vector, dtype=np.float32).tobytes())
+                for text_hash, vector in vectors.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (text_hash, vector) VALUES (?, ?)", rows
+            )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [self._hash(text) for text in texts]
+        vectors = self._lookup(list(set(hashes)))
+        self.hits += sum(1 for text_hash in hashes if text_hash in vectors)
+
+        missing = {}
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in vectors:
+                missing[text_hash] = text
+        self.misses += len(missing)
+
+        if missing:
+            model = self.embeddings_factory()
+            pending = list(missing.items())
+            for offset in range(0, len(pending), self.batch_size):
+                batch = pending[offset:offset + self.batch_size]
+                embedded = model.embed_documents([text for _, text in batch])
+                new_vectors = {text_hash: vector for (text_hash, _), vector in zip(batch, embedded)}
+                self._store(new_vectors)
+                vectors.update(new_vectors)
+
+        return [vectors[text_hash] for text_hash in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        text_hash = self._hash(text)
+        vector = self.queries.get(text_hash)
+        if vector is None:
+            vector = np.asarray(self.embeddings_factory().embed_query(text), dtype=np.float32)
+            self.queries.set(text_hash, vector, size=vector.nbytes)
+        return vector.tolist()
+
+class ArtistPageIndex:
+    """
+    Local, persistent retrieval index over scraped artist pages.
+
+    Pages are split into overlapping chunks and embedded once at ingest;
+    re-ingesting an unchanged page is a no-op. search() ranks only the
+    chunks of the artists being discussed, so it is a small in-memory dot
+    product rather than a scan over the whole catalogue.
+    """
+
+    def __init__(self, path: str = "data/retrieval.db", embeddings: Optional[Embeddings] = None,
+                 chunk_size: int = 800, chunk_overlap: int = 100,
+                 matrix_cache_entries: int = 512, matrix_cache_bytes: int = 64 * 1024 * 1024):
+        self.embeddings = embeddings or CachedEmbeddings(path)
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap
+        )
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS page_chunks (
+                artist_key TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (artist_key, chunk_index)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS indexed_pages (
+                artist_key TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                indexed_at REAL NOT NULL
+            )
+        """)
+        # artist_key -> (chunk texts, unit-normalized vectors) for recently discussed artists
+        self._matrices = MemoryCache(max_entries=matrix_cache_entries, max_bytes=matrix_cache_bytes,
+                                     default_ttl_seconds=float("inf"))
+
+    def is_indexed(self, artist_name: str) -> bool:
+        key = normalize_artist_name(artist_name)
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM indexed_pages WHERE artist_key = ?", (key,)
+            ).fetchone() is not None
+
+    def ingest(self, artist_name: str, text: str) -> int:
+        """Chunk and embed a page; returns how many chunks were (re)embedded"""
+        key = normalize_artist_name(artist_name)
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM indexed_pages WHERE artist_key = ?", (key,)
+            ).fetchone()
+        if row and row[0] == content_hash:
+            return 0
+
+        chunks = [chunk.strip() for chunk in self.splitter.split_text(text) if chunk.strip()]
+        vectors = self.embeddings.embed_documents(chunks) if chunks else []
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM page_chunks WHERE artist_key = ?", (key,))
+                self._conn.executemany(
+                    "INSERT INTO page_chunks (artist_key, chunk_index, text, vector) VALUES (?, ?, ?, ?)",
+                    [(key, i, chunk, np.asarray(vector, dtype=np.float32).tobytes())
+                     for i, (chunk, vector) in enumerate(zip(chunks, vectors))]
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO indexed_pages (artist_key, content_hash, indexed_at) VALUES (?, ?, ?)",
+                    (key, content_hash, time.time())
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._matrices.delete(key)
+
+        logger.info(f"Indexed {len(chunks)} chunks for {artist_name}")
+        return len(chunks)
+
+    def _matrix(self, key: str) -> Optional[tuple]:
+        entry = self._matrices.get(key)
+        if entry is not None:
+            return entry
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT text, vector FROM page_chunks WHERE artist_key = ? ORDER BY chunk_index", (key,)
+            ).fetchall()
+            if not rows:
+                return None
+            texts = [text for text, _ in rows]
+            matrix = np.vstack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows])
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.where(norms == 0, 1, norms)
+        entry = (texts, matrix)
+        self._matrices.set(key, entry, size=matrix.nbytes + sum(len(text) for text in texts))
+        return entry
+
+    def artist_vectors(self, artist_names: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        One unit vector per indexed artist (the mean of its chunk vectors),
+        keyed by normalized name; all indexed artists when artist_names is None
+        """
+        if artist_names is None:
+            queries = [("SELECT artist_key, vector FROM page_chunks", [])]
+        else:
+            keys = sorted({normalize_artist_name(name) for name in artist_names})
+            queries = [
+                (f"SELECT artist_key, vector FROM page_chunks "
+                 f"WHERE artist_key IN ({','.join('?' * len(chunk))})", chunk)
+                for chunk in (keys[offset:offset + 500] for offset in range(0, len(keys), 500))
+            ]
+
+        # Summed chunk by chunk rather than via _matrix, so a full scan does
+        # not leave every page's chunks cached in memory
+        sums: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for query, params in queries:
+                for key, blob in self._conn.execute(query, params):
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    norm = np.linalg.norm(vector)
+                    if norm:
+                        vector = vector / norm
+                    sums[key] = sums[key] + vector if key in sums else vector.copy()
+
+        vectors = {}
+        for key, total in sums.items():
+            norm = np.linalg.norm(total)
+            if norm:
+                vectors[key] = total / norm
+        return vectors
+
+    def search(self, question: str, artist_names: Iterable[str], k: int = 4,
+               max_tokens: Optional[int] = None,
+               count_tokens: Callable[[str], int] = lambda text: len(text) // 4) -> List[Dict]:
+        """
+        Best k chunks for question across artist_names, most relevant first,
+        trimmed so their combined size stays within max_tokens.
+        """
+        candidates = []
+        query = None
+        for name in artist_names:
+            entry = self._matrix(normalize_artist_name(name))
+            if entry is None:
+                continue
+            if query is None:
+                query = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+                query = query / (np.linalg.norm(query) or 1)
+            texts, matrix = entry
+            scores = matrix @ query
+            for i in np.argsort(-scores)[:k]:
+                candidates.append({"artist": name, "text": texts[i], "score": float(scores[i])})
+
+        candidates.sort(key=lambda hit: hit["score"], reverse=True)
+        selected = []
+        used = 0
+        for hit in candidates[:k]:
+            tokens = count_tokens(hit["text"])
+            if max_tokens is not None and used + tokens > max_tokens:
+                continue
+            selected.append(hit)
+            used += tokens
+        return selected
+
+    async def aingest(self, artist_name: str, text: str) -> int:
+        return await asyncio.get_running_loop().run_in_executor(None, self.ingest, artist_name, text)
+
+    async def asearch(self, *args, **kwargs) -> List[Dict]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: self.search(*args, **kwargs))
@@ -0,0 +1,108 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_groups: List["SingleFlight"] = []
+
+class SingleFlight:
+    """
+    Deduplicates concurrent work by key.
+
+    The first caller for a key starts the work; anyone asking for the same
+    key while it is running awaits that same call and receives its result
+    (or exception) instead of starting another. Once it finishes the key is
+    forgotten, so this only merges overlapping calls and never caches.
+
+    The shared call runs as its own task, so a caller that is cancelled
+    (e.g. a disconnected WebSocket) does not cancel it for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        _groups.append(self)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        future = self._calls.get(key)
+        if future is None:
+            self.executions += 1
+            future = asyncio.ensure_future(fn())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    def _finished(self, key: Hashable, future: asyncio.Future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled() and future.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "in_flight": len(self._calls),
+        }
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class ThreadSingleFlight(SingleFlight):
+    """SingleFlight for blocking code called from several threads"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                self.executions += 1
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+                with self._lock:
+                    self.errors += 1
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+def stats() -> Dict[str, Dict]:
+    """Counters for every group in the process, keyed by group name"""
+    merged: Dict[str, Dict] = {}
+    for group in _groups:
+        totals = merged.setdefault(group.name, {})
+        for counter, value in group.stats().items():
+            totals[counter] = totals.get(counter, 0) + value
+    return merged
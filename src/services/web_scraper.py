@@ -1,12 +1,13 @@
 from typing import Dict, Optional
+import asyncio
+import os
+import httpx
 import requests
 from bs4 import BeautifulSoup
-from langchain.tools import Tool
-from langchain_community.document_loaders import WebBaseLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.vectorstores import Chroma
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain_community.llms import Ollama
+from .metrics import metrics, span
+from .page_extractor import aextract_artist_page, extract_artist_page
+from .registry import registry
+from .single_flight import SingleFlight, ThreadSingleFlight
 import time
 from datetime import datetime, timedelta
 import random
@@ -15,6 +16,94 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+USER_AGENT = 'Mozilla/5.0 (compatible; MusicNerdBot/1.0)'
+
+# HTTP settings for the async scraping path
+SCRAPER_CONNECT_TIMEOUT = float(os.getenv('SCRAPER_CONNECT_TIMEOUT', '3'))
+SCRAPER_READ_TIMEOUT = float(os.getenv('SCRAPER_READ_TIMEOUT', '10'))
+SCRAPER_MAX_RETRIES = int(os.getenv('SCRAPER_MAX_RETRIES', '3'))
+SCRAPER_BACKOFF_BASE = float(os.getenv('SCRAPER_BACKOFF_BASE', '0.5'))
+SCRAPER_MAX_CONNECTIONS = int(os.getenv('SCRAPER_MAX_CONNECTIONS', '20'))
+SCRAPER_REQUESTS_PER_MINUTE = float(os.getenv('SCRAPER_REQUESTS_PER_MINUTE', '10'))
+SCRAPER_BURST = int(os.getenv('SCRAPER_BURST', '3'))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+SCRAPES = metrics.counter("scrapes_total", "Artist page scrapes by result", ("result",))
+
+_http_client: Optional[httpx.AsyncClient] = None
+_token_bucket: Optional["AsyncTokenBucket"] = None
+
+# Concurrent scrapes of the same page share one request
+_scrapes = SingleFlight("scrape")
+_sync_scrapes = ThreadSingleFlight("scrape")
+
+def get_http_client() -> httpx.AsyncClient:
+    """Process-wide pooled client so connections to musicnerd.xyz are kept alive"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            headers={'User-Agent': USER_AGENT},
+            timeout=httpx.Timeout(SCRAPER_READ_TIMEOUT, connect=SCRAPER_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=SCRAPER_MAX_CONNECTIONS,
+                max_keepalive_connections=SCRAPER_MAX_CONNECTIONS
+            ),
+            follow_redirects=True
+        )
+    return _http_client
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+def get_token_bucket() -> "AsyncTokenBucket":
+    """Process-wide limiter shared by every coroutine that scrapes"""
+    global _token_bucket
+    if _token_bucket is None:
+        _token_bucket = AsyncTokenBucket(SCRAPER_REQUESTS_PER_MINUTE, burst=SCRAPER_BURST)
+    return _token_bucket
+
+class AsyncTokenBucket:
+    """
+    Token bucket rate limiter for coroutines.
+    
+    Tokens refill continuously at requests_per_minute and up to burst
+    requests may go out back to back. Waiting callers sleep without
+    blocking the event loop and are served in arrival order.
+    """
+    
+    def __init__(self, requests_per_minute: float = 10, burst: int = 1):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+    
+    def try_acquire(self) -> bool:
+        """Take a token if one is available right now"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+    
+    async def acquire(self):
+        # Holding the lock while sleeping keeps waiters first-come first-served
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
 class RateLimiter:
     def __init__(self, requests_per_minute: int = 10):
         self.requests_per_minute = requests_per_minute
@@ -35,11 +124,18 @@ class MusicNerdScraper:
             "latasha": "3cd4c3e4-4bf4-4b92-9b72-07f9188bd4c6"
             # We can add more as we discover them
         }
-        self.embeddings = HuggingFaceEmbeddings()
-        self.llm = Ollama(model="deepseek-r1")
         self.db = None
         self.rate_limiter = RateLimiter(requests_per_minute=10)
         self.last_scrape_times = {}
+    
+    @property
+    def embeddings(self):
+        # Loaded once per process, and only when something actually embeds
+        return registry.get("embeddings")
+    
+    @property
+    def llm(self):
+        return registry.get("ollama")
         
     def should_rescrape(self, artist_name: str) -> bool:
         """Check if we should rescrape this artist based on time elapsed"""
@@ -56,7 +152,7 @@ class MusicNerdScraper:
             try:
                 logger.info(f"Testing access to: {url}")
                 response = requests.get(url, 
-                    headers={'User-Agent': 'Mozilla/5.0 (compatible; MusicNerdBot/1.0)'},
+                    headers={'User-Agent': USER_AGENT},
                     timeout=5
                 )
                 logger.info(f"Response status: {response.status_code}")
@@ -68,56 +164,49 @@ class MusicNerdScraper:
                 logger.error(f"Error accessing {url}: {str(e)}")
         return None
 
+    def artist_url(self, artist_name: str) -> Optional[str]:
+        """URL of the artist's musicnerd.xyz page, if we know its UUID"""
+        artist_id = self.known_artist_ids.get(artist_name.lower())
+        if artist_id:
+            return f"{self.base_url}/artist/{artist_id}"
+        return None
+    
+    def parse_artist_page(self, artist_name: str, url: str, html: str) -> Dict:
+        return extract_artist_page(artist_name, url, html)
+    
+    async def aparse_artist_page(self, artist_name: str, url: str, html: str) -> Dict:
+        """parse_artist_page in the parsing pool, keeping the event loop free"""
+        return await aextract_artist_page(artist_name, url, html)
+    
     def scrape_artist(self, artist_name: str) -> Optional[Dict]:
         """
         Scrape and process artist information using UUID if known
         """
+        logger.info(f"Attempting to scrape info for: {artist_name}")
+        
+        # Check if we have a known UUID for this artist
+        url = self.artist_url(artist_name)
+        if not url:
+            logger.info(f"No known UUID for {artist_name}")
+            return None
+        return _sync_scrapes.do(url, lambda: self._scrape_url(artist_name, url))
+    
+    def _scrape_url(self, artist_name: str, url: str) -> Optional[Dict]:
+        with span("scrape"):
+            info = self._scrape_page(artist_name, url)
+        SCRAPES.inc("ok" if info else "failed")
+        return info
+    
+    def _scrape_page(self, artist_name: str, url: str) -> Optional[Dict]:
         try:
-            logger.info(f"Attempting to scrape info for: {artist_name}")
-            
-            # Check if we have a known UUID for this artist
-            artist_id = self.known_artist_ids.get(artist_name.lower())
-            if artist_id:
-                url = f"{self.base_url}/artist/{artist_id}"
-            else:
-                logger.info(f"No known UUID for {artist_name}")
-                return None
-
             logger.info(f"Accessing URL: {url}")
             response = requests.get(url, 
-                headers={'User-Agent': 'Mozilla/5.0 (compatible; MusicNerdBot/1.0)'},
+                headers={'User-Agent': USER_AGENT},
                 timeout=5
             )
 
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Extract all text content
-                text_content = soup.get_text()
-                
-                # Extract all relevant information
-                info = {
-                    "name": artist_name,
-                    "url": url,
-                    "raw_content": text_content,  # Include the raw content for LLM analysis
-                    "social_links": {},
-                    "platform_links": {},
-                    "releases": [],
-                    "bio": "",
-                    "page_content": text_content[:1000]  # First 1000 chars for context
-                }
-                
-                # Extract all links
-                for link in soup.find_all('a'):
-                    href = link.get('href', '')
-                    text = link.text.strip()
-                    
-                    if href:
-                        if any(platform in href.lower() for platform in ['instagram', 'twitter']):
-                            info["social_links"][text] = href
-                        elif any(platform in href.lower() for platform in ['spotify', 'soundcloud']):
-                            info["platform_links"][text] = href
-                
+                info = self.parse_artist_page(artist_name, url, response.text)
                 logger.info(f"Successfully scraped information for {artist_name}")
                 return info
             else:
@@ -126,4 +215,69 @@ class MusicNerdScraper:
 
         except Exception as e:
             logger.error(f"Error scraping artist {artist_name}: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
+    
+    async def fetch(self, url: str, headers: Optional[Dict] = None) -> httpx.Response:
+        """
+        GET url through the shared client and rate limiter.
+        
+        Connection errors, timeouts and 429/5xx responses are retried with
+        exponential backoff and full jitter, honouring Retry-After when the
+        server sends one.
+        """
+        client = get_http_client()
+        bucket = get_token_bucket()
+        attempt = 0
+        while True:
+            await bucket.acquire()
+            delay = None
+            try:
+                response = await client.get(url, headers=headers)
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= SCRAPER_MAX_RETRIES:
+                    return response
+                retry_after = response.headers.get('Retry-After', '')
+                if retry_after.isdigit():
+                    delay = float(retry_after)
+                logger.warning(f"Got {response.status_code} from {url}, retrying")
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                if attempt >= SCRAPER_MAX_RETRIES:
+                    raise
+                logger.warning(f"Error fetching {url}: {str(e)}, retrying")
+            
+            if delay is None:
+                delay = random.uniform(0, SCRAPER_BACKOFF_BASE * (2 ** attempt))
+            attempt += 1
+            await asyncio.sleep(delay)
+    
+    async def ascrape_artist(self, artist_name: str) -> Optional[Dict]:
+        """
+        Async version of scrape_artist for use inside the event loop
+        """
+        url = self.artist_url(artist_name)
+        if not url:
+            logger.info(f"No known UUID for {artist_name}")
+            return None
+        return await _scrapes.do(url, lambda: self._ascrape_url(artist_name, url))
+    
+    async def _ascrape_url(self, artist_name: str, url: str) -> Optional[Dict]:
+        with span("scrape"):
+            info = await self._ascrape_page(artist_name, url)
+        SCRAPES.inc("ok" if info else "failed")
+        return info
+    
+    async def _ascrape_page(self, artist_name: str, url: str) -> Optional[Dict]:
+        try:
+            logger.info(f"Accessing URL: {url}")
+            response = await self.fetch(url)
+
+            if response.status_code == 200:
+                info = await self.aparse_artist_page(artist_name, url, response.text)
+                logger.info(f"Successfully scraped information for {artist_name}")
+                return info
+            else:
+                logger.error(f"Failed to access {url}: {response.status_code}")
+                return None
+
+        except Exception as e:
+            logger.error(f"Error scraping artist {artist_name}: {str(e)}")
+            return None
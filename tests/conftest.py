@@ -0,0 +1,46 @@
+import asyncio
+import os
+import tempfile
+
+# The models bind their engine when first imported, so point it at a
+# scratch database first
+_workdir = tempfile.mkdtemp(prefix="annie-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_workdir, 'test.db')}"
+os.environ.pop("DATABASE_READ_URL", None)
+
+import pytest
+
+from src.benchmarks.fakes import FakeEmbeddings
+from src.models.database import Base, dispose_engines, engine, init_db
+from src.services.registry import registry
+
+registry.register("embeddings", FakeEmbeddings)
+
+@pytest.fixture(autouse=True)
+def workdir(monkeypatch):
+    """Keep the caches and indexes services create under data/ out of the checkout"""
+    monkeypatch.chdir(_workdir)
+    return _workdir
+
+async def _reset_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await init_db()
+
+@pytest.fixture
+def run():
+    """
+    Run a coroutine to completion on a fresh event loop, starting from an
+    empty database. Pooled connections are closed after every call so none
+    outlive the loop they were opened on.
+    """
+    def runner(coro):
+        async def scoped():
+            try:
+                return await coro
+            finally:
+                await dispose_engines()
+        return asyncio.run(scoped())
+
+    runner(_reset_db())
+    return runner
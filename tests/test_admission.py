@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from src.services.admission import AdmissionController, Overloaded
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def test_waiting_clients_are_served_round_robin():
+    async def main():
+        admission = AdmissionController(max_in_flight=1, max_queued=10, max_queued_per_client=5)
+        await admission.acquire("holder")
+        order = []
+
+        async def generation(client, label):
+            await admission.acquire(client)
+            order.append(label)
+            admission.release()
+
+        # a1 and a2 queue before b1 does, yet b1 goes second
+        tasks = [asyncio.ensure_future(generation(client, label))
+                 for client, label in (("a", "a1"), ("a", "a2"), ("b", "b1"))]
+        await _settle()
+        assert admission.stats()["queued"] == 3
+        assert admission.stats()["clients_waiting"] == 2
+
+        admission.release()
+        await asyncio.gather(*tasks)
+        assert order == ["a1", "b1", "a2"]
+        assert admission.in_flight == 0
+        assert admission.queued == 0
+
+    asyncio.run(main())
+
+def test_full_client_queue_is_rejected_without_blocking_others():
+    async def main():
+        admission = AdmissionController(max_in_flight=1, max_queued=10, max_queued_per_client=1)
+        await admission.acquire("holder")
+        waiting = asyncio.ensure_future(admission.acquire("a"))
+        await _settle()
+
+        with pytest.raises(Overloaded) as rejected:
+            await admission.acquire("a")
+        assert rejected.value.reason == "client_queue_full"
+
+        other = asyncio.ensure_future(admission.acquire("b"))
+        await _settle()
+        assert admission.queued == 2
+        admission.release()
+        admission.release()
+        await asyncio.gather(waiting, other)
+        assert admission.rejected == 1
+
+    asyncio.run(main())
+
+def test_full_queue_and_timeout_are_rejected():
+    async def main():
+        admission = AdmissionController(max_in_flight=1, max_queued=1, max_queued_per_client=1,
+                                        timeout_seconds=0.05)
+        await admission.acquire("holder")
+        waiting = asyncio.ensure_future(admission.acquire("a"))
+        await _settle()
+
+        with pytest.raises(Overloaded) as rejected:
+            await admission.acquire("b")
+        assert rejected.value.reason == "queue_full"
+
+        with pytest.raises(Overloaded) as timed_out:
+            await waiting
+        assert timed_out.value.reason == "timed_out"
+        assert admission.timed_out == 1
+        assert admission.queued == 0
+        assert admission.in_flight == 1
+
+    asyncio.run(main())
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        admission = AdmissionController(max_in_flight=1, max_queued=10, max_queued_per_client=5)
+        await admission.acquire("holder")
+        gone = asyncio.ensure_future(admission.acquire("a"))
+        stays = asyncio.ensure_future(admission.acquire("b"))
+        await _settle()
+
+        gone.cancel()
+        await _settle()
+        assert gone.cancelled()
+        assert admission.cancelled == 1
+        assert admission.queued == 1
+
+        # The freed slot goes to the remaining waiter, not the cancelled one
+        admission.release()
+        await stays
+        assert admission.in_flight == 1
+        admission.release()
+        assert admission.in_flight == 0
+
+    asyncio.run(main())
+
+def test_cancellation_racing_a_grant_loses_no_slot():
+    async def main():
+        admission = AdmissionController(max_in_flight=1, max_queued=10, max_queued_per_client=5)
+        await admission.acquire("holder")
+        first = asyncio.ensure_future(admission.acquire("a"))
+        second = asyncio.ensure_future(admission.acquire("b"))
+        await _settle()
+
+        # Grant first its slot and cancel it before it wakes up. Depending on
+        # timing it either keeps the slot or passes it on to second
+        admission.release()
+        first.cancel()
+        await _settle()
+        if not first.cancelled():
+            admission.release()
+        await second
+        admission.release()
+        assert admission.in_flight == 0
+        assert admission.queued == 0
+
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+import json
+
+import httpx
+
+from api.main import app
+from src.models.database import engine
+from src.services.artist_importer import ArtistImporter
+
+NAMES = ["Aphex Twin", "Bicep", "Bonobo", "Burial", "Caribou", "Four Tet", "Floating Points"]
+
+async def _seed(names=NAMES):
+    await ArtistImporter(engine).import_records({"name": name} for name in names)
+
+async def _get(path, **kwargs):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, **kwargs)
+
+def test_keyset_pages_cover_the_catalogue_once_in_name_order(run):
+    run(_seed())
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        body = run(_get("/artists", params=params)).json()
+        assert len(body["artists"]) <= 3
+        seen += body["artists"]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == sorted(NAMES, key=str.lower)
+
+def test_exact_page_boundary_has_no_next_cursor(run):
+    run(_seed())
+    body = run(_get("/artists", params={"limit": len(NAMES)})).json()
+    assert len(body["artists"]) == len(NAMES)
+    assert body["next_cursor"] is None
+
+def test_prefix_narrows_the_pages(run):
+    run(_seed())
+    body = run(_get("/artists", params={"prefix": "b", "limit": 2})).json()
+    assert body["artists"] == ["Bicep", "Bonobo"]
+    rest = run(_get("/artists", params={"prefix": "b", "limit": 2, "cursor": body["next_cursor"]})).json()
+    assert rest == {"artists": ["Burial"], "next_cursor": None}
+
+def test_invalid_cursor_is_a_client_error(run):
+    run(_seed())
+    assert run(_get("/artists", params={"cursor": "not base64!"})).status_code == 400
+
+def test_etag_is_revalidated_until_the_catalogue_changes(run):
+    run(_seed())
+    first = run(_get("/artists", params={"limit": 2}))
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    unchanged = run(_get("/artists", params={"limit": 2}, headers={"If-None-Match": etag}))
+    assert unchanged.status_code == 304
+    assert unchanged.headers["etag"] == etag
+
+    # Other query parameters are other representations
+    other = run(_get("/artists", params={"limit": 3}, headers={"If-None-Match": etag}))
+    assert other.status_code == 200
+
+    run(_seed(["Jamie xx"]))
+    changed = run(_get("/artists", params={"limit": 2}, headers={"If-None-Match": etag}))
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+def test_ndjson_export_streams_every_artist(run):
+    run(_seed())
+    response = run(_get("/artists", params={"format": "ndjson", "prefix": "f"}))
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["name"] for line in lines] == ["Floating Points", "Four Tet"]
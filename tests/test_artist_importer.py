@@ -0,0 +1,96 @@
+from sqlalchemy import select
+
+from src.models.database import (
+    Artist, Genre, PlatformLink, SocialMedia, artist_genres, artists_changed_since, engine
+)
+from src.services.artist_importer import ArtistImporter
+
+async def _import(records, batch_size=1000):
+    return await ArtistImporter(engine, batch_size=batch_size).import_records(records)
+
+async def _artists():
+    async with engine.connect() as conn:
+        rows = await conn.execute(select(Artist.name, Artist.bio, Artist.genres).order_by(Artist.name_key))
+        return {name: (bio, genres) for name, bio, genres in rows}
+
+async def _children(model, field):
+    async with engine.connect() as conn:
+        rows = await conn.execute(
+            select(Artist.name, model.platform, getattr(model, field)).join(Artist, Artist.id == model.artist_id)
+        )
+        return {(name, platform): value for name, platform, value in rows}
+
+def test_upsert_keys_on_normalized_name_and_keeps_missing_fields(run):
+    stats = run(_import([
+        {"name": "Bicep", "bio": "Belfast duo", "genres": ["electronic", "house"]},
+        {"name": "Four Tet", "bio": "Kieran Hebden", "genres": "electronic"},
+        {"name": "  ", "bio": "no name"},
+    ]))
+    assert stats["artists"] == 2
+    assert stats["skipped"] == 1
+
+    # Same artist under different spacing and case; no bio keeps the stored one
+    run(_import([{"name": "BICEP ", "genres": "techno"}]))
+    artists = run(_artists())
+    assert artists == {
+        "Four Tet": ("Kieran Hebden", "electronic"),
+        "BICEP": ("Belfast duo", "techno"),
+    }
+
+def test_later_record_for_the_same_artist_wins_within_a_batch(run):
+    run(_import([{"name": "Bicep", "bio": "first"}, {"name": "bicep", "bio": "second"}]))
+    assert run(_artists()) == {"bicep": ("second", None)}
+
+def test_genre_links_follow_the_genres_string(run):
+    async def linked():
+        async with engine.connect() as conn:
+            rows = await conn.execute(
+                select(Genre.name)
+                .join(artist_genres, artist_genres.c.genre_id == Genre.id)
+                .order_by(Genre.name)
+            )
+            return [name for name, in rows]
+
+    run(_import([{"name": "Bicep", "genres": "House, Techno, house"}]))
+    assert run(linked()) == ["House", "Techno"]
+    run(_import([{"name": "Bicep", "genres": "Techno"}]))
+    assert run(linked()) == ["Techno"]
+
+def test_children_are_diffed_against_stored_rows(run):
+    run(_import([{
+        "name": "Bicep",
+        "socials": [{"platform": "instagram", "handle": "feelmybicep"},
+                    {"platform": "twitter", "handle": "feelmybicep"}],
+        "links": {"spotify": "https://open.spotify.com/bicep"},
+    }]))
+
+    stats = run(_import([{
+        "name": "Bicep",
+        # twitter is gone, instagram changed, tiktok is new
+        "socials": {"instagram": "bicep_official", "tiktok": "bicep"},
+    }]))
+    assert stats["children_inserted"] == 1
+    assert stats["children_updated"] == 1
+    assert stats["children_deleted"] == 1
+    assert run(_children(SocialMedia, "handle")) == {
+        ("Bicep", "instagram"): "bicep_official",
+        ("Bicep", "tiktok"): "bicep",
+    }
+    # The record had no links key, so the stored links are left alone
+    assert run(_children(PlatformLink, "url")) == {("Bicep", "spotify"): "https://open.spotify.com/bicep"}
+
+    stats = run(_import([{"name": "Bicep", "socials": {"instagram": "bicep_official", "tiktok": "bicep"}}]))
+    assert (stats["children_inserted"], stats["children_updated"], stats["children_deleted"]) == (0, 0, 0)
+
+def test_each_batch_stamps_its_artists_with_a_new_version(run):
+    async def changed_since(version):
+        async with engine.connect() as conn:
+            ids = (await conn.execute(artists_changed_since(version))).scalars().all()
+            names = await conn.execute(select(Artist.name).where(Artist.id.in_(ids)).order_by(Artist.name))
+            return [name for name, in names]
+
+    run(_import([{"name": "A"}, {"name": "B"}, {"name": "C"}], batch_size=2))
+    assert run(changed_since(0)) == ["A", "B", "C"]
+    assert run(changed_since(1)) == ["C"]
+    run(_import([{"name": "A", "bio": "updated"}]))
+    assert run(changed_since(2)) == ["A"]
@@ -0,0 +1,79 @@
+import asyncio
+import time
+import zlib
+
+from src.services.cache import Cache, MemoryCache, SQLiteCacheStore
+
+def test_store_keeps_stale_entries_until_hard_expiry(tmp_path):
+    store = SQLiteCacheStore(str(tmp_path / "cache.db"))
+    now = time.time()
+    store.set_many({"fresh": "1"}, ttl_seconds=60, stored_at=now, fresh_seconds=30)
+    store.set_many({"stale": "2"}, ttl_seconds=60, stored_at=now - 40, fresh_seconds=30)
+    store.set_many({"expired": "3"}, ttl_seconds=60, stored_at=now - 90, fresh_seconds=30)
+
+    found = store.get_many(["fresh", "stale", "expired", "missing"])
+    assert set(found) == {"fresh", "stale"}
+    raw, stored_at, fresh_until, expires_at = found["fresh"]
+    assert raw == "1"
+    assert fresh_until == stored_at + 30
+    assert expires_at == stored_at + 60
+    assert found["stale"][2] < now < found["stale"][3]
+
+    # Only the stale entry is too old for a 35s read, and only "expired" is purged
+    assert set(store.get_many(["fresh", "stale"], max_age_seconds=35)) == {"fresh"}
+    assert store.compact() == 1
+    assert store.count() == 2
+    store.close()
+
+def test_fresh_window_never_outlasts_the_ttl(tmp_path):
+    store = SQLiteCacheStore(str(tmp_path / "cache.db"))
+    store.set("key", "value", ttl_seconds=10, fresh_seconds=100)
+    _, stored_at, fresh_until, expires_at = store.get("key")
+    assert fresh_until == expires_at == stored_at + 10
+    store.close()
+
+def test_touch_restarts_entry_and_body_ttls(tmp_path):
+    store = SQLiteCacheStore(str(tmp_path / "cache.db"))
+    past = time.time() - 50
+    store.set_many({"key": "value"}, ttl_seconds=60, stored_at=past, fresh_seconds=10,
+                   bodies={"key": b"body"})
+    assert store.touch("key", ttl_seconds=60, fresh_seconds=10)
+    _, stored_at, fresh_until, expires_at = store.get("key")
+    assert stored_at > past
+    assert fresh_until > time.time()
+    assert store.get_body("key") == b"body"
+    assert not store.touch("missing", ttl_seconds=60)
+    store.close()
+
+def test_two_tier_cache_reports_stale_entries_and_promotes_l2_hits(tmp_path):
+    store = SQLiteCacheStore(str(tmp_path / "cache.db"))
+    cache = Cache(memory=MemoryCache(), store=store, ttl_hours=1, max_stale_hours=1)
+    cache.set("bicep", {"name": "Bicep"}, body="page text")
+    entry = cache.get_entry("bicep")
+    assert entry.value == {"name": "Bicep"}
+    assert not entry.stale
+    assert cache.get_body("bicep") == "page text"
+    assert zlib.decompress(store.get_body("bicep")) == b"page text"
+
+    # Past the soft TTL it is still returned by get_entry, flagged stale, but
+    # get() only wants entries younger than max_age_hours
+    store.set_many({"old": '{"name": "Old"}'}, ttl_seconds=7200, stored_at=time.time() - 5400,
+                   fresh_seconds=3600)
+    entry = cache.get_entry("old")
+    assert entry.stale
+    assert cache.get("old", max_age_hours=1) is None
+
+    cache.memory.delete("bicep")
+    assert asyncio.run(cache.aget_entry("bicep")).value == {"name": "Bicep"}
+    assert cache.memory.get("bicep") == {"name": "Bicep"}
+    store.close()
+
+def test_memory_cache_evicts_least_recently_used():
+    memory = MemoryCache(max_entries=2)
+    memory.set("a", {"v": 1})
+    memory.set("b", {"v": 2})
+    assert memory.get("a") == {"v": 1}
+    memory.set("c", {"v": 3})
+    assert memory.get("b") is None
+    assert memory.get("a") == {"v": 1}
+    assert memory.evictions == 1
@@ -0,0 +1,81 @@
+import asyncio
+
+from src.agent.chat_agent import AnnieMacAgent, AnnieMacEngine, TokenQueueHandler, relay_tokens
+from src.benchmarks.fakes import FakeChatModel
+from src.models.database import engine
+from src.services.artist_importer import ArtistImporter
+from src.services.music_api import PAGE_BODY_FIELD, store_page_record
+
+def _chat_engine():
+    llm = FakeChatModel(reply_tokens=5, first_token_latency=0, token_latency=0)
+    return AnnieMacEngine(llm=llm, summary_llm=llm)
+
+def test_turn_streams_the_reply_and_keeps_context_out_of_history(run):
+    question = "What do you think of Bicep?"
+
+    async def main():
+        await ArtistImporter(engine).import_records(
+            [{"name": "Bicep", "bio": "Belfast duo Matt McBriar and Andy Ferguson", "genres": "electronic"}]
+        )
+        chat_engine = _chat_engine()
+        store_page_record(chat_engine.music_api.cache, "Bicep", {
+            "name": "Bicep", PAGE_BODY_FIELD: "Bicep are a Belfast-born duo known for their hardware live shows."
+        })
+        agent = AnnieMacAgent(chat_engine)
+        frames = [frame async for frame in agent.chat_stream(question)]
+        return agent, frames
+
+    agent, frames = run(main())
+    final = frames[-1]
+    assert final["type"] == "assistant"
+    assert "error" not in final
+    deltas = "".join(frame["content"] for frame in frames[:-1] if frame["type"] == "delta")
+    assert deltas.strip() == final["response"]
+
+    # The page went into this turn's prompt, but history only has the question
+    assert [turn["human"] for turn in agent.memory.turns] == [question]
+    usage = final["usage"]
+    assert usage["prompt_tokens"] > agent.engine.system_prompt_tokens + agent.engine.count_tokens(question)
+    assert usage["completion_tokens"] == agent.engine.count_tokens(final["response"])
+
+def test_relay_tokens_yields_everything_and_leaves_no_pending_reader():
+    async def main():
+        handler = TokenQueueHandler()
+
+        async def generate():
+            for token in ("a", "b", "c"):
+                await handler.on_llm_new_token(token)
+                await asyncio.sleep(0)
+            return "abc"
+
+        before = asyncio.all_tasks()
+        generation = asyncio.ensure_future(generate())
+        tokens = [token async for token in relay_tokens(generation, handler)]
+        await asyncio.sleep(0)
+        leftover = [task for task in asyncio.all_tasks() - before if not task.done()]
+        return tokens, generation.result(), leftover
+
+    tokens, result, leftover = asyncio.run(main())
+    assert tokens == ["a", "b", "c"]
+    assert result == "abc"
+    assert leftover == []
+
+def test_relay_tokens_cancelled_mid_wait_cancels_its_reader():
+    async def main():
+        handler = TokenQueueHandler()
+        generation = asyncio.get_running_loop().create_future()
+
+        async def consume():
+            async for _ in relay_tokens(generation, handler):
+                pass
+
+        before = asyncio.all_tasks()
+        consumer = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.01)
+        consumer.cancel()
+        await asyncio.gather(consumer, return_exceptions=True)
+        await asyncio.sleep(0)
+        generation.cancel()
+        return [task for task in asyncio.all_tasks() - before if not task.done()]
+
+    assert asyncio.run(main()) == []
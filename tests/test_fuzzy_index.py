@@ -0,0 +1,80 @@
+from src.services.fuzzy_index import FuzzyArtistIndex, bounded_edit_distance, fuzzy_key
+
+def _index():
+    index = FuzzyArtistIndex()
+    index.rebuild([
+        (1, "Bicep"),
+        (2, "Fred again.."),
+        (3, "The Chemical Brothers"),
+        (4, "Björk"),
+        (5, "Four Tet"),
+        (6, "Floating Points"),
+    ])
+    return index
+
+def test_fuzzy_key_folds_accents_and_punctuation():
+    assert fuzzy_key("Björk") == "bjork"
+    assert fuzzy_key("Fred again..") == "fred again"
+    assert fuzzy_key("  AC/DC ") == "ac dc"
+    assert fuzzy_key("Sigur Rós") == "sigur ros"
+
+def test_bounded_edit_distance_counts_swaps_and_gives_up_past_bound():
+    assert bounded_edit_distance("bicep", "bicpe", 2) == 1
+    assert bounded_edit_distance("bicep", "bicep", 0) == 0
+    assert bounded_edit_distance("bicep", "floating", 2) is None
+
+def test_exact_matches_ignore_case_accents_and_punctuation():
+    index = _index()
+    assert index.best("bjork") == (4, "Björk")
+    assert index.best("FRED AGAIN") == (2, "Fred again..")
+    assert index.resolve("four tet") == [(5, "Four Tet", 0)]
+
+def test_partial_names_and_leading_the():
+    index = _index()
+    assert index.best("fred") == (2, "Fred again..")
+    assert index.best("chemical brothers") == (3, "The Chemical Brothers")
+    assert index.best("floating") == (6, "Floating Points")
+
+def test_misspellings_within_the_length_bound():
+    index = _index()
+    assert index.resolve("floatnig points") == [(6, "Floating Points", 1)]
+    assert index.best("fuor tet") == (5, "Four Tet")
+    # Short names only match exactly or as a prefix
+    assert index.best("xyz") is None
+    assert index.best("completely unknown") is None
+
+def test_aliases_resolve_until_removed():
+    index = _index()
+    index.add_alias(2, "Fred Gibson")
+    assert index.best("fred gibson") == (2, "Fred again..")
+
+    index.remove_alias(2, "Fred Gibson")
+    assert index.best("fred gibson") is None
+    # An artist's own name is never dropped as an alias
+    index.remove_alias(1, "Bicep")
+    assert index.best("bicep") == (1, "Bicep")
+
+def test_renames_replace_and_remove():
+    index = _index()
+    index.add(1, "Bicep Live", aliases=["Matt and Andy"])
+    assert index.name_of(1) == "Bicep Live"
+    assert index.best("bicep live") == (1, "Bicep Live")
+    assert index.best("matt and andy") == (1, "Bicep Live")
+
+    # replace() drops every key the artist had that is not in the new set
+    index.replace(1, "Bicep")
+    assert index.best("matt and andy") is None
+    assert index.best("bicep") == (1, "Bicep")
+
+    index.remove(1)
+    assert 1 not in index.artist_ids()
+    assert index.best("bicep") is None
+    assert len(index) == 5
+
+def test_rebuild_swaps_in_a_new_index():
+    index = _index()
+    index.rebuild([(10, "Jamie xx")], aliases=[(10, "Jamie Smith"), (99, "Orphan Alias")])
+    assert index.artist_ids() == {10}
+    assert index.best("jamie smith") == (10, "Jamie xx")
+    assert index.best("orphan alias") is None
+    assert index.best("bicep") is None
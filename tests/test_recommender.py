@@ -0,0 +1,96 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.services.recommender import ArtistFeatures, NeighbourIndex
+
+GENRES = ["house", "techno", "ambient", "garage", "jungle", "disco"]
+PLATFORMS = ["social:instagram", "social:twitter", "platform:spotify", "platform:bandcamp"]
+
+def _artist(artist_id, genres, platforms=()):
+    return ArtistFeatures(artist_id, f"Artist {artist_id}", list(genres), list(platforms))
+
+def _catalogue(count, seed=1):
+    rng = random.Random(seed)
+    return [
+        _artist(artist_id, rng.sample(GENRES, rng.randint(1, 3)), rng.sample(PLATFORMS, rng.randint(0, 3)))
+        for artist_id in range(1, count + 1)
+    ]
+
+def _lists(index):
+    """Every live row's neighbour scores, keyed by artist id"""
+    lists = {}
+    for artist_id, row in index.row_of.items():
+        lists[artist_id] = {
+            index.ids[neighbour]: float(score)
+            for neighbour, score in zip(index.neighbours[row], index.scores[row]) if neighbour >= 0
+        }
+    return lists
+
+def _assert_matches_rescore(index):
+    """The incrementally maintained lists are what a full rescore gives"""
+    incremental = _lists(index)
+    index._rescore(list(index.row_of.values()))
+    rescored = _lists(index)
+    assert incremental.keys() == rescored.keys()
+    for artist_id, neighbours in rescored.items():
+        assert incremental[artist_id] == pytest.approx(neighbours, abs=1e-5)
+    return rescored
+
+def test_neighbours_share_a_genre_and_rank_by_overlap():
+    index = NeighbourIndex.build([
+        _artist(1, ["house", "techno"]),
+        _artist(2, ["house", "techno"]),
+        _artist(3, ["house"]),
+        _artist(4, ["ambient"]),
+    ], k=3, platform_weight=0)
+    assert [name for name, _ in index.similar(index.row_of[1], 3)] == ["Artist 2", "Artist 3"]
+    assert index.similar(index.row_of[4], 3) == []
+
+def test_upserts_match_a_full_rescore():
+    index = NeighbourIndex.build(_catalogue(30), k=40)
+    rng = random.Random(2)
+    for artist_id in (5, 12, 31, 32, 33):
+        index.upsert(_artist(artist_id, rng.sample(GENRES, 2), rng.sample(PLATFORMS, 2)))
+    # A brand-new genre gets a column of its own
+    index.upsert(_artist(34, ["footwork"]))
+    index.upsert(_artist(35, ["footwork", "jungle"]))
+
+    assert len(index) == 35
+    lists = _assert_matches_rescore(index)
+    assert 35 in lists[34]
+    assert 34 in lists[35]
+
+def test_removed_artists_leave_every_list():
+    index = NeighbourIndex.build(_catalogue(30), k=40)
+    for artist_id in (3, 7, 19):
+        index.remove(artist_id)
+    index.remove(999)
+
+    assert len(index) == 27
+    for neighbours in _assert_matches_rescore(index).values():
+        assert not {3, 7, 19} & set(neighbours)
+
+def test_small_k_keeps_only_the_best_neighbours():
+    index = NeighbourIndex.build(_catalogue(40, seed=3), k=3)
+    index.upsert(_artist(41, ["house", "techno", "disco"], ["platform:spotify"]))
+    index.remove(10)
+    row = index.row_of[41]
+    scores = index.scores[row]
+    assert np.all(scores[:-1] >= scores[1:])
+
+    # Each kept list holds the k best scores a full rescore would give
+    kept = {artist_id: sorted(scores.values(), reverse=True) for artist_id, scores in _lists(index).items()}
+    index._rescore(list(index.row_of.values()))
+    best = {artist_id: sorted(scores.values(), reverse=True) for artist_id, scores in _lists(index).items()}
+    assert kept.keys() == best.keys()
+    for artist_id, scores in best.items():
+        assert kept[artist_id] == pytest.approx(scores, abs=1e-5)
+
+def test_renamed_artist_is_found_under_its_new_name():
+    index = NeighbourIndex.build([_artist(1, ["house"]), _artist(2, ["house"])], k=2)
+    index.upsert(ArtistFeatures(1, "New Name", ["house"], []))
+    assert "new name" in index.row_of_key
+    assert "artist 1" not in index.row_of_key
+    assert [name for name, _ in index.similar(index.row_of[2], 2)] == ["New Name"]
@@ -0,0 +1,53 @@
+import asyncio
+
+from src.benchmarks.fakes import FakeEmbeddings
+from src.services.response_cache import ResponseCache, fingerprint
+
+class _SameVector(FakeEmbeddings):
+    """Every question embeds the same, so any two are similar"""
+
+    def embed_query(self, text):
+        return self._embed("question")
+
+def _group(context):
+    return fingerprint(context, "history")
+
+def test_exact_hits_ignore_case_and_trailing_punctuation():
+    async def main():
+        cache = ResponseCache()
+        await cache.set("Who is Bicep?", "context", "history", "A duo")
+        return (await cache.get("who is  bicep", "context", "history"),
+                await cache.get("who is bicep", "other context", "history"))
+
+    assert asyncio.run(main()) == ("A duo", None)
+
+def test_similar_question_hits_within_the_same_group():
+    async def main():
+        cache = ResponseCache(similarity_threshold=0.9, embeddings=_SameVector())
+        await cache.set("Who is Bicep?", "context", "history", "A duo")
+        hit = await cache.get("Tell me about Bicep", "context", "history")
+        miss = await cache.get("Tell me about Bicep", "other context", "history")
+        return hit, miss, cache.similar_hits
+
+    assert asyncio.run(main()) == ("A duo", None, 1)
+
+def test_hits_keep_their_group_from_being_dropped_first():
+    async def main():
+        cache = ResponseCache(max_entries=2, similarity_threshold=0.9, embeddings=_SameVector())
+        await cache.set("q", "a", "history", "reply a")
+        await cache.set("q", "b", "history", "reply b")
+        assert await cache.get("another q", "a", "history") == "reply a"
+        await cache.set("q", "c", "history", "reply c")
+        return list(cache._groups)
+
+    assert asyncio.run(main()) == [_group("a"), _group("c")]
+
+def test_expired_members_are_pruned_and_empty_groups_dropped():
+    async def main():
+        cache = ResponseCache(similarity_threshold=0.9, embeddings=_SameVector())
+        await cache.set("Who is Bicep?", "context", "history", "A duo")
+        cache.entries.delete(fingerprint("who is bicep", _group("context")))
+        result = await cache.get("Tell me about Bicep", "context", "history")
+        return result, dict(cache._groups)
+
+    assert asyncio.run(main()) == (None, {})